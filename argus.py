@@ -18,6 +18,9 @@
 from src.main_menu import MainMenu
 from src.utils import init_tab_completer
 
-init_tab_completer()
-menu = MainMenu()
-menu.display()
+# Guarded so worker processes (spawned for JiraIssue conversion during sync) can import this module without starting
+# another interactive Argus.
+if __name__ == '__main__':
+    init_tab_completer()
+    menu = MainMenu()
+    menu.display()
@@ -0,0 +1,176 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import threading
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Set
+    from src.jira_issue import JiraIssue
+
+
+class ColdSegment:
+    """
+    Closed JiraIssues a JiraProject has aged out of memory. Issues are pickled back to back into a .cold file, with a
+    separate .cold_idx file mapping issue key to offset, so only the index is held in memory and faulting in a single
+    issue reads just its record. Removed issues leave dead records behind until they outnumber the live ones, at which
+    point the segment is rewritten.
+    """
+
+    def __init__(self, connection_name, project_name):
+        # type: (str, str) -> None
+        self.connection_name = connection_name
+        self.project_name = project_name
+        # issue key -> offset in the data file
+        self._index = None  # type: Optional[Dict[str, int]]
+        # Count of records in the data file no longer in the index
+        self._dead = 0
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        return self._path('cold')
+
+    def index_file(self):
+        # type: () -> str
+        return self._path('cold_idx')
+
+    def _path(self, extension):
+        # type: (str) -> str
+        file_name = os.path.join(jira_data_dir, '{}_{}.{}'.format(self.connection_name, self.project_name, extension))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if os.path.exists(self.index_file()):
+            with open(self.index_file(), 'rb') as index_file:
+                self._index, self._dead = pickle.load(index_file)
+
+    def _save_index(self):
+        os.makedirs(os.path.dirname(self.index_file()), exist_ok=True)
+        temp_file_name = '{}.tmp'.format(self.index_file())
+        with open(temp_file_name, 'wb') as index_file:
+            pickle.dump((self._index, self._dead), index_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.index_file())
+
+    def __len__(self):
+        with self._lock:
+            self._load_index()
+            return len(self._index)
+
+    def __contains__(self, issue_key):
+        with self._lock:
+            self._load_index()
+            return issue_key in self._index
+
+    def keys(self):
+        # type: () -> Set[str]
+        with self._lock:
+            self._load_index()
+            return set(self._index.keys())
+
+    def add(self, jira_issues):
+        # type: (Iterable[JiraIssue]) -> None
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+            with open(self.data_file(), 'ab') as data_file:
+                for jira_issue in jira_issues:
+                    if jira_issue.issue_key in self._index:
+                        self._dead += 1
+                    self._index[jira_issue.issue_key] = data_file.tell()
+                    pickle.dump(jira_issue, data_file, pickle.HIGHEST_PROTOCOL)
+            self._save_index()
+
+    def remove(self, issue_keys):
+        # type: (Iterable[str]) -> List[str]
+        """
+        :return: those of issue_keys we held
+        """
+        with self._lock:
+            self._load_index()
+            removed = [x for x in issue_keys if x in self._index]
+            if len(removed) == 0:
+                return removed
+            for issue_key in removed:
+                del self._index[issue_key]
+            self._dead += len(removed)
+            if self._dead > len(self._index):
+                self._compact()
+            self._save_index()
+            return removed
+
+    def get(self, issue_key):
+        # type: (str) -> Optional[JiraIssue]
+        with self._lock:
+            self._load_index()
+            offset = self._index.get(issue_key)
+            if offset is None:
+                return None
+            with open(self.data_file(), 'rb') as data_file:
+                data_file.seek(offset)
+                return pickle.load(data_file)
+
+    def issues(self):
+        # type: () -> Dict[str, JiraIssue]
+        """
+        Faults in every issue in the segment. Records are read in file order, skipping dead ones.
+        """
+        with self._lock:
+            self._load_index()
+            return self._read_all()
+
+    def _read_all(self):
+        # type: () -> Dict[str, JiraIssue]
+        results = {}  # type: Dict[str, JiraIssue]
+        if len(self._index) == 0:
+            return results
+        live_offsets = set(self._index.values())
+        with open(self.data_file(), 'rb') as data_file:
+            while True:
+                offset = data_file.tell()
+                try:
+                    jira_issue = pickle.load(data_file)
+                except EOFError:
+                    break
+                if offset in live_offsets:
+                    results[jira_issue.issue_key] = jira_issue
+        return results
+
+    def _compact(self):
+        live_issues = self._read_all()
+        temp_file_name = '{}.tmp'.format(self.data_file())
+        with open(temp_file_name, 'wb') as data_file:
+            for issue_key in sorted(live_issues):
+                self._index[issue_key] = data_file.tell()
+                pickle.dump(live_issues[issue_key], data_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.data_file())
+        self._dead = 0
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            for file_name in [self.data_file(), self.index_file()]:
+                if os.path.isfile(file_name):
+                    os.remove(file_name)
+            self._index = None
+            self._dead = 0
@@ -0,0 +1,345 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+from typing import TYPE_CHECKING
+
+from src.jira_dependency import JiraDependency
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+    from src.jira_issue import JiraIssue
+    from src.link_index import LinkEntry
+
+
+class DependencyGraph:
+    """
+    Immutable graph of the links between a set of JiraProjects, for questions that need more than the
+    few levels of dependencies DisplayFilter prints, i.e. everything blocking a FixVersion and the order to work it in.
+
+    Issue keys are numbered, and each node's outgoing edges are stored contiguously in flat arrays (edges of node n run
+    from offsets[n] to offsets[n + 1]), with a small int per edge naming its JiraDependency.pretty_type(). Built
+    from each project's LinkIndex, i.e. JiraIssue.parsed_links, so it doesn't depend on dependencies having been
+    resolved, and building it reads neither cold segments nor unloaded projects. Keys we link to but don't hold are
+    nodes without an issue.
+
+    Only keys, links, FixVersions and whether each issue is resolved are kept, not the JiraIssues. Status and the like
+    are looked up per key as queries need them.
+
+    Edges run from an issue to what it links to. For blocking types, that's from an issue to what has to finish first.
+    The same edges are also indexed in reverse, so what links to an issue costs its in-degree rather than a scan.
+    """
+
+    def __init__(self, link_entries, lookup):
+        # type: (Iterable[Mapping[str, LinkEntry]], Callable[[str], Optional[JiraIssue]]) -> None
+        """
+        :param link_entries: issue key -> LinkIndex entry, per project. Read once to build the graph, not kept.
+        :param lookup: issue key -> its current JiraIssue, i.e. IssueCatalog.get
+        """
+        entries_by_key = {}  # type: Dict[str, LinkEntry]
+        for entries in link_entries:
+            entries_by_key.update(entries)
+
+        self._lookup = lookup
+        self._keys = sorted(entries_by_key.keys())  # type: List[str]
+        self._index = {key: i for i, key in enumerate(self._keys)}  # type: Dict[str, int]
+        self.issue_count = len(self._keys)
+        # Node -> the fixVersions it was built with, shared with the index rather than copied
+        self._fix_versions = {}  # type: Dict[int, str]
+        # 1 for each node we hold that's resolved
+        self._closed = bytearray(self.issue_count)
+
+        # pretty_type() of each edge type id. None for link types missing from JiraDependency.dep_map.
+        self._type_names = []  # type: List[Optional[str]]
+        type_ids = {}  # type: Dict[str, int]
+
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        self._edge_types = array('H')
+        for source in range(self.issue_count):
+            links, fix_versions, is_closed = entries_by_key[self._keys[source]]
+            if fix_versions:
+                self._fix_versions[source] = fix_versions
+            self._closed[source] = is_closed
+            for target_key, link_type, direction in links:
+                type_key = '{}:{}'.format(link_type, direction)
+                type_id = type_ids.get(type_key)
+                if type_id is None:
+                    type_id = len(self._type_names)
+                    type_ids[type_key] = type_id
+                    self._type_names.append(JiraDependency.dep_map.get(type_key))
+                self._targets.append(self._node(target_key))
+                self._edge_types.append(type_id)
+            self._offsets.append(len(self._targets))
+        # Nodes for keys we don't hold have no outgoing edges
+        self._offsets.extend([len(self._targets)] * (len(self._keys) - self.issue_count))
+
+        self._blocking = {i for i, x in enumerate(self._type_names) if x in JiraDependency.blocking_types}
+        self._build_reverse_index()
+
+    def _build_reverse_index(self):
+        """
+        Same layout as the forward arrays, with each node's incoming edges contiguous, filled by counting sort
+        """
+        counts = [0] * (len(self._keys) + 1)
+        for target in self._targets:
+            counts[target + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        self._reverse_offsets = array('l', counts)
+
+        self._sources = array('l', [0]) * len(self._targets)
+        self._reverse_edge_types = array('H', [0]) * len(self._targets)
+        next_slot = counts[:-1]
+        for source in range(self.issue_count):
+            for i in range(self._offsets[source], self._offsets[source + 1]):
+                target = self._targets[i]
+                slot = next_slot[target]
+                self._sources[slot] = source
+                self._reverse_edge_types[slot] = self._edge_types[i]
+                next_slot[target] = slot + 1
+
+    def _node(self, issue_key):
+        # type: (str) -> int
+        node = self._index.get(issue_key)
+        if node is None:
+            node = len(self._keys)
+            self._index[issue_key] = node
+            self._keys.append(issue_key)
+        return node
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def edge_count(self):
+        # type: () -> int
+        return len(self._targets)
+
+    def key(self, node):
+        # type: (int) -> str
+        return self._keys[node]
+
+    def issue(self, issue_key):
+        # type: (str) -> Optional[JiraIssue]
+        """
+        :return: None for keys we don't hold, whether linked to or not
+        """
+        node = self._index.get(issue_key)
+        return None if node is None else self._issue(node)
+
+    def _issue(self, node):
+        # type: (int) -> Optional[JiraIssue]
+        return self._lookup(self._keys[node]) if node < self.issue_count else None
+
+    def is_open(self, issue_key):
+        # type: (str) -> bool
+        """
+        :return: whether issue_key was unresolved when the graph was built. False for keys we don't hold.
+        """
+        node = self._index.get(issue_key)
+        return node is not None and self._is_open(node)
+
+    def edges(self, issue_key):
+        # type: (str) -> List[Tuple[str, Optional[str]]]
+        """
+        :return: (target key, pretty_type) for each link out of issue_key
+        """
+        node = self._index.get(issue_key)
+        if node is None:
+            return []
+        return [(self._keys[self._targets[i]], self._type_names[self._edge_types[i]])
+                for i in range(self._offsets[node], self._offsets[node + 1])]
+
+    def incoming(self, issue_key):
+        # type: (str) -> List[Tuple[str, Optional[str]]]
+        """
+        :return: (source key, pretty_type from the source's side) for each link into issue_key
+        """
+        node = self._index.get(issue_key)
+        if node is None:
+            return []
+        return [(self._keys[self._sources[i]], self._type_names[self._reverse_edge_types[i]])
+                for i in range(self._reverse_offsets[node], self._reverse_offsets[node + 1])]
+
+    def _edge_filter(self, pretty_types):
+        # type: (Optional[Set[str]]) -> Set[int]
+        if pretty_types is None:
+            return self._blocking
+        return {i for i, x in enumerate(self._type_names) if x in pretty_types}
+
+    def closure(self, issue_keys, pretty_types=None):
+        # type: (Iterable[str], Optional[Set[str]]) -> List[str]
+        """
+        Everything reachable from issue_keys, excluding them unless reachable from one another
+        :param pretty_types: edge types to follow. Defaults to blocking ones, i.e. everything that has to finish first.
+        """
+        return [self._keys[x] for x in self._closure(issue_keys, self._edge_filter(pretty_types),
+                                                     self._offsets, self._targets, self._edge_types)]
+
+    def dependents(self, issue_keys, pretty_types=None):
+        # type: (Iterable[str], Optional[Set[str]]) -> List[str]
+        """
+        closure() in reverse: everything that links to issue_keys, directly or not
+        :param pretty_types: edge types to follow. Defaults to blocking ones, i.e. everything waiting on issue_keys.
+        """
+        return [self._keys[x] for x in self._closure(issue_keys, self._edge_filter(pretty_types),
+                                                     self._reverse_offsets, self._sources, self._reverse_edge_types)]
+
+    def waiting_on(self, issue_key):
+        # type: (str) -> List[str]
+        """
+        :return: unresolved issues directly blocked by issue_key
+        """
+        node = self._index.get(issue_key)
+        if node is None:
+            return []
+        return sorted({self._keys[self._sources[i]] for i in range(self._reverse_offsets[node], self._reverse_offsets[node + 1])
+                       if self._reverse_edge_types[i] in self._blocking and self._is_open(self._sources[i])})
+
+    def unblocked_by(self, issue_key):
+        # type: (str) -> List[str]
+        """
+        :return: unresolved issues blocked by issue_key and by nothing else still unresolved, i.e. those free to start
+            once it's closed. Blockers we don't cache count as unresolved.
+        """
+        node = self._index.get(issue_key)
+        if node is None:
+            return []
+        results = set()
+        for i in range(self._reverse_offsets[node], self._reverse_offsets[node + 1]):
+            source = self._sources[i]
+            if self._reverse_edge_types[i] not in self._blocking or not self._is_open(source):
+                continue
+            if all(self._targets[j] == node or self._is_done(self._targets[j])
+                   for j in range(self._offsets[source], self._offsets[source + 1]) if self._edge_types[j] in self._blocking):
+                results.add(source)
+        return sorted(self._keys[x] for x in results)
+
+    def _is_open(self, node):
+        # type: (int) -> bool
+        return node < self.issue_count and not self._closed[node]
+
+    def _is_done(self, node):
+        # type: (int) -> bool
+        return node < self.issue_count and self._closed[node] == 1
+
+    def _closure(self, issue_keys, edge_types, offsets, targets, types):
+        # type: (Iterable[str], Set[int], array, array, array) -> List[int]
+        visited = bytearray(len(self._keys))
+        to_visit = [self._index[x] for x in issue_keys if x in self._index]
+        reached = []  # type: List[int]
+        while len(to_visit) > 0:
+            node = to_visit.pop()
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if not visited[target] and types[i] in edge_types:
+                    visited[target] = 1
+                    reached.append(target)
+                    to_visit.append(target)
+        return reached
+
+    def fix_versions(self):
+        # type: () -> Set[str]
+        """
+        :return: every FixVersion on an issue we hold
+        """
+        return {fix for x in self._fix_versions.values() for fix in x.split(',')}
+
+    def fix_version_roots(self, fix_version):
+        # type: (str) -> List[str]
+        # Matches JiraIssue.has_fix_version
+        return [self._keys[i] for i in sorted(self._fix_versions) if fix_version in self._fix_versions[i]]
+
+    def blocking_fix_version(self, fix_version):
+        # type: (str) -> List[str]
+        """
+        Everything that has to finish before the issues on fix_version can, not on it itself
+        """
+        roots = self.fix_version_roots(fix_version)
+        root_set = set(roots)
+        return [x for x in self.closure(roots) if x not in root_set]
+
+    def topological_order(self, issue_keys, pretty_types=None):
+        # type: (Iterable[str], Optional[Set[str]]) -> Tuple[List[str], List[str]]
+        """
+        Orders issue_keys so each comes after whatever it depends on among them
+        :return: (ordered keys, keys on or behind a cycle, which can't be ordered)
+        """
+        order, cyclic = self._topological_order(self._nodes(issue_keys), self._edge_filter(pretty_types))
+        return [self._keys[x] for x in order], sorted(self._keys[x] for x in cyclic)
+
+    def _nodes(self, issue_keys):
+        # type: (Iterable[str]) -> List[int]
+        return sorted({self._index[x] for x in issue_keys if x in self._index})
+
+    def _topological_order(self, nodes, edge_types):
+        # type: (List[int], Set[int]) -> Tuple[List[int], List[int]]
+        offsets, targets, types = self._offsets, self._targets, self._edge_types
+        members = set(nodes)
+        # Count of each member's unfinished dependencies, and who's waiting on each
+        remaining = {x: 0 for x in nodes}  # type: Dict[int, int]
+        dependents = {x: [] for x in nodes}  # type: Dict[int, List[int]]
+        for node in nodes:
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if target in members and target != node and types[i] in edge_types:
+                    remaining[node] += 1
+                    dependents[target].append(node)
+
+        ready = [x for x in nodes if remaining[x] == 0]
+        order = []  # type: List[int]
+        while len(ready) > 0:
+            node = ready.pop()
+            order.append(node)
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        return order, [x for x in nodes if remaining[x] > 0]
+
+    def critical_path(self, issue_keys, weight=None, pretty_types=None):
+        # type: (Iterable[str], Optional[Callable[[str], int]], Optional[Set[str]]) -> List[str]
+        """
+        The heaviest chain of dependencies among issue_keys, i.e. the work that can't be done in parallel
+        :param weight: issue key -> its cost. Defaults to 1 per unresolved issue we hold.
+        :return: keys from the first to finish to the last
+        """
+        if weight is None:
+            weight = self.is_open
+        edge_types = self._edge_filter(pretty_types)
+        order, _ = self._topological_order(self._nodes(issue_keys), edge_types)
+        offsets, targets, types = self._offsets, self._targets, self._edge_types
+
+        # Heaviest chain ending at each node, and the dependency it continues from
+        best = {}  # type: Dict[int, int]
+        previous = {}  # type: Dict[int, int]
+        for node in order:
+            chain, parent = 0, -1
+            for i in range(offsets[node], offsets[node + 1]):
+                target = targets[i]
+                if target in best and types[i] in edge_types and best[target] > chain:
+                    chain, parent = best[target], target
+            best[node] = chain + int(weight(self._keys[node]))
+            previous[node] = parent
+
+        if len(best) == 0 or max(best.values()) == 0:
+            return []
+        node = max(order, key=lambda x: best[x])
+        path = []  # type: List[int]
+        while node != -1:
+            path.append(node)
+            node = previous[node]
+        path.reverse()
+        return [self._keys[x] for x in path]
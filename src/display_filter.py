@@ -14,6 +14,7 @@
 
 import os
 import pydoc
+from datetime import datetime
 from typing import TYPE_CHECKING, Dict, List, Optional, Set
 
 from src import utils
@@ -22,6 +23,7 @@ from src.jira_utils import JiraUtils
 from src.utils import get_input, pick_value
 
 if TYPE_CHECKING:
+    from src.dependency_graph import DependencyGraph
     from src.jira_manager import JiraManager
 
 
@@ -33,6 +35,8 @@ class DisplayFilter:
     """
 
     RELATIONSHIP_STRING = 'relationship'
+    # Count of unresolved issues directly blocked by the row's issue, from the JiraManager's DependencyGraph
+    BLOCKING_STRING = 'blocking'
 
     _key_len = 20
 
@@ -58,6 +62,13 @@ class DisplayFilter:
         # Used to easily filter to open only, since a Column-based match would require multiple filter entries (None, unresolved, etc)
         self.open_only = False
 
+        # When set, every displayed issue, dependencies included, is rewound to its state at this time
+        self.as_of = None  # type: Optional[datetime]
+
+        # JiraConnection name -> DependencyGraph for the BLOCKING_STRING column, resolved once per display call so rows
+        # don't each check the graph is current, nor see it rebuilt by a sync partway through
+        self._dependency_graphs = {}  # type: Dict[str, Optional[DependencyGraph]]
+
     @classmethod
     def default(cls):
         df = DisplayFilter()
@@ -117,6 +128,8 @@ class DisplayFilter:
 
     def _construct_header(self) -> str:
         header = '-------------------------------------------------------------------------\n'
+        if self.as_of is not None:
+            header += 'As of {}\n'.format(self.as_of.strftime('%Y/%m/%d %H:%M'))
         # Add 5 to key len to account for 4 char on numeric index + : separator
         header += 'Idx--Key'.ljust(self._key_len + 5)
         for column in list(self.included_columns):
@@ -138,6 +151,7 @@ class DisplayFilter:
         :return: an array of filtered issues
         """
         self._current_index = start_idx
+        self._dependency_graphs = {}
 
         # add padding to account for numbered tickets
         if filters is None:
@@ -151,6 +165,7 @@ class DisplayFilter:
             # viewed tickets while still preventing meaningless duplication on a chain.
             DisplayFilter._seen_keys = set()
             result += self._format_jira_issue(jira_manager, issue, filters, displayed_issues, None, force_show_dependencies)
+        self._dependency_graphs = {}
 
         pydoc.pager(result)
         if filtered_count != 0:
@@ -169,6 +184,12 @@ class DisplayFilter:
         If the input JiraIssue matches the filters passed in, formats and returns a string representation of the issue.
         Recursion to format sub-rows is handled in this method.
         """
+        if self.as_of is not None:
+            issue = jira_manager.issue_as_of(issue, self.as_of)
+            # Didn't exist yet
+            if issue is None:
+                return ''
+
         if self.open_only and issue.is_closed:
             return ''
 
@@ -222,6 +243,9 @@ class DisplayFilter:
         for column in list(self.included_columns):
             if dependency is not None and column.pretty_name == DisplayFilter.RELATIONSHIP_STRING:
                 val = dependency.pretty_type()
+            elif column.name == DisplayFilter.BLOCKING_STRING:
+                graph = self._dependency_graph(jira_manager, issue) if issue.is_cached_offline else None
+                val = '' if graph is None else str(len(graph.waiting_on(issue.issue_key)))
             else:
                 val = JiraUtils.retrieve_field_value(jira_manager, issue, column.name)
 
@@ -239,6 +263,12 @@ class DisplayFilter:
         self._current_index += 1
         return issue_string
 
+    def _dependency_graph(self, jira_manager: 'JiraManager', issue: 'JiraIssue') -> Optional['DependencyGraph']:
+        connection_name = issue.jira_connection_name
+        if connection_name not in self._dependency_graphs:
+            self._dependency_graphs[connection_name] = jira_manager.connection_dependency_graph(connection_name)
+        return self._dependency_graphs[connection_name]
+
 
 class ColumnFilter:
 
@@ -0,0 +1,209 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from array import array
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src.time_utils import jira_epoch
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional, Tuple
+    from src.issue_history import FieldTransition, IssueHistory
+    from src.jira_issue import JiraIssue
+
+
+class FlowMetrics:
+    """
+    Cycle time, lead time, throughput and cumulative flow over a set of cached JiraIssues. Each issue's created,
+    started and resolved times are converted once up front into parallel arrays of epoch seconds (-1 where unknown);
+    every metric after that is integer arithmetic over those arrays plus the status transitions from IssueHistory.
+
+    Cycle time runs from the first status transition out of a TODO_STATUSES status to resolution; lead time from
+    creation to resolution. Issues in projects without history tracking still count toward lead time and throughput.
+    """
+
+    SECONDS_PER_DAY = 86400
+
+    # Statuses an issue waits in before anyone starts work on it
+    TODO_STATUSES = {'Open', 'To Do', 'Backlog', 'Triage'}
+
+    def __init__(self, jira_issues, history_lookup):
+        # type: (List[JiraIssue], Callable[[str], Optional[IssueHistory]]) -> None
+        """
+        :param history_lookup: project name -> IssueHistory for the project, None if it isn't tracked
+        """
+        self.jira_issues = jira_issues
+        self.created = array('q')
+        self.started = array('q')
+        self.resolved = array('q')
+        self.statuses = []  # type: List[str]
+        self._status_transitions = []  # type: List[List[FieldTransition]]
+        self.untracked_count = 0
+
+        status_changes = {}  # type: Dict[str, Optional[Dict[str, List[FieldTransition]]]]
+        for jira_issue in jira_issues:
+            project_name = jira_issue.project_name
+            if project_name not in status_changes:
+                history = history_lookup(project_name)
+                status_changes[project_name] = None if history is None else history.field_transitions('status')
+            if status_changes[project_name] is None:
+                self.untracked_count += 1
+                transitions = []  # type: List[FieldTransition]
+            else:
+                transitions = status_changes[project_name].get(jira_issue.issue_key, [])
+
+            created = jira_epoch(jira_issue.get('created'))
+            resolved = jira_epoch(jira_issue.resolved) if jira_issue.is_closed else None
+            self.created.append(-1 if created is None else created)
+            self.started.append(self._started(transitions))
+            self.resolved.append(-1 if resolved is None else resolved)
+            self.statuses.append(jira_issue.get('status', 'None'))
+            self._status_transitions.append(transitions)
+
+    @classmethod
+    def _started(cls, transitions):
+        # type: (List[FieldTransition]) -> int
+        for transition in transitions:
+            if transition.from_string in cls.TODO_STATUSES:
+                return transition.timestamp
+        return -1
+
+    def resolved_indices(self, since, until):
+        # type: (int, int) -> List[int]
+        return [i for i, resolved in enumerate(self.resolved) if since <= resolved < until]
+
+    def cycle_times(self, since, until):
+        # type: (int, int) -> List[float]
+        """
+        :return: days from start to resolution for each started issue resolved in [since, until)
+        """
+        return [(self.resolved[i] - self.started[i]) / self.SECONDS_PER_DAY
+                for i in self.resolved_indices(since, until) if self.started[i] != -1]
+
+    def lead_times(self, since, until):
+        # type: (int, int) -> List[float]
+        """
+        :return: days from creation to resolution for each issue resolved in [since, until)
+        """
+        return [(self.resolved[i] - self.created[i]) / self.SECONDS_PER_DAY
+                for i in self.resolved_indices(since, until) if self.created[i] != -1]
+
+    def work_in_progress(self):
+        # type: () -> int
+        return sum(1 for i in range(len(self.resolved)) if self.resolved[i] == -1 and self.started[i] != -1)
+
+    def throughput(self, since, until, bucket_days=7):
+        # type: (int, int, int) -> List[int]
+        """
+        :return: count of issues resolved per bucket_days bucket from since up to until
+        """
+        bucket_seconds = bucket_days * self.SECONDS_PER_DAY
+        counts = [0] * max(1, -(-(until - since) // bucket_seconds))
+        for resolved in self.resolved:
+            if since <= resolved < until:
+                counts[(resolved - since) // bucket_seconds] += 1
+        return counts
+
+    def cumulative_flow(self, since, until, step_days=1):
+        # type: (int, int, int) -> Tuple[List[int], Dict[str, List[int]]]
+        """
+        Samples how many issues sat in each status at every step_days from since through until. Rather than checking
+        every issue at every sample, each stretch an issue spent in one status adds +1 / -1 at the samples bracketing
+        it and a running sum over the samples yields the counts.
+
+        Issues without recorded transitions, i.e. in projects without history tracking, only tell us where they ended
+        up: resolved ones are counted in their current status from resolution on, and open ones left out.
+        :return: sample times, and status -> issue count at each sample. Statuses are in the order first seen.
+        """
+        step_seconds = step_days * self.SECONDS_PER_DAY
+        sample_count = (until - since) // step_seconds + 1
+        samples = [since + step * step_seconds for step in range(sample_count)]
+        deltas = {}  # type: Dict[str, List[int]]
+
+        def first_sample_at_or_after(timestamp):
+            return min(sample_count, max(0, -(-(timestamp - since) // step_seconds)))
+
+        for i, transitions in enumerate(self._status_transitions):
+            if len(transitions) > 0:
+                status = transitions[0].from_string
+                start = self.created[i] if self.created[i] != -1 else since
+            elif self.resolved[i] != -1:
+                status = self.statuses[i]
+                start = self.resolved[i]
+            else:
+                continue
+            for transition in transitions + [None]:
+                end = until + 1 if transition is None else transition.timestamp
+                first, last = first_sample_at_or_after(start), first_sample_at_or_after(end)
+                if first < last and status is not None:
+                    if status not in deltas:
+                        deltas[status] = [0] * (sample_count + 1)
+                    deltas[status][first] += 1
+                    deltas[status][last] -= 1
+                if transition is not None:
+                    status = transition.to_string
+                    start = transition.timestamp
+
+        flow = {}  # type: Dict[str, List[int]]
+        for status, status_deltas in deltas.items():
+            running = 0
+            counts = []
+            for delta in status_deltas[:sample_count]:
+                running += delta
+                counts.append(running)
+            flow[status] = counts
+        return samples, flow
+
+    @staticmethod
+    def percentile(values, pct):
+        # type: (List[float], float) -> Optional[float]
+        """
+        Nearest-rank percentile, None on no values
+        """
+        if len(values) == 0:
+            return None
+        ordered = sorted(values)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def summary(self, since, until):
+        # type: (int, int) -> str
+        def describe(values):
+            if len(values) == 0:
+                return 'n/a'
+            return 'median {:.1f}, 85th pct {:.1f}, over {} issues'.format(
+                self.percentile(values, 50), self.percentile(values, 85), len(values))
+
+        def day(timestamp):
+            return datetime.utcfromtimestamp(timestamp).strftime('%Y/%m/%d')
+
+        lines = ['Flow from {} to {} across {} issues'.format(day(since), day(until), len(self.jira_issues)),
+                 'Resolved: {}. Currently in progress: {}'.format(
+                     len(self.resolved_indices(since, until)), self.work_in_progress()),
+                 'Cycle time (days): {}'.format(describe(self.cycle_times(since, until))),
+                 'Lead time (days): {}'.format(describe(self.lead_times(since, until))),
+                 'Weekly throughput: {}'.format(' '.join([str(x) for x in self.throughput(since, until)]))]
+        if self.untracked_count > 0:
+            lines.append('{} issues are in projects without history tracking; they have no cycle time.'.format(
+                self.untracked_count))
+
+        samples, flow = self.cumulative_flow(since, until, 7)
+        statuses = list(flow.keys())
+        lines.append('Cumulative flow (weekly):')
+        lines.append('{:<12}'.format('Date') + ''.join(['{:<16}'.format(x[:15]) for x in statuses]))
+        for step, sample in enumerate(samples):
+            lines.append('{:<12}'.format(day(sample)) + ''.join(['{:<16}'.format(flow[x][step]) for x in statuses]))
+        return os.linesep.join(lines)
@@ -0,0 +1,166 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+from src.jira_connection import JiraConnection
+from src.jira_issue import JiraIssue
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional
+    from src.jira_dependency import JiraDependency
+    from src.jira_project import JiraProject
+
+
+class IssueCatalog:
+    """
+    Resolves an issue key to its JiraIssue across every JiraConnection in one lookup. Cached projects are indexed by
+    name, the issue key prefix, and the index is only rebuilt when the set of cached projects changes, rather than per
+    lookup. Issues themselves stay in their project's snapshot, so refreshes and cold or residency moves need no upkeep
+    here.
+
+    Also holds one shared placeholder JiraIssue per key we can't find, so every link to a missing issue points at the
+    same object, and the live JiraDependencies targeting each key. Once a missing issue turns up, or an issue is
+    republished by a sync or reloaded from disk, those are retargeted in place rather than re-resolving every issue that
+    might link to it.
+    """
+
+    def __init__(self, jira_connections):
+        # type: (Dict[str, JiraConnection]) -> None
+        """
+        :param jira_connections: JiraManager's live map of connections; call invalidate() whenever it changes
+        """
+        self._jira_connections = jira_connections
+        self._projects = None  # type: Optional[Dict[str, JiraProject]]
+        # JiraConnection.project_generation our index was built at
+        self._generation = -1
+        self._placeholders = {}  # type: Dict[str, JiraIssue]
+        # Issue key -> JiraDependencies targeting it. Weak, as re-resolving an issue drops its old ones.
+        self._dependents = {}  # type: Dict[str, List[weakref.ReferenceType]]
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._projects = None
+
+    def projects(self):
+        # type: () -> Dict[str, JiraProject]
+        """
+        :return: project name -> cached JiraProject, shared; don't modify
+        """
+        with self._lock:
+            if self._projects is None or self._generation != JiraConnection.project_generation:
+                self._generation = JiraConnection.project_generation
+                projects = {}  # type: Dict[str, JiraProject]
+                for jira_connection in list(self._jira_connections.values()):
+                    for jira_project in jira_connection.cached_projects:
+                        projects[jira_project.project_name] = jira_project
+                self._projects = projects
+            return self._projects
+
+    def get(self, issue_key, fault_in=True):
+        # type: (str, bool) -> Optional[JiraIssue]
+        """
+        Looks in the cached project owning the key and, failing that or if the project's cache scope may have excluded
+        it, in each connection's RemoteIssueCache
+        :param fault_in: False to return None rather than reload the owning project if it's unloaded
+        """
+        jira_project = self.projects().get(issue_key.split('-')[0])
+        if jira_project is not None:
+            if not fault_in and not jira_project.is_resident:
+                return None
+            jira_issue = jira_project.get_issue(issue_key)
+            if jira_issue is not None or jira_project.cache_scope is None:
+                return jira_issue
+        for jira_connection in list(self._jira_connections.values()):
+            jira_issue = jira_connection.remote_issue_cache.get(issue_key)
+            if jira_issue is not None:
+                return jira_issue
+        return None
+
+    def is_unloaded(self, issue_key):
+        # type: (str) -> bool
+        """
+        :return: True if the key belongs to a cached project currently unloaded to stay within the memory budget
+        """
+        jira_project = self.projects().get(issue_key.split('-')[0])
+        return jira_project is not None and not jira_project.is_resident
+
+    def placeholder(self, issue_key):
+        # type: (str) -> JiraIssue
+        with self._lock:
+            jira_issue = self._placeholders.get(issue_key)
+            if jira_issue is None:
+                jira_issue = JiraIssue.non_cached_issue(issue_key)
+                self._placeholders[issue_key] = jira_issue
+            return jira_issue
+
+    def placeholder_count(self):
+        # type: () -> int
+        with self._lock:
+            return len(self._placeholders)
+
+    def track(self, jira_dependency):
+        # type: (JiraDependency) -> None
+        issue_key = jira_dependency.target.issue_key
+        with self._lock:
+            dependents = self._dependents.setdefault(issue_key, [])
+            # Drop those of re-resolved issues now and then, so a much-linked key doesn't accumulate them
+            if len(dependents) > 0 and len(dependents) & (len(dependents) - 1) == 0:
+                dependents[:] = [x for x in dependents if x() is not None]
+            dependents.append(weakref.ref(jira_dependency))
+
+    def retarget(self, issue_keys):
+        # type: (Iterable[str]) -> int
+        """
+        Points live JiraDependencies targeting any of issue_keys at the issue we now hold for it, whether they were on a
+        placeholder or on a copy since replaced
+        :return: count of dependencies retargeted
+        """
+        with self._lock:
+            candidates = [x for x in issue_keys if x in self._dependents]
+        retargeted = 0
+        for issue_key in candidates:
+            jira_issue = self.get(issue_key)
+            if jira_issue is None:
+                continue
+            with self._lock:
+                self._placeholders.pop(issue_key, None)
+                dependents = [x for x in self._dependents.get(issue_key, []) if x() is not None]
+                self._dependents[issue_key] = dependents
+            for reference in dependents:
+                jira_dependency = reference()
+                # Same key, so its hash in the owning issue's dependencies is unaffected
+                if jira_dependency is not None and jira_dependency.target is not jira_issue:
+                    jira_dependency.target = jira_issue
+                    retargeted += 1
+        return retargeted
+
+    def waiting_keys(self):
+        # type: () -> List[str]
+        """
+        :return: keys we hold a placeholder for that something links to
+        """
+        with self._lock:
+            return sorted(x for x in self._placeholders if len(self._dependents.get(x, [])) > 0)
+
+    def clear_placeholders(self):
+        """
+        Ahead of a full dependency resolution, so keys found since don't keep their placeholders alive
+        """
+        with self._lock:
+            self._placeholders = {}
+            self._dependents = {}
@@ -0,0 +1,383 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import copy
+import os
+import pickle
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.time_utils import jira_epoch
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+    from src.jira_issue import JiraIssue
+
+
+class FieldTransition:
+    """
+    A single field change out of a JIRA changelog
+    """
+
+    def __init__(self, issue_key, field, timestamp, from_string, to_string):
+        # type: (str, str, int, Optional[str], Optional[str]) -> None
+        """
+        :param timestamp: epoch seconds the change was made
+        :param from_string: display value before the change, None if unset
+        :param to_string: display value after the change, None if cleared
+        """
+        self.issue_key = issue_key
+        self.field = field
+        self.timestamp = timestamp
+        self.from_string = from_string
+        self.to_string = to_string
+
+    @property
+    def changed(self):
+        # type: () -> datetime
+        return datetime.utcfromtimestamp(self.timestamp)
+
+    def __str__(self):
+        return '{} {}: {} -> {}'.format(self.changed.strftime('%Y/%m/%d %H:%M'), self.field, self.from_string, self.to_string)
+
+
+class IssueHistory:
+    """
+    Append-only store of field transitions for the issues in a single JiraProject, kept next to the project's data file.
+    Transitions are pickled back to back into a .history file; a separate .history_idx file maps (issue key, field) to
+    the time-ordered (timestamp, offset) of every transition for that field, so reading one issue's history only touches
+    the records it needs.
+    """
+
+    # Changelog 'field' display names we know the REST field id for, for older JIRA that doesn't send fieldId
+    FIELD_IDS = {'Fix Version': 'fixVersions', 'Version': 'versions', 'Component': 'components', 'Link': 'issuelinks'}
+
+    # Fields where each changelog entry adds or removes a single member, so rewinding undoes every later entry. Each is
+    # stored in its own format: fixVersions as comma delimited names, components and versions as the str() of a list of
+    # jira Resources, issuelinks as 'KEY:type:direction,' per link.
+    MULTI_VALUED_FIELDS = {'fixVersions', 'components', 'versions', 'issuelinks'}
+
+    # Resource class name JiraIssue's str() of each list-of-Resource field renders its members with
+    RESOURCE_LIST_FIELDS = {'components': 'Component', 'versions': 'Version'}
+
+    # The changelog records labels as the whole space delimited set before and after
+    LABELS_FIELD = 'labels'
+
+    # Issue key a 'Link' changelog entry names, i.e. 'This issue blocks CASSANDRA-12345'
+    LINKED_KEY_PATTERN = re.compile(r'([A-Z][A-Z0-9_]*-[0-9]+)\s*$')
+
+    def __init__(self, connection_name, project_name):
+        # type: (str, str) -> None
+        self.connection_name = connection_name
+        self.project_name = project_name
+
+        # (issue key, field) -> [(timestamp, offset)], ordered by timestamp
+        self._index = None  # type: Optional[Dict[Tuple[str, str], List[Tuple[int, int]]]]
+        # issue key -> fields with stored transitions. Derived from _index on load rather than persisted.
+        self._issue_fields = {}  # type: Dict[str, Set[str]]
+        # field -> issue key -> transitions, for bulk readers like FlowMetrics. Dropped whenever we append.
+        self._field_cache = {}  # type: Dict[str, Dict[str, List[FieldTransition]]]
+        # issue key -> highest changelog history id appended, so incremental syncs only append new entries
+        self._last_history_ids = {}  # type: Dict[str, int]
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        return self._path('history')
+
+    def index_file(self):
+        # type: () -> str
+        return self._path('history_idx')
+
+    def _path(self, extension):
+        # type: (str) -> str
+        file_name = os.path.join(jira_data_dir, '{}_{}.{}'.format(self.connection_name, self.project_name, extension))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if os.path.exists(self.index_file()):
+            with open(self.index_file(), 'rb') as index_file:
+                self._index, self._last_history_ids = pickle.load(index_file)
+        self._issue_fields = {}
+        for issue_key, field in self._index:
+            self._issue_fields.setdefault(issue_key, set()).add(field)
+
+    def _save_index(self):
+        temp_file_name = '{}.tmp'.format(self.index_file())
+        with open(temp_file_name, 'wb') as index_file:
+            pickle.dump((self._index, self._last_history_ids), index_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.index_file())
+
+    def append_changelog(self, issue_key, histories):
+        # type: (str, List[Dict]) -> int
+        """
+        Appends any entries of a raw REST changelog 'histories' list we haven't already stored for this issue.
+        :return: count of field transitions appended
+        """
+        return self.append_changelogs({issue_key: histories})
+
+    def append_changelogs(self, changelogs):
+        # type: (Dict[str, List[Dict]]) -> int
+        """
+        Batch form of append_changelog, writing the index once for the lot.
+        :param changelogs: issue key -> raw REST changelog 'histories' list
+        """
+        appended = 0
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+            with open(self.data_file(), 'ab') as data_file:
+                for issue_key, histories in changelogs.items():
+                    last_id = self._last_history_ids.get(issue_key, -1)
+                    for history in sorted(histories, key=lambda h: int(h['id'])):
+                        history_id = int(history['id'])
+                        if history_id <= last_id:
+                            continue
+                        timestamp = jira_epoch(history['created'])
+                        for item in history.get('items', []):
+                            transition = FieldTransition(issue_key, self._field_id(item), timestamp,
+                                                         item.get('fromString'), item.get('toString'))
+                            offset = data_file.tell()
+                            pickle.dump(transition, data_file, pickle.HIGHEST_PROTOCOL)
+                            self._insert(transition, offset)
+                            appended += 1
+                        last_id = history_id
+                    self._last_history_ids[issue_key] = last_id
+            if len(changelogs) > 0:
+                self._save_index()
+                self._field_cache = {}
+        return appended
+
+    def _insert(self, transition, offset):
+        # type: (FieldTransition, int) -> None
+        entries = self._index.setdefault((transition.issue_key, transition.field), [])
+        self._issue_fields.setdefault(transition.issue_key, set()).add(transition.field)
+        entries.append((transition.timestamp, offset))
+        # Histories arrive in id order, which is nearly always time order; keep the index honest if not
+        if len(entries) > 1 and entries[-2][0] > transition.timestamp:
+            entries.sort()
+
+    @classmethod
+    def _field_id(cls, item):
+        # type: (Dict) -> str
+        if 'fieldId' in item:
+            return item['fieldId']
+        return cls.FIELD_IDS.get(item['field'], item['field'])
+
+    def last_history_id(self, issue_key):
+        # type: (str) -> int
+        with self._lock:
+            self._load_index()
+            return self._last_history_ids.get(issue_key, -1)
+
+    def field_index(self, issue_key, field):
+        # type: (str, str) -> List[Tuple[int, int]]
+        """
+        :return: time-ordered (timestamp, offset) for every stored transition of this issue's field
+        """
+        with self._lock:
+            self._load_index()
+            return list(self._index.get((issue_key, field), []))
+
+    def fields(self, issue_key):
+        # type: (str) -> List[str]
+        with self._lock:
+            self._load_index()
+            return sorted(self._issue_fields.get(issue_key, []))
+
+    def read(self, offsets):
+        # type: (List[int]) -> List[FieldTransition]
+        if not os.path.exists(self.data_file()):
+            return []
+        with open(self.data_file(), 'rb') as data_file:
+            return self._read(data_file, offsets)
+
+    @staticmethod
+    def _read(data_file, offsets):
+        # type: (BinaryIO, List[int]) -> List[FieldTransition]
+        results = []
+        for offset in offsets:
+            data_file.seek(offset)
+            results.append(pickle.load(data_file))
+        return results
+
+    def transitions(self, issue_key, field=None):
+        # type: (str, Optional[str]) -> List[FieldTransition]
+        """
+        :param field: restrict to a single field, all fields if None
+        :return: time-ordered transitions for the issue
+        """
+        fields = [field] if field is not None else self.fields(issue_key)
+        entries = []  # type: List[Tuple[int, int]]
+        for field_name in fields:
+            entries.extend(self.field_index(issue_key, field_name))
+        return self.read([offset for _, offset in sorted(entries)])
+
+    def field_transitions(self, field):
+        # type: (str) -> Dict[str, List[FieldTransition]]
+        """
+        Every stored transition of a single field across the project, read in one pass in file order and kept until the
+        next append, so repeated reports over the same project don't go back to disk.
+        :return: issue key -> time-ordered transitions of the field
+        """
+        with self._lock:
+            self._load_index()
+            if field in self._field_cache:
+                return self._field_cache[field]
+            entries = [(offset, key) for (key, indexed_field), offsets in self._index.items() if indexed_field == field
+                       for _, offset in offsets]
+            results = {}  # type: Dict[str, List[FieldTransition]]
+            if len(entries) > 0 and os.path.exists(self.data_file()):
+                entries.sort()
+                with open(self.data_file(), 'rb') as data_file:
+                    for transition in self._read(data_file, [offset for offset, _ in entries]):
+                        results.setdefault(transition.issue_key, []).append(transition)
+                for transitions in results.values():
+                    transitions.sort(key=lambda t: t.timestamp)
+            self._field_cache[field] = results
+            return results
+
+    def issues_as_of(self, jira_issues, timestamp):
+        # type: (List[JiraIssue], int) -> List[JiraIssue]
+        """
+        Rewinds cached JiraIssues to their state at timestamp. The cached issue is the snapshot and the stored transitions
+        the deltas, but we never replay them: the first transition of a field after timestamp carries what the field held
+        at timestamp in its from_string, so that's one index bisect and one record read per changed field. Multi-valued
+        fields instead undo each later add / remove, newest first.
+        :param timestamp: epoch seconds
+        :return: rewound copies of the input JiraIssues, less any created after timestamp
+        """
+        results = []
+        # (rewound issue, field, offsets of the transitions to undo)
+        pending = []  # type: List[Tuple[JiraIssue, str, List[int]]]
+        with self._lock:
+            self._load_index()
+            for jira_issue in jira_issues:
+                if self._created(jira_issue) > timestamp:
+                    continue
+                rewound = copy.copy(jira_issue)
+                # Copies go through pickling's __getstate__, which leaves dependencies behind
+                rewound.dependencies = jira_issue.dependencies
+                rewound.as_of = timestamp
+                for field in self._issue_fields.get(jira_issue.issue_key, []):
+                    if field not in jira_issue:
+                        continue
+                    entries = self._index[(jira_issue.issue_key, field)]
+                    first_after = bisect.bisect_right(entries, (timestamp, sys.maxsize))
+                    if first_after == len(entries):
+                        continue
+                    later = entries[first_after:] if field in self.MULTI_VALUED_FIELDS else [entries[first_after]]
+                    pending.append((rewound, field, [offset for _, offset in later]))
+                results.append(rewound)
+
+        if len(pending) > 0 and os.path.exists(self.data_file()):
+            with open(self.data_file(), 'rb') as data_file:
+                for rewound, field, offsets in pending:
+                    transitions = self._read(data_file, offsets)
+                    if field in self.RESOURCE_LIST_FIELDS:
+                        rewound[field] = self._undo_resource_list(rewound[field], transitions,
+                                                                  self.RESOURCE_LIST_FIELDS[field])
+                    elif field == 'issuelinks':
+                        links = self._undo_links(rewound[field], transitions)
+                        # Left as is when we can't rebuild a removed link
+                        if links is not None:
+                            rewound[field] = links
+                    elif field in self.MULTI_VALUED_FIELDS:
+                        rewound[field] = self._undo_multi_valued(rewound[field], transitions)
+                    elif field == self.LABELS_FIELD:
+                        # Matches str() of the list of labels
+                        from_string = transitions[0].from_string
+                        rewound[field] = str(from_string.split() if from_string is not None else [])
+                    else:
+                        # Matches how JiraIssue stores a field that was unset
+                        rewound[field] = str(transitions[0].from_string)
+        return results
+
+    @staticmethod
+    def _undo_resource_list(current, transitions, class_name):
+        # type: (str, List[FieldTransition], str) -> str
+        """
+        Members re-added are rendered without the id the changelog doesn't carry, i.e. <JIRA Component: name='A'>
+        """
+        members = re.findall(r'<JIRA [^>]*>', current)
+        for transition in reversed(transitions):
+            if transition.to_string is not None:
+                added = "name='{}'".format(transition.to_string)
+                members = [x for x in members if added not in x]
+            if transition.from_string is not None:
+                removed = "name='{}'".format(transition.from_string)
+                if not any(removed in x for x in members):
+                    members.append('<JIRA {}: {}>'.format(class_name, removed))
+        return '[{}]'.format(', '.join(members))
+
+    @classmethod
+    def _undo_links(cls, current, transitions):
+        # type: (str, List[FieldTransition]) -> Optional[str]
+        """
+        Undoes links added after the rewind point. A removed link can't be restored, as the changelog only names the
+        link type by its description, so we return None to leave the field as is.
+        """
+        links = [x for x in current.split(',') if x.count(':') == 2]
+        for transition in reversed(transitions):
+            if transition.from_string is not None:
+                return None
+            match = cls.LINKED_KEY_PATTERN.search(transition.to_string or '')
+            if match is None:
+                return None
+            added = [x for x in links if x.split(':')[0] == match.group(1)]
+            if len(added) > 0:
+                links.remove(added[0])
+        return ''.join('{},'.format(x) for x in links) if len(links) > 0 else '[]'
+
+    @staticmethod
+    def _undo_multi_valued(current, transitions):
+        # type: (str, List[FieldTransition]) -> str
+        values = [] if current in ('', '[]', 'None') else current.split(',')
+        for transition in reversed(transitions):
+            if transition.to_string in values:
+                values.remove(transition.to_string)
+            if transition.from_string is not None and transition.from_string not in values:
+                values.append(transition.from_string)
+        # JiraIssue stores an empty list of versions as its str()
+        return ','.join(values) if len(values) > 0 else '[]'
+
+    @staticmethod
+    def _created(jira_issue):
+        # type: (JiraIssue) -> int
+        """
+        :return: epoch seconds the issue was created, 0 if we don't know so it's never excluded
+        """
+        created = jira_epoch(jira_issue.get('created'))
+        return 0 if created is None else created
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            for file_name in [self.data_file(), self.index_file()]:
+                if os.path.isfile(file_name):
+                    os.remove(file_name)
+            self._index = None
+            self._issue_fields = {}
+            self._field_cache = {}
+            self._last_history_ids = {}
@@ -15,8 +15,8 @@
 import configparser
 import itertools
 import os
-import traceback
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import quote
 
 import requests
 from jira.client import JIRAError, JIRA
@@ -25,12 +25,19 @@ from requests.auth import HTTPBasicAuth
 from src import utils
 from src.jira_issue import JiraIssue
 from src.jira_project import JiraProject
+from src.query_cache import QueryCache
+from src.remote_issue_cache import RemoteIssueCache
+from src.request_scheduler import RequestScheduler
 from src.test_wrapped_jira_connection_stub import TestWrappedJiraConnectionStub
+from src.text_index import TextIndex
+from src.time_utils import current_time, from_config_time, hours_since, to_config_time
+from src.user_directory import UserDirectory
 from src.utils import (ConfigError, clear, decode, encode,
-                       encode_password, get_input, pick_value,
+                       encode_password, get_input, is_yes, pick_value,
                        save_argus_config, jira_connection_dir)
 
 if TYPE_CHECKING:
+    from datetime import datetime
     from src.jira_manager import JiraManager
 
 
@@ -40,8 +47,25 @@ class JiraConnection:
     Contains metadata for a jira connection and houses the resulting Jira object once connected
     """
 
-    def __init__(self, connection_name='unknown', url='unknown', user_name='unknown', password='unknown'):
-        self.possible_projects = []
+    # Users requested per page when refreshing our UserDirectory
+    USER_PAGE_SIZE = 1000
+
+    # Hours before pick_project lists the server's projects again
+    PROJECT_CATALOG_HOURS = 24
+
+    # Bumped whenever any connection gains or loses a cached JiraProject, so an IssueCatalog knows to reindex
+    project_generation = 0
+
+    def __init__(self, connection_name='unknown', url='unknown', user_name='unknown', password='unknown',
+                 requests_per_second=RequestScheduler.DEFAULT_REQUESTS_PER_SECOND, request_burst=RequestScheduler.DEFAULT_BURST):
+        """
+        :param requests_per_second: sustained request rate allowed against this JIRA instance. <= 0 for unlimited.
+        :param request_burst: number of requests allowed back to back before the rate limit kicks in
+        """
+        # Project keys on the server, cached in our config and refreshed every PROJECT_CATALOG_HOURS
+        self.possible_projects = []  # type: List[str]
+        self.projects_refreshed = None  # type: Optional[datetime]
+        self._project_index = None  # type: Optional[TextIndex]
 
         self.connection_name = connection_name
         self._url = url.rstrip('/')
@@ -49,6 +73,17 @@ class JiraConnection:
         self._pass = password
         self._wrapped_jira_connection = None
 
+        # Every request to this JIRA instance takes a token from here first
+        self.request_scheduler = RequestScheduler(requests_per_second, request_burst)
+
+        self.user_directory = UserDirectory(connection_name)
+
+        # Results of queries not backed by a cached JiraProject, i.e. escalations on projects we don't cache or ad hoc JQL
+        self.query_cache = QueryCache(self)
+
+        # Issues our cached issues link to on projects we don't cache, so dependency chains don't break at them
+        self.remote_issue_cache = RemoteIssueCache(connection_name)
+
         # Map of str -> JiraProject. Internal representation is simply name of project. We have a 1:many mapping of JiraConnection
         # to JiraProjects, and cannot have multiple projects with the same name on a single JIRA underlying object.
         self._cached_jira_projects = {}
@@ -96,8 +131,17 @@ class JiraConnection:
             user = decode(encode_password(), cp.get('Connection', 'user'))
             password = decode(encode_password(), cp.get('Connection', 'password'))
 
-            result = JiraConnection(connection_name, url, user, password)
-            result.possible_projects = cp.get('Connection', 'projects').split(',')
+            requests_per_second = RequestScheduler.DEFAULT_REQUESTS_PER_SECOND
+            if cp.has_option('Connection', 'requests_per_second'):
+                requests_per_second = cp.getfloat('Connection', 'requests_per_second')
+            request_burst = RequestScheduler.DEFAULT_BURST
+            if cp.has_option('Connection', 'request_burst'):
+                request_burst = cp.getint('Connection', 'request_burst')
+
+            result = JiraConnection(connection_name, url, user, password, requests_per_second, request_burst)
+            result.possible_projects = [x for x in cp.get('Connection', 'projects').split(',') if x != '']
+            if cp.has_option('Connection', 'projects_refreshed'):
+                result.projects_refreshed = from_config_time(cp.get('Connection', 'projects_refreshed'))
 
             return result
         except configparser.NoOptionError as e:
@@ -114,6 +158,10 @@ class JiraConnection:
         config_parser.set('Connection', 'user', encode(encode_password(), self._user))
         config_parser.set('Connection', 'password', encode(encode_password(), self._pass))
         config_parser.set('Connection', 'projects', ','.join(self.possible_projects))
+        if self.projects_refreshed is not None:
+            config_parser.set('Connection', 'projects_refreshed', to_config_time(self.projects_refreshed))
+        config_parser.set('Connection', 'requests_per_second', str(self.request_scheduler.requests_per_second))
+        config_parser.set('Connection', 'request_burst', str(self.request_scheduler.burst))
 
         save_argus_config(config_parser, self._build_config(self.connection_name))
 
@@ -123,82 +171,147 @@ class JiraConnection:
         Having pick_assignees return an array of size 1 is very error prone. This wraps that.
         """
         result = self.pick_assignees(1)
-        if result is None:
+        if not result:
             return None
         return result[0]
 
     def pick_assignees(self, max_count):
         # type: (int) -> Optional[List[str]]
         """
-        The available user count can be untenable for caching offline so we rely on the REST API rather than caching.
+        Searches our locally cached UserDirectory, falling back to a live user search only on a local miss.
         :param: max_count [int] value >= 1 of max # of users to return
-        :return: list of selected assignees
+        :return: list of selected assignees, None if none were picked
         """
 
         result = []  # type: List[str]
 
+        if len(self.user_directory) == 0:
+            for issue_list in self.cached_jira_issues:
+                self.user_directory.harvest(issue_list)
+        if self.user_directory.is_stale and not utils.unit_test:
+            self.refresh_user_directory()
+
+        msg = 'Enter a substring to search assignee names for (real name, not UserName), [r] to refresh the user list, [q] to Quit:'
         while True:
-            issue_key = get_input('Input ticket name (PROJ-#) to enumerate possible assignees:')
+            snippet = get_input(msg, lowered=False)
+            if snippet == 'q':
+                return result if len(result) > 0 else None
+            elif snippet == 'r':
+                self.refresh_user_directory()
+                continue
 
-            if issue_key == 'q':
-                return None
-            elif '-' not in issue_key:
-                print('Invalid issue key (missing -). Aborting.')
-            else:
-                break
+            matched = self.user_directory.search(snippet)
+            if len(matched) == 0 and not utils.unit_test:
+                matched = self._search_users(snippet)
+            if len(matched) == 0:
+                matched = self.user_directory.fuzzy(snippet)
+                if len(matched) != 0:
+                    print('No users matching {}. Closest matches:'.format(snippet))
+            if len(matched) == 0:
+                print('No users matching {}. Try again.'.format(snippet))
+                continue
 
-        # case sensitive
-        issue_key = issue_key.upper()
+            picked = pick_value(header='Which of the following assignees matching substring: {}?'.format(snippet),
+                                options=matched,
+                                allow_exit=True,
+                                exit_text='Enter another substring',
+                                sort=True,
+                                silent=False)
+            if picked is not None and self._confirm_display_name(picked):
+                print('Added {}'.format(picked))
+                msg = 'Enter another substring to search for, [q] to Quit:'
+                result.append(picked)
+                if len(result) == max_count:
+                    return result
 
-        msg = 'Enter a substring to search assignee names for (real name, not UserName), [q] to Quit:'
+    def _confirm_display_name(self, display_name):
+        # type: (str) -> bool
+        """
+        Issues only name their assignee by display name, so picking one shared by several users picks all of them
+        """
+        user_names = self.user_directory.user_names(display_name)
+        if len(user_names) < 2:
+            return True
+        print('{} is the display name of {} users: {}. Issues don\'t tell them apart, so work for any of them will '
+              'match.'.format(display_name, len(user_names), ', '.join(user_names)))
+        return is_yes('Add {} anyway?'.format(display_name))
+
+    def refresh_user_directory(self):
+        # type: () -> None
+        """
+        Pages through the assignable users of each cached project into our UserDirectory. Failures leave the directory
+        as it was, so picking keeps working offline.
+        """
+        if len(self._cached_jira_projects) == 0:
+            print('No cached projects on {} to list assignable users from; relying on searches.'.format(self.connection_name))
+            return
+        print('Refreshing assignable users for {}...'.format(self.connection_name))
+        users = {}  # type: Dict[str, str]
         try:
-            while True:
-                snippet = get_input(msg, lowered=False)
-                if snippet == 'q':
-                    return result
-                url = '{}/rest/api/2/user/assignable/search?username={}&project={}&issueKey={}'.format(
-                    self._url,
-                    snippet,
-                    issue_key.split('-')[0],
-                    issue_key)
-                print('Querying user matches...')
-                response = requests.get(url, auth=HTTPBasicAuth(self._user, self._pass))
-                if response.status_code == 404:
-                    print('Got a 404 on url: {}. Likely a missing issue, but could be a bug. Try again.'.format(url))
-                    return None
-                elif response.status_code != 200:
-                    raise ConfigError(
-                        'Failed to retrieve assignees for project: {} matching substring: {}. HTTP return code: {}. url: {}'.format(
-                            self.connection_name, snippet, response.status_code, url))
-
-                matched = []
-                for val in response.json():
-                    matched.append(val['displayName'])
-                if len(matched) != 0:
-                    picked = pick_value(header='Which of the following assignees matching substring: {}?'.format(snippet),
-                                        options=matched,
-                                        allow_exit=True,
-                                        exit_text='Enter another substring',
-                                        sort=True,
-                                        silent=False)
-                    if picked is not None:
-                        print('Added {}'.format(picked))
-                        msg = 'Enter another substring to search for, [q] to Quit:'
-                        result.append(picked)
-                        if len(result) == max_count:
-                            return result
-        except (JIRAError, ConfigError):
-            print('Received error attempting to query user from JIRA. Aborting.')
-            traceback.print_exc()
-            return None
+            for project_name in sorted(self._cached_jira_projects.keys()):
+                start_at = 0
+                while True:
+                    page = self._get_user_list('{}/rest/api/2/user/assignable/search?project={}&startAt={}&maxResults={}'.format(
+                        self._url, project_name, start_at, JiraConnection.USER_PAGE_SIZE))
+                    users.update(self._by_user_name(page))
+                    # Page on what the server sent, not on what's new to us
+                    if len(page) < JiraConnection.USER_PAGE_SIZE:
+                        break
+                    start_at += len(page)
+        except (requests.RequestException, ConfigError) as e:
+            print('Failed to refresh users for {}; using the local copy. Error: {}'.format(self.connection_name, e))
+            return
+        added = self.user_directory.add_users(users, refreshed=True)
+        print('Found {} new users. {} users known.'.format(added, len(self.user_directory)))
+
+    def _search_users(self, snippet):
+        # type: (str) -> List[str]
+        """
+        Live search, merging whatever it finds into our UserDirectory
+        :return: display names matching snippet, empty if the server can't be reached
+        """
+        print('No local matches. Querying user matches...')
+        try:
+            users = self._get_users('{}/rest/api/2/user/search?username={}'.format(self._url, quote(snippet)))
+        except (requests.RequestException, ConfigError) as e:
+            print('Failed to search users on {}: {}'.format(self.connection_name, e))
+            return []
+        self.user_directory.add_users(users)
+        return sorted(set(users.values()))
+
+    def _get_users(self, url):
+        # type: (str) -> Dict[str, str]
+        """
+        :return: user name -> display name for the users listed at a user search url
+        """
+        return self._by_user_name(self._get_user_list(url))
+
+    def _get_user_list(self, url):
+        # type: (str) -> List[Dict]
+        """
+        :return: raw user dicts listed at a user search url
+        """
+        response = self._get(url)
+        if response.status_code != 200:
+            raise ConfigError('Failed to retrieve users for connection: {}. HTTP return code: {}. url: {}'.format(
+                self.connection_name, response.status_code, url))
+        return response.json()
+
+    @staticmethod
+    def _by_user_name(raw_users):
+        # type: (List[Dict]) -> Dict[str, str]
+        return {x['name']: x['displayName'] for x in raw_users if x.get('name') is not None}
 
     def pick_project(self, skip_cached=False):
         # type: (bool) -> Optional[str]
-        self._refresh_project_names()
-        coll = self.possible_projects[:]
-        if skip_cached:
-            for project_name in list(self._cached_jira_projects.keys()):
-                coll.remove(project_name)
+        """
+        Searches our cached project catalog, listing the server's projects again only once the catalog is older than
+        PROJECT_CATALOG_HOURS or on a search that matches nothing in it.
+        """
+        refreshed = False
+        if self.project_catalog_is_stale:
+            self._refresh_project_names()
+            refreshed = True
 
         pick = None
         # Loop to allow trying different substrings
@@ -206,47 +319,80 @@ class JiraConnection:
             ss = get_input('Enter portion of name (\'q\' to quit):', lowered=False)
             if ss.lower() == 'q':
                 return None
-            matches = sorted([x for x in coll if ss in x])
+            matches = self._matching_projects(ss, skip_cached)
+            if len(matches) == 0 and not refreshed:
+                print('No matches in the cached project list. Checking the server for new projects.')
+                self._refresh_project_names()
+                refreshed = True
+                matches = self._matching_projects(ss, skip_cached)
             if len(matches) == 0:
-                print('No matches found. Try again.')
-                continue
+                suggestions = [x for x in self._projects_index().fuzzy(ss)
+                               if not (skip_cached and x in self._cached_jira_projects)]
+                if len(suggestions) == 0:
+                    print('No matches found. Try again.')
+                    continue
+                print('No matches found. Closest matches:')
+                matches = suggestions
             pick = pick_value('Which:', matches, True, 'Enter different substring')
             if pick is None:
                 clear()
         return pick
 
+    @property
+    def project_catalog_is_stale(self):
+        # type: () -> bool
+        return len(self.possible_projects) == 0 or self.projects_refreshed is None or \
+            hours_since(self.projects_refreshed) >= JiraConnection.PROJECT_CATALOG_HOURS
+
+    def _matching_projects(self, substring, skip_cached):
+        # type: (str, bool) -> List[str]
+        return [x for x in self._projects_index().search(substring)
+                if not (skip_cached and x in self._cached_jira_projects)]
+
+    def _projects_index(self):
+        # type: () -> TextIndex
+        if self._project_index is None:
+            self._project_index = TextIndex(self.possible_projects)
+        return self._project_index
+
     def _refresh_project_names(self):
         # Cache project names locally within this object
         print('Querying project names from {}'.format(self.connection_name))
-        projects = self._wrapped_jira_connection.projects()
+        projects = self.request_scheduler.call(self._wrapped_jira_connection.projects)
         self.possible_projects = []
         for p in projects:
             if 'deprecated' not in p.name:
                 self.possible_projects.append(p.key)
+        self.projects_refreshed = current_time()
+        self._project_index = None
         print('Added {} projects to connection: {}'.format(len(self.possible_projects), self.connection_name))
 
         if len(self.possible_projects) == 0:
             print('No projects found in {}.'.format(self.connection_name))
+        self.save_config()
 
     def add_and_link_jira_project(self, jira_project):
         # type: (JiraProject) -> None
         # just overwrite it if we already have one with this name. Expected on init.
         self._cached_jira_projects[jira_project.project_name] = jira_project
         jira_project.jira_connection = self
+        JiraConnection.project_generation += 1
 
-    def cache_new_jira_project(self, jira_manager: 'JiraManager') -> None:
+    def cache_new_jira_project(self, jira_manager: 'JiraManager') -> Optional[JiraProject]:
         project_name = self.pick_project(True)
         if project_name is None:
-            return
+            return None
         # Since we key off issue name for dependency chain resolution, we disallow duplicate JiraProject names on multiple
         # JiraConnections.
         if jira_manager.is_project_name_used(project_name):
             print('WARNING! Requested use of duplicate project name {} which is already cached on an active JiraConnection. This is not currently supported.')
-            return
+            return None
         new_project = JiraProject(self, project_name, self._url)
         new_project.refresh()
         new_project.save_config()
         self._cached_jira_projects[project_name] = new_project
+        JiraConnection.project_generation += 1
+        return new_project
 
     def maybe_get_cached_jira_project(self, project_name):
         # type: (str) -> Optional[JiraProject]
@@ -265,7 +411,26 @@ class JiraConnection:
 
     @property
     def cached_jira_issues(self) -> List[List[JiraIssue]]:
-        return list(itertools.chain([list(x.jira_issues.values()) for x in list(self._cached_jira_projects.values())]))
+        """
+        Pins the current snapshot of each cached JiraProject, so callers iterate a consistent set of issues while the
+        background sync publishes new ones.
+        """
+        return list(itertools.chain([list(x.snapshot().issues.values()) for x in list(self._cached_jira_projects.values())]))
+
+    def cached_jira_issues_closed_since(self, timestamp: Optional[int]) -> List[List[JiraIssue]]:
+        """
+        As cached_jira_issues, plus cold issues from any JiraProject whose retention window doesn't reach back to timestamp
+        :param timestamp: epoch seconds, None for every closed issue we hold
+        """
+        return [x.issues_closed_since(timestamp) for x in list(self._cached_jira_projects.values())]
+
+    def cached_jira_issues_as_of(self, timestamp: int) -> List[List[JiraIssue]]:
+        """
+        As cached_jira_issues, rewound through each JiraProject's IssueHistory to their state at timestamp (epoch seconds).
+        Issues closed since then were open at the time, so cold ones are faulted in as needed.
+        """
+        return [x.history.issues_as_of(x.issues_closed_since(timestamp), timestamp)
+                for x in list(self._cached_jira_projects.values())]
 
     def update_all_cached_jira_projects(self):
         for cached_project in list(self._cached_jira_projects.values()):
@@ -275,11 +440,15 @@ class JiraConnection:
         jira_project = self._cached_jira_projects.pop(cached_project_name, None)
         if jira_project is None:
             return
+        JiraConnection.project_generation += 1
         jira_project.delete_on_disk_files()
 
     def delete_cached_project_data(self):
         for cached_data in list(self._cached_jira_projects.values()):
             cached_data.delete_on_disk_files()
+        self.user_directory.delete_on_disk_files()
+        self.query_cache.delete_on_disk_files()
+        self.remote_issue_cache.delete_on_disk_files()
 
     def delete_owned_views(self, jira_manager):
         to_remove = []
@@ -294,7 +463,42 @@ class JiraConnection:
         return project_name in self.possible_projects
 
     def search_issues(self, *args, **kwargs):
-        return self._wrapped_jira_connection.search_issues(*args, **kwargs)
+        return self.request_scheduler.call(self._wrapped_jira_connection.search_issues, *args, **kwargs)
+
+    def search_issues_json(self, jql, start_at=0, max_results=100, fields='*all', expand=None, validate_query=True):
+        # type: (str, int, int, str, Optional[str], bool) -> Dict
+        """
+        Queries /rest/api/2/search through the wrapped JIRA object's pooled session, returning the raw response dict
+        ({'total': int, 'issues': [...]}) without building a jira.Issue Resource tree for every result.
+        """
+        return self.request_scheduler.call(self._wrapped_jira_connection.search_issues, jql, startAt=start_at,
+                                           maxResults=max_results, validate_query=validate_query, fields=fields,
+                                           expand=expand, json_result=True)
+
+    def get_issue_changelog(self, issue_key):
+        # type: (str) -> List[Dict]
+        """
+        Pulls the full changelog for a single issue, for when search results only carry a truncated one
+        :return: raw REST changelog 'histories' list, empty on error
+        """
+        response = self._get('{}/rest/api/2/issue/{}?fields=key&expand=changelog'.format(self._url, issue_key))
+        if response.status_code != 200:
+            print('Failed to retrieve changelog for {}. HTTP return code: {}'.format(issue_key, response.status_code))
+            return []
+        return response.json().get('changelog', {}).get('histories', [])
+
+    def _get(self, url):
+        # type: (str) -> requests.Response
+        """
+        Raw REST GET for endpoints the jira library doesn't wrap, through our RequestScheduler. Honors a single
+        Retry-After on HTTP 429 before handing the response back.
+        """
+        response = self.request_scheduler.call(requests.get, url, auth=HTTPBasicAuth(self._user, self._pass))
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            self.request_scheduler.back_off(float(retry_after) if retry_after.isdigit() else 5)
+            response = self.request_scheduler.call(requests.get, url, auth=HTTPBasicAuth(self._user, self._pass))
+        return response
 
     @property
     def url(self):
@@ -309,6 +513,7 @@ class JiraConnection:
             conn=self.connection_name,
             url=self._url,
             user=self._user)
+        result += os.linesep + '   Requests: {}'.format(self.request_scheduler.stats())
         for cached_project in list(self._cached_jira_projects.values()):
             result += os.linesep + '   |-{}'.format(cached_project)
         return result
@@ -14,7 +14,7 @@
 
 from configparser import RawConfigParser
 from subprocess import Popen
-from typing import Dict, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 
 from src.jira_view import JiraView
@@ -25,6 +25,7 @@ from .display_filter import DisplayFilter
 
 if TYPE_CHECKING:
     from src.display_filter import Column
+    from src.jira_issue import JiraIssue
     from src.jira_manager import JiraManager
 
 
@@ -72,21 +73,32 @@ class JiraDashboard:
 
         return JiraDashboard(dash_name, dash_views)
 
-    def display_dashboard(self, jira_manager: 'JiraManager', jira_views: Dict[str, JiraView]) -> None:
-        df = DisplayFilter.default()
-
+    def _get_matching_issues(self) -> List['JiraIssue']:
         matching_issues = []
         for jira_view in list(self._jira_views.values()):
             matching_issues.extend(list(jira_view.get_issues().values()))
+        return matching_issues
+
+    def display_dashboard(self, jira_manager: 'JiraManager', jira_views: Dict[str, JiraView]) -> None:
+        df = DisplayFilter.default()
+        # Incoming dependencies, so what's holding others up stands out
+        df.include_column(DisplayFilter.BLOCKING_STRING, DisplayFilter.BLOCKING_STRING, 8, 1)
+
+        matching_issues = self._get_matching_issues()
+        # Projects backing an open dashboard always get refreshed first; [r] picks up the results
+        jira_manager.note_displayed_issues(matching_issues, refresh=True)
 
         filters = {}  # type: Dict[Column, str]
         while True:
             filtered_issues = df.display_and_return_sorted_issues(jira_manager, matching_issues, 1, filters)
             print_separator(60)
-            prompt = 'Input [#] integer value to open ticket in browser, [f] to filter column by string, [c] to clear filters, [q] to quit'
+            print('Sync: {}'.format(jira_manager.sync_status()))
+            prompt = 'Input [#] integer value to open ticket in browser, [f] to filter column by string, [c] to clear filters, [r] to reload results, [q] to quit'
             custom = get_input(prompt)
             if custom == 'q':
                 return
+            elif custom == 'r':
+                matching_issues = self._get_matching_issues()
             elif custom == 'f':
                 column_name = pick_value('Filter against which column?', [column.name for column in df.included_columns], True)
                 if column_name is None:
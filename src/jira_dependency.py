@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 from src.utils import print_separator
 
@@ -69,26 +69,31 @@ class JiraDependency:
         'Problem/Incident:outward': '',
     }
 
-    def __init__(self, raw_data: str, jira_manager: 'JiraManager') -> None:
+    # pretty_type()s where the target has to be finished before the source can be, i.e. those that drag the target into a
+    # release along with the source
+    blocking_types = {'blocked by', 'depends on', 'requires', 'parent of', 'contains', 'includes', 'incorporates'}
+
+    def __init__(self, raw_data: Union[str, Tuple[str, str, str]], jira_manager: 'JiraManager') -> None:
         """
         Expects input in format: 'issue_id:relationship_type:direction'. We expect we will come across links to issues that are not cached
         locally on the host, so make certain you catch ConfigErrors from this constructor. Throws AssertionError on invalid input
         data.
-        :param raw_data: string in format 'issuekey:relationship_type:direction'
+        :param raw_data: string in format 'issuekey:relationship_type:direction', or those fields already split and
+            validated, i.e. from JiraIssue.parsed_links
         :param jira_manager: We take the JiraManager object on construction in order to translate a string issuekey into a ref
         """
-        fields = JiraDependency.validate_input_data(raw_data)
+        fields = raw_data if isinstance(raw_data, tuple) else JiraDependency.validate_input_data(raw_data)
         target_issue_key = fields[0]
-        target_jira_issue = jira_manager.get_jira_issue(target_issue_key)
+        # Links into projects unloaded to stay within the memory budget are left on a placeholder, which the IssueCatalog
+        # retargets once the project is reloaded, rather than reloading it here
+        target_jira_issue = jira_manager.get_jira_issue(target_issue_key, fault_in=False)
 
         # If we did not find the JiraIssue cached offline, we both create a dummy that we can use to at least print the
         # issuekey during DisplayFilter printing, and we also increment the count of unknown issues for this project.
         if target_jira_issue is None:
             project = target_issue_key.split('-')[0]
-            if project not in jira_manager.missing_project_counts:
-                jira_manager.missing_project_counts[project] = 1
-            else:
-                jira_manager.missing_project_counts[project] += 1
+            if not jira_manager.issue_catalog.is_unloaded(target_issue_key):
+                jira_manager.missing_project_counts[project] = jira_manager.missing_project_counts.get(project, 0) + 1
             target_jira_issue = jira_manager.create_non_cached_issue(target_issue_key)
 
         self.target = target_jira_issue
@@ -113,6 +118,9 @@ class JiraDependency:
             return None
         return JiraDependency.dep_map[key]
 
+    def is_blocking(self) -> bool:
+        return self.pretty_type() in JiraDependency.blocking_types
+
     @staticmethod
     def print_unknown_dependency_types() -> None:
         print_separator(30)
@@ -22,7 +22,7 @@ if TYPE_CHECKING:
     from src.jira_connection import JiraConnection
     from src.jira_manager import JiraManager
     from src.jira_issue import JiraIssue
-    from typing import List
+    from typing import List, Optional, Tuple
 
 
 class JiraFilter:
@@ -38,6 +38,28 @@ class JiraFilter:
     we can only have a single JiraConnection associated with any given view.
     """
 
+    # Our filter names that differ from their JQL field. Anything else not LOCAL_ONLY_FIELDS is taken as a (custom) field
+    # name, which JQL accepts quoted.
+    JQL_FIELDS = {'Project': 'project', 'type': 'issuetype', 'component': 'component', 'fixVersion': 'fixVersion',
+                  'resolution': 'resolution', 'priority': 'priority', 'labels': 'labels', 'assignee': 'assignee',
+                  'reporter': 'reporter', 'summary': 'summary', 'description': 'description',
+                  'environment': 'environment'}
+
+    # Matched locally as a substring, so queried through JQL's text search rather than =. Custom fields other than
+    # USER_FIELDS are taken as text too.
+    TEXT_FIELDS = {'summary', 'description', 'environment'}
+
+    # Multi-valued, so matched locally as a substring of all the values joined: 4.0 matches an issue on 4.0.1, which
+    # JQL's = wouldn't, and JQL has no substring search on these. Only single-valued fields like project and
+    # issuetype, where users give whole names, translate to =.
+    SUBSTRING_FIELDS = {'component', 'fixVersion', 'labels'}
+
+    # Derived from locally resolved dependencies, so there's nothing to push down to the server
+    LOCAL_ONLY_FIELDS = {'blocks', 'is_blocked', 'linked'}
+
+    # Matched locally against display names, but JQL wants user names, i.e. all of those going by the display name
+    USER_FIELDS = {'assignee', 'reporter', 'reviewer', 'reviewer2'}
+
     def __init__(self, field, jira_connection, query_type='AND', includes=None, excludes=None):
         # type: (str, JiraConnection, str, List[str], List[str]) -> None
         self._field = field
@@ -141,6 +163,76 @@ class JiraFilter:
         # type: (JiraIssue) -> bool
         return self._internal_matching_operation(jira_issue, self._excludes)
 
+    def to_jql(self):
+        # type: () -> Optional[Tuple[Optional[str], Optional[str]]]
+        """
+        Translates this filter for running server-side. Includes combine per query_type (all must match on AND, any on
+        OR), and the exclude clause is the negation of the excludes combined the same way. Issues with no value for the
+        field don't match the includes but aren't excluded either. JiraView.build_jql decides how the two combine.
+        :return: (include clause, exclude clause), either None if we have no values for it, or None if JQL can't match
+            the way we do locally, i.e. on dependency-derived or multi-valued fields, or users we can't name
+        """
+        if self._field in JiraFilter.LOCAL_ONLY_FIELDS or self._field in JiraFilter.SUBSTRING_FIELDS:
+            return None
+        field = JiraFilter.JQL_FIELDS.get(self._field, '"{}"'.format(self._field))
+
+        include_terms = [self._jql_term(field, x) for x in self._includes]
+        exclude_terms = [self._jql_term(field, x, True) for x in self._excludes]
+        if None in include_terms or None in exclude_terms:
+            return None
+
+        include_clause = None
+        if len(include_terms) > 0:
+            include_clause = '({})'.format(' {} '.format(self._query_type).join(include_terms))
+
+        exclude_clause = None
+        if len(exclude_terms) > 0:
+            # NOT (a AND b) -> NOT a OR NOT b, and vice versa
+            negated_join = ' OR ' if self._query_type == 'AND' else ' AND '
+            exclude_clause = '({})'.format(negated_join.join(exclude_terms))
+        return include_clause, exclude_clause
+
+    def _jql_term(self, field, value, negate=False):
+        # type: (str, str, bool) -> Optional[str]
+        """
+        :return: None if value doesn't translate, i.e. a display name we don't know the user name for. JIRA rejects
+            the whole query on an unknown user.
+        """
+        # 'None' is how we store Unresolved, see include()
+        if value == 'None':
+            return '{} is {}EMPTY'.format(field, 'not ' if negate else '')
+        if self._field in JiraFilter.USER_FIELDS:
+            user_names = self._jira_connection.user_directory.user_names(value)
+            if len(user_names) == 0:
+                return None
+            if len(user_names) > 1:
+                # Issues only carry display names, so locally we match every user going by this one
+                quoted = '({})'.format(', '.join([self._quote(x) for x in user_names]))
+                operator = 'in'
+            else:
+                quoted = self._quote(user_names[0])
+                operator = '='
+        else:
+            quoted = self._quote(value)
+            operator = '~' if self._is_text_field() else '='
+        if negate:
+            # JQL's != never matches an empty field, where locally an issue without the field isn't excluded
+            negated = 'not in' if operator == 'in' else '!{}'.format(operator)
+            return '({field} is EMPTY OR {field} {operator} {value})'.format(
+                field=field, operator=negated, value=quoted)
+        return '{} {} {}'.format(field, operator, quoted)
+
+    @staticmethod
+    def _quote(value):
+        # type: (str) -> str
+        return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+
+    def _is_text_field(self):
+        # type: () -> bool
+        if self._field in JiraFilter.TEXT_FIELDS:
+            return True
+        return self._field not in JiraFilter.JQL_FIELDS and self._field not in JiraFilter.USER_FIELDS
+
     def extract_value(self, jira_issue):
         # type: (JiraIssue) -> str
         translated = self._translate_field(jira_issue)
@@ -153,6 +245,11 @@ class JiraFilter:
         # type: () -> str
         return self._field
 
+    @property
+    def includes(self):
+        # type: () -> List[str]
+        return list(self._includes)
+
     def set_field_name(self, value):
         # type: (str) -> None
         self._field = value
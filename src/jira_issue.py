@@ -15,11 +15,11 @@
 import os
 import pickle
 import re
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 import six
 from jira import Issue
-from jira.resources import Version
+from jira.resources import Resource, Version, cls_for_resource
 
 from src.jira_dependency import JiraDependency
 from src.utils import ConfigError
@@ -47,16 +47,7 @@ class JiraIssue(dict):
             through here.
         """
         super(JiraIssue, self).__init__(**kwargs)
-        if jira_connection:
-            self.jira_connection_name = jira_connection.connection_name
-        else:
-            self.jira_connection_name = 'None'
-        self.issue_key = issue.key
-        self.dependencies = set()  # type: Set[JiraDependency]
-        self.version = 1
-
-        # bool indicates whether this is a fully functional JiraIssue or just a dummy placeholder w/issuekey for dep resolution
-        self.is_cached_offline = True
+        self._init_metadata(jira_connection.connection_name if jira_connection else 'None', issue.key)
 
         # We convert from the issue.fields dict object into local attributes of the JiraIssue rather than nesting
         # them inside a separate collection.
@@ -105,6 +96,86 @@ class JiraIssue(dict):
                 else:
                     dict.__setitem__(self, str(k), str(v))
 
+    def _init_metadata(self, jira_connection_name: str, issue_key: str) -> None:
+        self.jira_connection_name = jira_connection_name
+        self.issue_key = issue_key
+        self.dependencies = set()  # type: Set[JiraDependency]
+        self.version = 1
+
+        # bool indicates whether this is a fully functional JiraIssue or just a dummy placeholder w/issuekey for dep resolution
+        self.is_cached_offline = True
+
+    @classmethod
+    def from_json(cls, jira_connection_name: str, raw_issue: Dict) -> 'JiraIssue':
+        """
+        Converts a raw issue dict from /rest/api/2/search straight into our cached format, skipping the nested jira.Resource
+        construction the jira library performs per result. Produces the same field values as the Resource based __init__
+        for everything we consume. Values the Resource path can only render as an object address (nested objects w/out a
+        readable id, i.e. progress, timetracking, watches) are rendered deterministically from the raw dict instead.
+        Takes a connection name rather than a JiraConnection so it can run in a worker process.
+        """
+        result = cls.__new__(cls)
+        dict.__init__(result)
+        result._init_metadata(jira_connection_name, raw_issue['key'])
+
+        fields = raw_issue.get('fields')
+        if not fields:
+            return result
+
+        for k, v in six.iteritems(fields):
+            if k == 'issuelinks' and len(v) > 0:
+                result_str = ''
+                for member in v:
+                    if 'inwardIssue' in member:
+                        relation_direction = 'inward'
+                        related = member['inwardIssue']
+                    else:
+                        relation_direction = 'outward'
+                        related = member['outwardIssue']
+                    result_str += '{}:{}:{},'.format(
+                        JiraIssue._json_str(related), JiraIssue._json_str(member['type']), relation_direction)
+                dict.__setitem__(result, 'issuelinks', result_str)
+            elif k == 'fixVersions' and len(v) > 0:
+                dict.__setitem__(result, 'fixVersions', ','.join([str(version['name']) for version in v]))
+            else:
+                dict.__setitem__(result, str(k), JiraIssue._json_str(v))
+        return result
+
+    @staticmethod
+    def _json_str(value) -> str:
+        """
+        Mirrors str() of the object jira.resources.dict2resource would have built from this raw value
+        """
+        if isinstance(value, dict):
+            if 'self' in value:
+                for name in Resource._READABLE_IDS:
+                    if name in value:
+                        pretty_name = str(value[name])
+                        # Nested select fields include their child
+                        if 'child' in value:
+                            pretty_name += ' - ' + JiraIssue._json_str(value['child'])
+                        return pretty_name
+                return JiraIssue._json_repr(value)
+            return str(value)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            return '[{}]'.format(', '.join([JiraIssue._json_repr(member) for member in value]))
+        return str(value)
+
+    @staticmethod
+    def _json_repr(value) -> str:
+        """
+        Mirrors repr() of a member of a list as built by jira.resources.dict2resource
+        """
+        if isinstance(value, dict):
+            if 'self' not in value:
+                return repr(value)
+            names = ['{}={}'.format(name, repr(value[name])) for name in Resource._READABLE_IDS if name in value]
+            class_name = cls_for_resource(value['self']).__name__
+            if len(names) == 0:
+                return '<JIRA {}>'.format(class_name)
+            return '<JIRA {}: {}>'.format(class_name, ', '.join(names))
+        return repr(value)
+
     @staticmethod
     def non_cached_issue(issue_key: str) -> 'JiraIssue':
         """
@@ -113,6 +184,8 @@ class JiraIssue(dict):
         """
         new_issue = Issue(None, None)
         new_issue.key = issue_key
+        # Newer jira releases raise on access to fields that were never set rather than returning None
+        new_issue.fields = None
         result = JiraIssue(None, new_issue)
         result['relationship'] = 'MISSING CHAIN'
         result['summary'] = 'BREAK IN CHAIN. Cache offline to see deps.'
@@ -278,27 +351,53 @@ class JiraIssue(dict):
         """
         issuelinks field is stored as a string with format ['issue1','issue2','issue3']. We do this for ser/deser cleanliness
         and then materialize those links in memory as references to other JiraIssues after all cached projects are loaded
-        from disk.
+        from disk. Links to issues we can't find point at a placeholder. The IssueCatalog tracks every link, retargeting
+        it once the issue turns up or is replaced by a sync or reload.
         """
-        # Create the object if pickle loading didn't deser the empty set
-        if not hasattr(self, 'dependencies'):
-            self.dependencies = set()  # type: Set[JiraDependency]
-
-        if len(self['issuelinks']) != 0:
-            dep_array = self['issuelinks'].split(',')
-            for dep_str in dep_array:
-                # We have a few ways this can 'no-op', so we protect against them and skip here.
-                if dep_str is None or dep_str == '' or dep_str == '[]':
-                    continue
+        # Built up separately and swapped in so readers traversing a published issue never see the set change size
+        dependencies = set()  # type: Set[JiraDependency]
+        for link in self.parsed_links():
+            dependency = JiraDependency(link, jira_manager)
+            jira_manager.issue_catalog.track(dependency)
+            dependencies.add(dependency)
+        self.dependencies = dependencies
+        self._resolved = True
 
-                try:
-                    dependency = JiraDependency(dep_str, jira_manager)
-                except AssertionError as ae:
-                    print('Got bad input as dependency string on issue: {}.'.format(self.issue_key))
-                    print(ae)
-                    continue
+    @property
+    def needs_resolution(self) -> bool:
+        """
+        True until resolve_dependencies has run on this object. Not persisted, as neither are our dependencies.
+        """
+        return not getattr(self, '_resolved', False)
 
-                self.dependencies.add(dependency)
+    def parsed_links(self) -> List[Tuple[str, str, str]]:
+        """
+        issuelinks split into (issue key, type, direction). Kept on the issue, and so in its pickle, until issuelinks
+        changes, so loading from disk doesn't split them all again.
+        """
+        raw_links = self.get('issuelinks', '')
+        if getattr(self, '_links_source', None) == raw_links:
+            return self._parsed_links
+
+        parsed_links = []  # type: List[Tuple[str, str, str]]
+        for dep_str in raw_links.split(',') if len(raw_links) != 0 else []:
+            # We have a few ways this can 'no-op', so we protect against them and skip here.
+            if dep_str is None or dep_str == '' or dep_str == '[]':
+                continue
+            try:
+                parsed_links.append(tuple(JiraDependency.validate_input_data(dep_str)))
+            except AssertionError as ae:
+                print('Got bad input as dependency string on issue: {}.'.format(self.issue_key))
+                print(ae)
+        self._parsed_links = parsed_links
+        self._links_source = raw_links
+        return parsed_links
+
+    def linked_issue_keys(self) -> List[str]:
+        """
+        Keys of the issues this one links to, straight from the serialized issuelinks without resolving them
+        """
+        return [x[0] for x in self.parsed_links()]
 
     def __hash__(self):
         """
@@ -315,6 +414,18 @@ class JiraIssue(dict):
             result += os.linesep + '   {}:{},'.format(k, v)
         return result
 
+    def __getstate__(self):
+        # Dependencies hold the linked issues, and transitively whatever those link to, so pickling them would write
+        # stale copies of a whole component into every data file. resolve_dependencies rebuilds them from parsed_links.
+        state = dict(self.__dict__)
+        state.pop('_resolved', None)
+        state.pop('dependencies', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.dependencies = set()
+
     def serialize(self, file_handle):
         # Do not save dummy placeholders to disk
         if not self.is_cached_offline:
@@ -16,20 +16,30 @@ import configparser
 import getpass
 import os
 import traceback
+from datetime import datetime
 
 from jira import JIRAError
-from typing import Dict, Optional, List, TYPE_CHECKING
+from typing import Dict, Optional, List, Set, Tuple, TYPE_CHECKING
 
-from src import utils
+from src import time_utils, utils
+from src.dependency_graph import DependencyGraph
 from src.display_filter import DisplayFilter
+from src.flow_metrics import FlowMetrics
+from src.issue_catalog import IssueCatalog
+from src.issue_history import IssueHistory
 from src.jira_connection import JiraConnection
 from src.jira_dashboard import JiraDashboard
 from src.jira_dependency import JiraDependency
 from src.jira_filter import JiraFilter
-from src.jira_project import JiraProject
+from src.jira_project import JiraProject, JiraProjectSnapshot
+from src.jira_sync_worker import JiraSyncWorker
 from src.jira_utils import JiraUtils
 from src.jira_issue import JiraIssue
 from src.jira_view import JiraView
+from src.jira_webhook import JiraWebhookReceiver
+from src.project_residency import residency
+from src.refresh_planner import RefreshPlanner
+from src.release_burndown import ReleaseBurndown
 from src.utils import (ConfigError, argus_debug, clear, get_input, is_empty,
                        is_yes, jira_conf_file, pause, pick_value, print_separator,
                        save_argus_config, jira_project_dir)
@@ -46,6 +56,8 @@ class JiraManager:
     dashboards, editing, removing, etc.
     """
 
+    ESCALATION_JQL = 'type = \'Escalation\' AND resolution = unresolved'
+
     def __init__(self, team_manager):
         """
         Recreates any JiraConnections and JiraViews based on saved data in conf/jira.cfg
@@ -53,6 +65,9 @@ class JiraManager:
         # Holds connected Jira objects to be queried by JiraViews
         self._jira_connections = {}  # type: Dict[str, JiraConnection]
 
+        # Resolves issue keys across all connections for dependency resolution without rebuilding a project map per link
+        self.issue_catalog = IssueCatalog(self._jira_connections)
+
         # JiraViews, caching filters for different ways to view Jira Data. Implicit 1:1 JiraConnection to JiraView
         self.jira_views = {}  # type: Dict[str, JiraView]
 
@@ -63,6 +78,26 @@ class JiraManager:
 
         self._display_filter = DisplayFilter.default()
 
+        # Refreshes cached JiraProjects off the menu thread once started; see start_background_sync
+        self.sync_worker = JiraSyncWorker(self)
+
+        # Tracks project usage and sync history to decide what's worth refreshing
+        self.refresh_planner = RefreshPlanner.from_file()
+
+        # Optional push-based updates; polling drops to a safety net while it's running
+        self.webhook_receiver = JiraWebhookReceiver(self)
+
+        # (JiraConnection name, FixVersion) -> ReleaseBurndown, kept so re-running after a sync only redoes changed issues
+        self._release_burndowns = {}  # type: Dict[Tuple[str, str], ReleaseBurndown]
+
+        # JiraConnection name -> (versions of the project snapshots it was built from, DependencyGraph)
+        self._dependency_graphs = {}  # type: Dict[str, Tuple[Tuple, DependencyGraph]]
+
+        # Projects unloaded to stay within the memory budget get their dependencies resolved as they come back, and
+        # links elsewhere moved onto the reloaded issues. Resolution doesn't reload the projects linked to, as those
+        # loads would evict this one and resolve in turn; links into them wait on placeholders until they come back.
+        residency.on_load = lambda jira_project: self._resolve_new_issues(list(jira_project.jira_issues.values()))
+
         if os.path.exists(jira_conf_file):
             config_parser = configparser.RawConfigParser()
             config_parser.read(jira_conf_file)
@@ -133,8 +168,6 @@ class JiraManager:
                     else:
                         print('Did not add JiraConnection, so cannot link and use JiraProject.')
                         continue
-                print('Updating with new data from JIRA instance')
-                new_jira_project.refresh()
                 new_jira_project.jira_connection.add_and_link_jira_project(new_jira_project)
             except (configparser.NoSectionError, ConfigError) as e:
                 print('WARNING! Encountered error initializing JiraProject from file {}: {}'.format(full_path, e))
@@ -180,8 +213,8 @@ class JiraManager:
                         print('JiraProject data and config will not be added nor cached. Either add it manually or restart Argus and reply y')
                         break
 
+                # Populated by the background sync worker along with everything else
                 new_jira_project = JiraProject(parent_jira_connection, project_name, url, custom_fields)
-                new_jira_project.refresh()
                 parent_jira_connection.add_and_link_jira_project(new_jira_project)
         print('Resolving dependencies between JiraIssues')
         self._resolve_issue_dependencies()
@@ -211,17 +244,21 @@ class JiraManager:
 
         new_jira_connection = JiraConnection(connection_name, url, user, password)
         self._jira_connections[new_jira_connection.connection_name] = new_jira_connection
+        self.issue_catalog.invalidate()
 
         print('Must locally cache at least one project\'s JIRA history. Please select a project.')
-        new_jira_connection.cache_new_jira_project(self)
+        new_projects = [new_jira_connection.cache_new_jira_project(self)]
         try:
             while True:
                 if not is_yes('Add another project?'):
                     break
-                new_jira_connection.cache_new_jira_project(self)
+                new_projects.append(new_jira_connection.cache_new_jira_project(self))
         except (JIRAError, IOError):
             print('Encountered exception processing JiraProjects. Saving base JiraConnection')
             traceback.print_exc()
+        for new_project in new_projects:
+            if new_project is not None:
+                self._resolve_new_issues(list(new_project.jira_issues.values()))
 
         self._save_config()
         return new_jira_connection
@@ -239,6 +276,7 @@ class JiraManager:
             jira_connection.delete_owned_views(self)
             jira_connection.delete_cached_project_data()
             del self._jira_connections[selection]
+            self.issue_catalog.invalidate()
             self._save_config()
 
     def get_jira_connection(self, connection_name):
@@ -246,16 +284,13 @@ class JiraManager:
             raise ConfigError('Failed to find connection: {}'.format(connection_name))
         return self._jira_connections[connection_name]
 
-    def get_jira_issue(self, jira_issue_key: str) -> Optional[JiraIssue]:
+    def get_jira_issue(self, jira_issue_key: str, fault_in: bool = True) -> Optional[JiraIssue]:
         """
-        Iterates through all locally cached JiraProjects looking for the project associated with the input jira issue key. If we
-        find it, we return that JiraIssue. Otherwise, None.
+        Looks up the locally cached JiraProject associated with the input jira issue key. If we find the issue there, we
+        return that JiraIssue. Failing that, we check each connection's RemoteIssueCache. Otherwise, None.
+        :param fault_in: False to return None rather than reload a project unloaded to stay within the memory budget
         """
-        project_name = jira_issue_key.split('-')[0]
-        jira_projects = self.get_all_cached_jira_projects()
-        if project_name not in jira_projects:
-            return None
-        return jira_projects[project_name].get_issue(jira_issue_key)
+        return self.issue_catalog.get(jira_issue_key, fault_in)
 
     def delete_jira_view(self, jira_view_name):
         print('Deleting jira view: {}'.format(jira_view_name))
@@ -383,30 +418,50 @@ class JiraManager:
     def display_escalations(self):
         jira_connection_name = pick_value('Select a JIRA Connection to view Escalation type tickets:',
                                           list(self._jira_connections.keys()))
+        if jira_connection_name is None:
+            return
         jira_connection = self._jira_connections[jira_connection_name]
-        jira_issues = JiraUtils.get_issues_by_query(jira_connection,
-                                                    'type = \'Escalation\' AND resolution = unresolved')
-        issue_keys = []
-        for issue in jira_issues:
-            issue_keys.append(issue.issue_key)
 
+        refresh = False
         df = DisplayFilter.default()
         while True:
+            jira_issues = self._get_escalations(jira_connection, refresh)
+            refresh = False
             print_separator(30)
             print(os.linesep + 'Escalations' + os.linesep)
             print_separator(30)
             clear()
-            df.display_and_return_sorted_issues(self, jira_issues)
-            i = get_input('[#] Integer to open issue in browser. [q] to quit.')
+            displayed_issues = df.display_and_return_sorted_issues(self, jira_issues)
+            i = get_input('[#] Integer to open issue in browser. [r] to refresh. [q] to quit.')
             if i == 'q':
                 break
+            elif i == 'r':
+                refresh = True
+                continue
             try:
                 c_input = int(i) - 1
-                JiraUtils.open_issue_in_browser(jira_connection.url, issue_keys[c_input])
-            except ValueError:
+                JiraUtils.open_issue_in_browser(jira_connection.url, displayed_issues[c_input].issue_key)
+            except (ValueError, IndexError):
                 print('Bad input. Try again')
                 pause()
 
+    @staticmethod
+    def _get_escalations(jira_connection: JiraConnection, refresh: bool=False) -> List[JiraIssue]:
+        """
+        Open escalations on projects we cache come straight out of the cache. Only the rest go to the server, through
+        the connection's QueryCache, so reopening the view within QueryCache.MAX_AGE_MINUTES makes no requests at all.
+        :param refresh: revalidate the uncached part now regardless of age
+        """
+        cached_projects = sorted([x.project_name for x in jira_connection.cached_projects])
+        results = [x for issue_list in jira_connection.cached_jira_issues for x in issue_list
+                   if x.issuetype == 'Escalation' and x.is_open]
+
+        jql = JiraManager.ESCALATION_JQL
+        if len(cached_projects) > 0:
+            jql += ' AND project not in ({})'.format(','.join(cached_projects))
+        results.extend(jira_connection.query_cache.get_issues(jql, refresh=refresh))
+        return JiraUtils.sort_jira_issues(results)
+
     def run_debug(self):
         """
         Used during development to bypass complex menu operations and try out a single new operation outside unit testing
@@ -428,6 +483,78 @@ class JiraManager:
             print('Found unknown dependency: {}'.format(dep_type))
         pause()
 
+    def toggle_project_history(self):
+        jira_projects = self.get_all_cached_jira_projects()
+        project_name = pick_value('Toggle changelog history tracking for which JiraProject?', sorted(jira_projects.keys()))
+        if project_name is None:
+            return
+        jira_project = jira_projects[project_name]
+        jira_project.track_history = not jira_project.track_history
+        jira_project.save_config()
+        print('Changelog history tracking for {}: {}'.format(project_name, jira_project.track_history))
+        if jira_project.track_history and is_yes(
+                'Backfill history for all {} cached issues now? Otherwise only issues updated from here on are tracked.'.format(
+                    len(jira_project.jira_issues))):
+            changed_issues = jira_project.backfill_history()
+            self.on_project_refreshed(changed_issues, [])
+
+    def set_project_retention(self):
+        jira_projects = self.get_all_cached_jira_projects()
+        project_name = pick_value('Set closed issue retention for which JiraProject?', sorted(jira_projects.keys()))
+        if project_name is None:
+            return
+        jira_project = jira_projects[project_name]
+        print('Closed issues currently move to cold storage after: {}'.format(
+            '{} months'.format(jira_project.cold_after_months) if jira_project.cold_after_months > 0 else 'never'))
+        try:
+            cold_after_months = int(get_input('Months after resolution to keep closed issues in memory (0 for always):'))
+        except ValueError:
+            print('Bad input. Expected a number of months.')
+            return
+        jira_project.set_cold_after_months(cold_after_months)
+        print('{} issues in memory, {} in cold storage.'.format(
+            len(jira_project.jira_issues), len(jira_project.cold) if cold_after_months > 0 else 0))
+
+    def set_project_cache_scope(self):
+        jira_projects = self.get_all_cached_jira_projects()
+        project_name = pick_value('Set cache scope for which JiraProject?', sorted(jira_projects.keys()))
+        if project_name is None:
+            return
+        jira_project = jira_projects[project_name]
+        print('Current cache scope for {}: {}'.format(project_name, jira_project.cache_scope or 'whole project'))
+        cache_scope = get_input('JQL to limit cached issues to, i.e. resolution = unresolved OR resolved >= -52w '
+                                '(blank for the whole project):', lowered=False).strip()
+        cache_scope = None if cache_scope == '' else cache_scope
+        if cache_scope is not None:
+            # A bad fragment would fail every sync from here on, so have the server check it first
+            try:
+                jira_project.jira_connection.search_issues_json(JiraUtils.project_jql(project_name, cache_scope),
+                                                                max_results=0, fields='key')
+            except JIRAError as je:
+                print('Server rejected cache scope: {}'.format(je.text))
+                return
+        jira_project.set_cache_scope(cache_scope)
+        print('Cache scope for {} set to: {}. Reconciling on next sync.'.format(project_name, cache_scope or 'whole project'))
+        self.sync_worker.request_sync([jira_project], urgent=True)
+
+    def display_issue_history(self):
+        issue_key = get_input('Show field history for which issue key?').upper()
+        jira_issue = self.get_jira_issue(issue_key)
+        if jira_issue is None:
+            print('{} is not in a locally cached JiraProject.'.format(issue_key))
+            return
+        jira_project = self.get_all_cached_jira_projects().get(jira_issue.project_name)
+        if jira_project is None or jira_project.get_issue(issue_key) is None:
+            print('{} is only held as a linked issue; no history is recorded for it.'.format(issue_key))
+            return
+        transitions = jira_project.history.transitions(issue_key)
+        if len(transitions) == 0:
+            print('No history recorded for {}. Is history tracking on for {}?'.format(issue_key, jira_project.project_name))
+            return
+        print('Field history for {}:'.format(issue_key))
+        for transition in transitions:
+            print('   {}'.format(transition))
+
     def search_projects(self):
         """
         Does a one-off ad-hoc search for strings in all cached fields for all cached JiraProjects.
@@ -491,32 +618,84 @@ class JiraManager:
     def _resolve_issue_dependencies(self) -> None:
         """
         Since JiraIssues contain str-based 'pointers' to other JiraIssues as dependents, we need to perform this evaluation
-        in batch separately from a single issue or project caching addition.
+        in batch separately from a single issue or project caching addition. Only needed once everything's loaded from
+        disk; from there on, _resolve_new_issues handles whatever arrives.
         """
         self.missing_project_counts = {}
+        self.issue_catalog.clear_placeholders()
         for jira_project in self.get_all_cached_jira_projects().values():
-            jira_project.resolve_dependencies(self)
+            # Resolved on load instead; no sense pulling everything back into memory for it
+            if jira_project.is_resident:
+                jira_project.resolve_dependencies(self)
+        # Remote issues link onward too; resolving them keeps chains intact where they pass back into cached projects
+        for jira_connection in list(self._jira_connections.values()):
+            for jira_issue in jira_connection.remote_issue_cache.jira_issues:
+                jira_issue.resolve_dependencies(self)
 
         if len(self.missing_project_counts) > 0:
             print_separator(30)
-            print('Encountered some missing offline cached JiraProjects during dependency resolution. Consider caching some of the following projects locally.')
+            print('Encountered some missing offline cached JiraProjects during dependency resolution. The background sync fetches '
+                  'linked issues individually; consider caching some of the following projects locally if they stay missing.')
             for project in sorted(self.missing_project_counts, key=self.missing_project_counts.get, reverse=True):
                 print('Missing locally cached projects during dependency resolution. Project: {}. Count: {}'.format(project, self.missing_project_counts[project]))
 
+    def sync_remote_issues(self) -> None:
+        """
+        Called by the sync worker after each pass. For each connection, fetches the issues our cached issues link to on
+        projects we don't cache, refreshes those already held once they're RemoteIssueCache.REFRESH_HOURS old, and drops
+        those nothing links to anymore. Dependencies are re-resolved if anything came in.
+        """
+        cached_projects = self.get_all_cached_jira_projects()
+        changed = 0
+        for jira_connection in list(self._jira_connections.values()):
+            # Links into a scoped project may well point outside its scope
+            linked_keys = {key for issue_list in jira_connection.cached_jira_issues for x in issue_list
+                           for key in x.linked_issue_keys() if self._is_uncached_key(cached_projects, key)}
+            remote_issue_cache = jira_connection.remote_issue_cache
+            remote_issue_cache.retain(linked_keys)
+            if remote_issue_cache.is_stale:
+                changed += remote_issue_cache.refresh(jira_connection)
+            added = remote_issue_cache.fetch(jira_connection, linked_keys)
+            if added > 0:
+                print('Fetched {} linked issues on uncached projects for {}'.format(added, jira_connection.connection_name))
+            changed += added
+        if changed > 0:
+            self._resolve_new_issues([x for jira_connection in list(self._jira_connections.values())
+                                      for x in jira_connection.remote_issue_cache.jira_issues if x.needs_resolution])
+
+    def _resolve_new_issues(self, jira_issues: List[JiraIssue]) -> None:
+        """
+        Resolves the dependencies of just the input JiraIssues, then retargets in place any links elsewhere that point at
+        placeholders or older copies of them
+        """
+        for jira_issue in jira_issues:
+            jira_issue.resolve_dependencies(self)
+        retargeted = self.issue_catalog.retarget([x.issue_key for x in jira_issues])
+        if retargeted > 0:
+            argus_debug('Retargeted {} links to newly available or republished issues'.format(retargeted))
+
+    @staticmethod
+    def _is_uncached_key(cached_projects: Dict[str, JiraProject], issue_key: str) -> bool:
+        jira_project = cached_projects.get(issue_key.split('-')[0])
+        return jira_project is None or (jira_project.cache_scope is not None and jira_project.get_issue(issue_key) is None)
+
     def create_non_cached_issue(self, issue_key: str) -> JiraIssue:
         """
-        Exists in this scope to avoid circular dependencies
+        Exists in this scope to avoid circular dependencies. Every link to the same missing key shares one placeholder.
         """
-        return JiraIssue.non_cached_issue(issue_key)
+        return self.issue_catalog.placeholder(issue_key)
 
     def list_projects(self):
         jira_projects = self.get_all_cached_jira_projects()
         for project in list(jira_projects.values()):
-            print(' (Conn:{conn} Name:{name}). Issue count: {count}. Updated: {updated}'.format(
+            print(' (Conn:{conn} Name:{name}). Issue count: {count}. Updated: {updated}.{scope} {usage}'.format(
                 conn=project.jira_connection.connection_name,
                 name=project.project_name,
-                count=len(project.jira_issues),
-                updated=project.updated))
+                count='{}{}'.format(project.issue_count, '' if project.is_resident else ' (on disk)'),
+                updated=project.updated,
+                scope=('' if project.cache_scope is None else ' Scope: {}.'.format(project.cache_scope)) +
+                      ('' if project.cold_after_months <= 0 else ' Cold: {}.'.format(len(project.cold))),
+                usage=self.refresh_planner.describe(project.project_name)))
 
     def change_password(self):
         # Need to save config to re-encrypt all the username/password info w/new pass
@@ -612,15 +791,10 @@ class JiraManager:
 
         open_only = is_yes('Show only unresolved issues?')
 
-        to_match = get_input('Input substring to search fixversions for:', False)
-        available_versions = set()
-        for jira_project in target_connection.cached_projects:
-            for jira_issue in jira_project.jira_issues.values():
-                for fix in jira_issue['fixVersions'].split(','):
-                    if to_match in fix:
-                        available_versions.add(fix)
-
-        report_version = pick_value('Generate report for which FixVersion?', list(available_versions))
+        # Pin each project's snapshot so the version list and the report are built from the same data. Versions span
+        # closed issues of any age, so cold ones come along.
+        snapshots = [x.snapshot_with_cold() for x in target_connection.cached_projects]
+        report_version = self._pick_fix_version(snapshots)
         if report_version is None:
             return
 
@@ -629,8 +803,8 @@ class JiraManager:
         # Now find all "primary root" members on this FixVersion, generate a list of matching, then display w/dependency
         # chains enabled
         matching_issues = set()
-        for jira_project in target_connection.cached_projects:
-            for jira_issue in jira_project.jira_issues.values():
+        for snapshot in snapshots:
+            for jira_issue in snapshot.issues.values():
                 if jira_issue.has_fix_version(report_version):
                     if (open_only and jira_issue.is_open) or not open_only:
                         matching_issues.add(jira_issue)
@@ -638,6 +812,7 @@ class JiraManager:
         df = DisplayFilter.default()
         df.open_only = open_only
         df.include_column('fixVersions', 'FixVersion', 10, 2)
+        df.include_column(DisplayFilter.BLOCKING_STRING, DisplayFilter.BLOCKING_STRING, 8, 3)
 
         # sort our keys by issuekey
         sorted_results = JiraUtils.sort_custom_jiraissues_by_key(list(matching_issues))
@@ -663,6 +838,181 @@ class JiraManager:
             except ValueError:
                 print('Bad input. Try again.')
 
+    def report_fix_version_burndown(self) -> None:
+        """
+        Per-day burndown and burnup for a FixVersion and its transitive dependencies, with a projected completion date
+        """
+        target_connection = self.pick_jira_connection('Burndown for which JiraConnection?')
+        if target_connection is None:
+            return
+
+        graph = self.dependency_graph(target_connection)
+        fix_version = self._pick_from_fix_versions(graph.fix_versions())
+        if fix_version is None:
+            return
+
+        burndown_key = (target_connection.connection_name, fix_version)
+        if burndown_key not in self._release_burndowns:
+            self._release_burndowns[burndown_key] = ReleaseBurndown(fix_version)
+        burndown = self._release_burndowns[burndown_key]
+        burndown.update(graph, self.project_history)
+        print(burndown.report(int(time_utils.current_time().timestamp())))
+
+    def dependency_graph(self, jira_connection: JiraConnection) -> DependencyGraph:
+        """
+        DependencyGraph over every issue, cold ones included, cached on the connection. Reused until a project's links,
+        FixVersions or resolutions change, not on every sync.
+        """
+        jira_projects = sorted(jira_connection.cached_projects, key=lambda x: x.project_name)
+        # Built from each project's LinkIndex, so neither checking nor rebuilding reads cold segments or reloads
+        # unloaded projects
+        indexes = [(x.project_name, x.link_index.current()) for x in jira_projects]
+        versions = tuple((name, version) for name, (version, _) in indexes)
+        cached = self._dependency_graphs.get(jira_connection.connection_name)
+        if cached is None or cached[0] != versions:
+            cached = (versions, DependencyGraph([entries for _, (_, entries) in indexes], self.issue_catalog.get))
+            self._dependency_graphs[jira_connection.connection_name] = cached
+        return cached[1]
+
+    def connection_dependency_graph(self, connection_name: str) -> Optional[DependencyGraph]:
+        """
+        :return: dependency_graph() of the named connection, None if we don't have it
+        """
+        jira_connection = self._jira_connections.get(connection_name)
+        if jira_connection is None:
+            return None
+        return self.dependency_graph(jira_connection)
+
+    def waiting_on(self, jira_issue: JiraIssue) -> List[str]:
+        """
+        :return: keys of unresolved issues directly blocked by jira_issue, on its own connection
+        """
+        graph = self.connection_dependency_graph(jira_issue.jira_connection_name)
+        return [] if graph is None else graph.waiting_on(jira_issue.issue_key)
+
+    def display_issue_impact(self) -> None:
+        """
+        What links into an issue, what's transitively waiting on it, and what closing it frees up
+        """
+        issue_key = get_input('Impact of which cached issue? (e.g. PROJ-123)').upper()
+        jira_issue = self.get_jira_issue(issue_key)
+        if jira_issue is None or jira_issue.jira_connection_name not in self._jira_connections:
+            print('{} is not cached locally.'.format(issue_key))
+            return
+        graph = self.dependency_graph(self._jira_connections[jira_issue.jira_connection_name])
+
+        incoming = graph.incoming(issue_key)
+        print('{} [{}] {}'.format(issue_key, jira_issue.status, jira_issue.get('summary', '')))
+        print_separator(30)
+        print('{} incoming links:'.format(len(incoming)))
+        for source_key, pretty_type in sorted(incoming):
+            print('   {} {} {}'.format(source_key, pretty_type if pretty_type is not None else 'links to', issue_key))
+
+        waiting = [x for x in graph.dependents([issue_key]) if graph.is_open(x)]
+        unblocked = graph.unblocked_by(issue_key)
+        print_separator(30)
+        print('{} unresolved issues are waiting on {}, directly or not.'.format(len(waiting), issue_key))
+        print('Closing it unblocks {} tickets across {} projects{}'.format(
+            len(unblocked), len({x.split('-')[0] for x in unblocked}), ':' if len(unblocked) > 0 else '.'))
+        for unblocked_key in unblocked:
+            self._print_graph_issue(graph, unblocked_key)
+
+    def report_blocking_chain(self) -> None:
+        """
+        Everything transitively blocking a FixVersion, in the order it can be worked, with the longest chain of
+        unresolved work through it
+        """
+        target_connection = self.pick_jira_connection('Blocking chain for which JiraConnection?')
+        if target_connection is None:
+            return
+        graph = self.dependency_graph(target_connection)
+        fix_version = self._pick_from_fix_versions(graph.fix_versions())
+        if fix_version is None:
+            return
+
+        roots = graph.fix_version_roots(fix_version)
+        blocking = graph.blocking_fix_version(fix_version)
+        open_blocking = [x for x in blocking if graph.is_open(x)]
+        missing = [x for x in blocking if graph.issue(x) is None]
+        print('{} issues on {}. {} blocking it from outside the FixVersion, {} of them unresolved.'.format(
+            len(roots), fix_version, len(blocking), len(open_blocking)))
+        if len(missing) > 0:
+            print('{} blockers are in projects not cached offline: {}'.format(len(missing), ','.join(sorted(missing))))
+
+        order, cyclic = graph.topological_order(open_blocking)
+        print_separator(30)
+        print('Unresolved blockers, each after whatever it waits on:')
+        for issue_key in order:
+            self._print_graph_issue(graph, issue_key)
+        if len(cyclic) > 0:
+            print('Circular blocking links, not ordered: {}'.format(','.join(cyclic)))
+
+        print_separator(30)
+        critical_path = graph.critical_path(roots + blocking)
+        print('Critical chain: {} unresolved issues that can\'t be worked in parallel:'.format(len(critical_path)))
+        for issue_key in critical_path:
+            self._print_graph_issue(graph, issue_key)
+
+    @staticmethod
+    def _print_graph_issue(graph: DependencyGraph, issue_key: str) -> None:
+        jira_issue = graph.issue(issue_key)
+        if jira_issue is None:
+            print('   {} (not cached)'.format(issue_key))
+        else:
+            print('   {} [{}] {}'.format(issue_key, jira_issue.status, jira_issue.get('summary', '')))
+
+    @staticmethod
+    def _pick_fix_version(snapshots: List[JiraProjectSnapshot]) -> Optional[str]:
+        fix_versions = set()
+        for snapshot in snapshots:
+            for jira_issue in snapshot.issues.values():
+                fix_versions.update(jira_issue['fixVersions'].split(','))
+        return JiraManager._pick_from_fix_versions(fix_versions)
+
+    @staticmethod
+    def _pick_from_fix_versions(fix_versions: Set[str]) -> Optional[str]:
+        to_match = get_input('Input substring to search fixversions for:', False)
+        available_versions = [x for x in fix_versions if to_match in x]
+        return pick_value('Generate report for which FixVersion?', available_versions)
+
+    def report_flow(self) -> None:
+        """
+        Cycle time, lead time, throughput and cumulative flow for the issues in a JiraView or on a FixVersion
+        """
+        scope = get_input('Flow report on a [v]iew or a [f]ixVersion?')
+        if scope == 'v':
+            view_name = pick_value('Which view?', list(self.jira_views.keys()), True, 'Back')
+            if view_name is None:
+                return
+            since = time_utils.since_now(get_input('Since what date? (-2m or -1y or -5w or -2d, etc)'))
+            jira_issues = list(self.jira_views[view_name].get_issues(closed_since=since).values())
+        elif scope == 'f':
+            target_connection = self.pick_jira_connection('Flow report for which JiraConnection?')
+            if target_connection is None:
+                return
+            snapshots = [x.snapshot_with_cold() for x in target_connection.cached_projects]
+            fix_version = self._pick_fix_version(snapshots)
+            if fix_version is None:
+                return
+            jira_issues = [x for snapshot in snapshots for x in snapshot.issues.values() if x.has_fix_version(fix_version)]
+            since = time_utils.since_now(get_input('Since what date? (-2m or -1y or -5w or -2d, etc)'))
+        else:
+            print('Bad input: {}'.format(scope))
+            return
+
+        until = time_utils.current_time()
+        flow_metrics = FlowMetrics(jira_issues, self.project_history)
+        print(flow_metrics.summary(int(since.timestamp()), int(until.timestamp())))
+
+    def project_history(self, project_name: str) -> Optional[IssueHistory]:
+        """
+        :return: IssueHistory of the cached project, None if we don't cache it or aren't tracking its history
+        """
+        jira_project = self.get_all_cached_jira_projects().get(project_name)
+        if jira_project is None or not jira_project.track_history:
+            return None
+        return jira_project.history
+
     def _prompt_connection_add_if_none(self) -> bool:
         """
         :return: True if either a new connection is added or connections already exist
@@ -689,11 +1039,7 @@ class JiraManager:
         return list(self._jira_connections.values())
 
     def get_all_cached_jira_projects(self) -> Dict[str, JiraProject]:
-        cached_projects = {}
-        for jira_connection in list(self._jira_connections.values()):
-            for jira_project in jira_connection.cached_projects:
-                cached_projects[jira_project.project_name] = jira_project
-        return cached_projects
+        return dict(self.issue_catalog.projects())
 
     def maybe_get_cached_jira_project(self, url: str, project_name: str) -> Optional[JiraProject]:
         for jira_connection in list(self._jira_connections.values()):
@@ -710,8 +1056,9 @@ class JiraManager:
         if jira_connection_name is None:
             return
 
-        self._jira_connections[jira_connection_name].cache_new_jira_project(self)
-        self._resolve_issue_dependencies()
+        new_project = self._jira_connections[jira_connection_name].cache_new_jira_project(self)
+        if new_project is not None:
+            self._resolve_new_issues(list(new_project.jira_issues.values()))
 
     def delete_cached_jira_project(self):
         jira_connection_name = pick_value('Delete cached project data for which JiraConnection?',
@@ -734,12 +1081,93 @@ class JiraManager:
         for jira_connection in list(self._jira_connections.values()):
             print('   {}'.format(jira_connection))
 
-    def update_cached_jira_project_data(self, needs_pause=True):
-        for jira_connection in list(self._jira_connections.values()):
-            jira_connection.update_all_cached_jira_projects()
+    def update_cached_jira_project_data(self, needs_pause=True, smart=False):
+        """
+        Hands the update off to the background sync worker if it's running, otherwise updates inline.
+        :param smart: only refresh the projects the RefreshPlanner ranks as worth it, most valuable first
+        """
+        if smart:
+            jira_projects = self.plan_refreshes()
+            print('Planned refresh of: {}'.format(','.join([x.project_name for x in jira_projects])))
+        else:
+            jira_projects = list(self.get_all_cached_jira_projects().values())
+
+        if self.sync_worker.is_running:
+            self.sync_worker.request_sync(jira_projects)
+            print('Queued update of {} cached JiraProjects. Current status: {}'.format(
+                len(jira_projects), self.sync_worker.status))
+        else:
+            for jira_project in jira_projects:
+                changed_issues, removed_keys = jira_project.refresh()
+                self.on_project_refreshed(changed_issues, removed_keys)
+                self.refresh_planner.record_sync(jira_project.project_name, len(changed_issues))
         if needs_pause:
             pause()
 
+    def smart_update_cached_jira_project_data(self):
+        self.update_cached_jira_project_data(smart=True)
+
+    def plan_refreshes(self, required: Optional[List[JiraProject]]=None) -> List[JiraProject]:
+        return self.refresh_planner.plan(list(self.get_all_cached_jira_projects().values()), required=required)
+
+    def issue_as_of(self, jira_issue: JiraIssue, as_of: datetime) -> Optional[JiraIssue]:
+        """
+        :return: the JiraIssue rewound to its state at as_of through its project's history, None if it didn't exist yet.
+        Issues we don't cache, or that are already rewound to as_of, are returned as-is.
+        """
+        timestamp = int(as_of.timestamp())
+        if getattr(jira_issue, 'as_of', None) == timestamp or not jira_issue.is_cached_offline:
+            return jira_issue
+        jira_project = self.get_all_cached_jira_projects().get(jira_issue.project_name)
+        if jira_project is None:
+            return jira_issue
+        rewound = jira_project.history.issues_as_of([jira_issue], timestamp)
+        return rewound[0] if len(rewound) > 0 else None
+
+    def note_displayed_issues(self, jira_issues: List[JiraIssue], refresh: bool=False) -> None:
+        """
+        Records a view or dashboard display with the RefreshPlanner.
+        :param refresh: jump the projects owning these issues to the front of the background sync queue
+        """
+        self.refresh_planner.record_issue_access(jira_issues)
+        if refresh and self.sync_worker.is_running:
+            jira_projects = self.get_all_cached_jira_projects()
+            backing_names = sorted({x.project_name for x in jira_issues})
+            self.sync_worker.request_sync([jira_projects[x] for x in backing_names if x in jira_projects], urgent=True)
+
+    def start_background_sync(self, interval: int=JiraSyncWorker.DEFAULT_INTERVAL) -> None:
+        """
+        Starts refreshing all cached JiraProjects in the background, then again every interval minutes
+        """
+        self.sync_worker.interval = interval
+        self.sync_worker.start()
+
+    def sync_status(self) -> str:
+        if not self.webhook_receiver.is_running:
+            return self.sync_worker.status
+        return '{}. Webhooks on port {}: {} received'.format(
+            self.sync_worker.status, self.webhook_receiver.port, self.webhook_receiver.received_count)
+
+    def residency_status(self) -> str:
+        return residency.status(self.get_all_cached_jira_projects())
+
+    def display_sync_log(self) -> None:
+        self.sync_worker.display_log()
+
+    def on_project_refreshed(self, changed_issues: List[JiraIssue], removed_keys: List[str]) -> None:
+        """
+        Called by the sync worker once a JiraProject has swapped in refreshed data. Only the changed JiraIssues need
+        their dependencies materialized, along with any links elsewhere still pointing at placeholders or old copies.
+        """
+        self._resolve_new_issues(changed_issues)
+        # Keep each connection's UserDirectory current with whoever turns up on synced issues
+        for connection_name in {x.jira_connection_name for x in changed_issues}:
+            if connection_name in self._jira_connections:
+                self._jira_connections[connection_name].user_directory.harvest(
+                    [x for x in changed_issues if x.jira_connection_name == connection_name])
+        if len(removed_keys) > 0:
+            argus_debug('Evicted during refresh: {}'.format(','.join(removed_keys)))
+
     def jira_connection_count(self):
         return len(self._jira_connections)
 
@@ -14,18 +14,36 @@
 
 import configparser
 import os
+import threading
 import traceback
+from types import MappingProxyType
 from typing import TYPE_CHECKING
 
-from src import utils
+from src import time_utils, utils
+from src.cold_segment import ColdSegment
+from src.issue_history import IssueHistory
 from src.jira_utils import JiraUtils
 from src.jira_issue import JiraIssue
+from src.link_index import LinkIndex
+from src.project_residency import residency
 from src.utils import (ConfigError, argus_debug, jira_data_dir,
                        save_argus_config, save_argus_data, jira_project_dir)
 
 if TYPE_CHECKING:
     from src.jira_manager import JiraManager
-    from typing import Dict, Optional, List
+    from typing import Dict, Mapping, Optional, List, Set, Tuple
+
+
+class JiraProjectSnapshot:
+    """
+    A read-only, versioned view of the issues in a JiraProject. Readers pin one for the length of an operation; the
+    sync writer never modifies a published snapshot, it publishes a new one.
+    """
+
+    def __init__(self, version, issues):
+        # type: (int, Dict[str, JiraIssue]) -> None
+        self.version = version
+        self.issues = MappingProxyType(issues)  # type: Mapping[str, JiraIssue]
 
 
 class JiraProject:
@@ -34,19 +52,34 @@ class JiraProject:
     itself since the last known time JIRA data was queried.
     """
 
+    # Hours between keys-only reconciliation passes against the server. <= 0 disables reconciliation.
+    DEFAULT_RECONCILE_INTERVAL = 24
+
     def __init__(self,
                  jira_connection,  # type: Optional['JiraConnection']
                  project_name,  # type: str
                  url,  # type: str
                  custom_fields=None,  # type: Optional[Dict[str, str]]
                  issues=None,  # type: Optional[Dict[str, JiraIssue]]
-                 updated='1970/01/01 00:00'  # type: Optional[str]
+                 updated='1970/01/01 00:00',  # type: Optional[str]
+                 reconcile_interval=DEFAULT_RECONCILE_INTERVAL,  # type: int
+                 last_reconciled=None,  # type: Optional[str]
+                 track_history=False,  # type: bool
+                 cache_scope=None,  # type: Optional[str]
+                 cold_after_months=0  # type: int
                  ) -> None:
         """
         :param url: str, used to map projects to JiraConnections since we serialize separately on disk. We pass this separately
             in order to allow for None jira_connection __init__ for default specified JiraProjects from custom_parems.cfg
         :param custom_fields: {}, field to customfield_NNN mappings
         :param issues: dict of issues to add to this project
+        :param reconcile_interval: hours between reconciliation passes to detect deleted / moved issues
+        :param last_reconciled: str, time_utils config formatted time of the last reconciliation pass, None if never
+        :param track_history: pull changelogs for updated issues on refresh and record them in an IssueHistory
+        :param cache_scope: JQL fragment, i.e. 'resolution = unresolved OR resolved >= -52w'. If set, only matching issues
+            are synced and kept; None caches the whole project.
+        :param cold_after_months: closed issues resolved longer ago than this are moved out of memory into a ColdSegment.
+            <= 0 keeps everything in memory.
         """
         if custom_fields is None:
             custom_fields = {}
@@ -61,10 +94,32 @@ class JiraProject:
         # jira date format
         self.updated = updated
 
-        # map of issue key to JiraIssue
+        self.reconcile_interval = reconcile_interval
+        self.last_reconciled = last_reconciled
+
+        self.track_history = track_history
+        self._history = None  # type: Optional[IssueHistory]
+
+        self.cache_scope = cache_scope
+
+        self.cold_after_months = cold_after_months
+        self._cold = None  # type: Optional[ColdSegment]
+        self._link_index = None  # type: Optional[LinkIndex]
+
+        # map of issue key to JiraIssue, replaced wholesale on every publish_issues
         if issues is None:
             issues = {}  # type: Dict[str, JiraIssue]
-        self.jira_issues = issues  # type: Dict[str, JiraIssue]
+        self._snapshot = JiraProjectSnapshot(0, dict(issues))  # type: Optional[JiraProjectSnapshot]
+        # Version last written to our data file. A project can only be unloaded while it matches.
+        self._saved_version = 0
+        # Version to resume from on reload, and the issue count to report without reloading, while unloaded
+        self._unloaded_version = 0
+        self._issue_count = len(issues)
+
+        # Serializes writers against each other. Readers never take it.
+        self._publish_lock = threading.Lock()
+        # Serializes saves to disk, which come from the menus, the sync worker and the webhook receiver's flush timer
+        self._save_lock = threading.Lock()
 
         # Set our max timestamp based on issues in this object cache
         for jira_issue in list(self.jira_issues.values()):
@@ -79,6 +134,228 @@ class JiraProject:
     def url(self):
         return self._url
 
+    @property
+    def jira_issues(self):
+        # type: () -> Mapping[str, JiraIssue]
+        """
+        Issues in the currently published snapshot. Operations that read more than once should pin snapshot() instead
+        so they don't straddle a publish.
+        """
+        return self.snapshot().issues
+
+    def snapshot(self):
+        # type: () -> JiraProjectSnapshot
+        """
+        Reloads our issues from disk if they were unloaded to stay within the ProjectResidency budget
+        """
+        current = self._snapshot
+        if current is None:
+            current = self._reload()
+        residency.touch(self)
+        return current
+
+    @property
+    def is_resident(self):
+        # type: () -> bool
+        return self._snapshot is not None
+
+    @property
+    def version(self):
+        # type: () -> int
+        """
+        Version of our published snapshot, without reloading it if we aren't resident
+        """
+        current = self._snapshot
+        return self._unloaded_version if current is None else current.version
+
+    @property
+    def issue_count(self):
+        # type: () -> int
+        """
+        Count of hot issues, without reloading them if we aren't resident
+        """
+        current = self._snapshot
+        return self._issue_count if current is None else len(current.issues)
+
+    def estimated_bytes(self):
+        # type: () -> int
+        """
+        :return: size of our data file, as a proxy for our issues' footprint relative to other projects
+        """
+        data_file = self._stored_data_file()
+        return os.path.getsize(data_file) if os.path.exists(data_file) else 0
+
+    def unload(self):
+        # type: () -> bool
+        """
+        Drops our issues from memory, to be reloaded from disk on next use. Readers holding a snapshot keep it.
+        :return: False if we have changes not yet saved to disk, so can't be unloaded
+        """
+        with self._publish_lock:
+            current = self._snapshot
+            if current is None:
+                return True
+            if current.version != self._saved_version:
+                return False
+            self._unloaded_version = current.version
+            self._issue_count = len(current.issues)
+            self._snapshot = None
+        argus_debug('Unloaded {} issues for project {}'.format(self._issue_count, self.project_name))
+        return True
+
+    def _reload(self):
+        # type: () -> JiraProjectSnapshot
+        with self._publish_lock:
+            current = self._snapshot
+            if current is not None:
+                return current
+            current = self._load_locked()
+        residency.loaded(self)
+        return current
+
+    def _load_locked(self):
+        # type: () -> JiraProjectSnapshot
+        issues = JiraProject.load_issues(self._stored_data_file())
+        self._snapshot = JiraProjectSnapshot(self._unloaded_version, issues)
+        self._saved_version = self._unloaded_version
+        argus_debug('Reloaded {} issues for project {}'.format(len(issues), self.project_name))
+        return self._snapshot
+
+    def _stored_data_file(self):
+        # type: () -> str
+        # save_argus_data redirects under tests/ in unit_test mode
+        if utils.unit_test:
+            return os.path.join('tests', self._data_file())
+        return self._data_file()
+
+    @staticmethod
+    def load_issues(data_file_name):
+        # type: (str) -> Dict[str, JiraIssue]
+        jira_issues = {}  # type: Dict[str, JiraIssue]
+        if not os.path.exists(data_file_name):
+            return jira_issues
+        with open(data_file_name, 'rb') as data_file:
+            count = 0
+            while True:
+                if count != 0 and count % 1000 == 0:
+                    argus_debug('Processed {} issues'.format(count))
+                count += 1
+                try:
+                    parsed_issue = JiraIssue.deserialize(data_file)
+                    jira_issues[parsed_issue.issue_key] = parsed_issue
+                except EOFError:
+                    break
+        return jira_issues
+
+    @property
+    def history(self):
+        # type: () -> IssueHistory
+        """
+        Field transition history for this project's issues. Only populated while track_history is on.
+        """
+        if self._history is None:
+            self._history = IssueHistory(self.jira_connection.connection_name, self.project_name)
+        return self._history
+
+    @property
+    def cold(self):
+        # type: () -> ColdSegment
+        """
+        Closed issues aged out of jira_issues. Only populated while cold_after_months is set.
+        """
+        if self._cold is None:
+            self._cold = ColdSegment(self.jira_connection.connection_name, self.project_name)
+        return self._cold
+
+    @property
+    def link_index(self):
+        # type: () -> LinkIndex
+        """
+        Links, FixVersions and resolution of every issue, hot and cold, readable without loading either. Built from the
+        issues once if we've never saved one.
+        """
+        if self._link_index is None:
+            link_index = LinkIndex(self.jira_connection.connection_name, self.project_name)
+            if not link_index.load():
+                link_index.rebuild(self.all_issues().values())
+            self._link_index = link_index
+        return self._link_index
+
+    def cold_cutoff(self):
+        # type: () -> Optional[int]
+        """
+        :return: epoch seconds; closed issues resolved before this are cold. None if we don't age issues out.
+        """
+        if self.cold_after_months <= 0:
+            return None
+        return int(time_utils.since_now('-{}m'.format(self.cold_after_months)).timestamp())
+
+    def all_issues(self):
+        # type: () -> Dict[str, JiraIssue]
+        """
+        Hot and cold issues together, faulting in the cold segment. For reports that need closed issues of any age.
+        """
+        results = dict(self.snapshot().issues)
+        if self.cold_after_months > 0:
+            results.update(self.cold.issues())
+        return results
+
+    def snapshot_with_cold(self):
+        # type: () -> JiraProjectSnapshot
+        current = self.snapshot()
+        if self.cold_after_months <= 0 or len(self.cold) == 0:
+            return current
+        return JiraProjectSnapshot(current.version, self.all_issues())
+
+    def issues_closed_since(self, timestamp):
+        # type: (Optional[int]) -> List[JiraIssue]
+        """
+        :param timestamp: epoch seconds. The caller needs closed issues resolved from here on; None for all of them.
+        :return: hot issues, plus cold ones only if the caller reaches back past our cutoff
+        """
+        cutoff = self.cold_cutoff()
+        if cutoff is None or (timestamp is not None and timestamp >= cutoff):
+            return list(self.snapshot().issues.values())
+        return list(self.all_issues().values())
+
+    def evict_cold(self):
+        # type: () -> int
+        """
+        Moves closed issues resolved before our cutoff out of memory into the ColdSegment
+        :return: count of issues moved
+        """
+        cutoff = self.cold_cutoff()
+        # Not worth reloading for; we catch up next time we're in use
+        if cutoff is None or not self.is_resident:
+            return 0
+        to_evict = []
+        for jira_issue in self.snapshot().issues.values():
+            if jira_issue.is_closed:
+                resolved = time_utils.jira_epoch(jira_issue.resolved) or time_utils.jira_epoch(jira_issue.get('updated'))
+                if resolved is not None and resolved < cutoff:
+                    to_evict.append(jira_issue)
+        if len(to_evict) == 0:
+            return 0
+        # Written out before they leave memory so a crash in between can't lose them
+        self.cold.add(to_evict)
+        self._publish([], [x.issue_key for x in to_evict])
+        self.save_config()
+        print('Moved {} closed issues older than {} months to cold storage for {}. {} issues in memory.'.format(
+            len(to_evict), self.cold_after_months, self.project_name, len(self.jira_issues)))
+        return len(to_evict)
+
+    def set_cold_after_months(self, cold_after_months):
+        # type: (int) -> None
+        """
+        Changes our retention window. Turning it off faults the cold segment back into memory.
+        """
+        if cold_after_months <= 0 and self.cold_after_months > 0:
+            self._publish(list(self.cold.issues().values()))
+            self.cold.delete_on_disk_files()
+        self.cold_after_months = cold_after_months
+        self.save_config()
+        self.evict_cold()
+
     def add_field_translations_from_file(self):
         """
         Pulls custom translations from conf/custom_params.cfg and initializes this JiraProject with them if they are
@@ -144,6 +421,22 @@ class JiraProject:
             updated = config_parser.get('Config', 'updated')
             url = config_parser.get('Config', 'url').rstrip('/')
 
+            reconcile_interval = JiraProject.DEFAULT_RECONCILE_INTERVAL
+            if config_parser.has_option('Config', 'reconcile_interval'):
+                reconcile_interval = config_parser.getint('Config', 'reconcile_interval')
+            last_reconciled = None
+            if config_parser.has_option('Config', 'last_reconciled'):
+                last_reconciled = config_parser.get('Config', 'last_reconciled')
+            track_history = False
+            if config_parser.has_option('Config', 'track_history'):
+                track_history = config_parser.getboolean('Config', 'track_history')
+            cache_scope = None
+            if config_parser.has_option('Config', 'cache_scope'):
+                cache_scope = config_parser.get('Config', 'cache_scope')
+            cold_after_months = 0
+            if config_parser.has_option('Config', 'cold_after_months'):
+                cold_after_months = config_parser.getint('Config', 'cold_after_months')
+
             custom_fields = {}
             if config_parser.has_option('Config', 'custom_fields'):
                 raw_fields = config_parser.get('Config', 'custom_fields')
@@ -152,39 +445,43 @@ class JiraProject:
                     for field in parsed_fields:
                         custom_fields[field] = config_parser.get('Config', field)
 
-            # load cached data if any is available
+            issue_count = 0
+            if config_parser.has_option('Config', 'issue_count'):
+                issue_count = config_parser.getint('Config', 'issue_count')
+
+            # load cached data if any is available. Under a memory budget, that waits for first use.
             data_file_name = JiraProject.data_file(jira_connection_name, project_name)
             jira_issues = {}
             if not os.path.exists(data_file_name):
                 print('No data file found for JiraProject: {} (missing file: {})'.format(project_name, data_file_name))
-            else:
+            elif not residency.enabled:
                 print('Loading cached JIRA from disk for project: {}'.format(project_name))
-                with open(data_file_name, 'rb') as data_file:
-                    count = 0
-                    while True:
-                        if count != 0 and count % 1000 == 0:
-                            print('Processed {} issues'.format(count))
-                        count += 1
-                        try:
-                            parsed_issue = JiraIssue.deserialize(data_file)
-                            jira_issues[parsed_issue.issue_key] = parsed_issue
-                        except EOFError:
-                            break
+                jira_issues = JiraProject.load_issues(data_file_name)
 
             new_jira_project = JiraProject(jira_connection=jira_connection, project_name=project_name, url=url,
-                                           custom_fields=custom_fields, issues=jira_issues, updated=updated)
+                                           custom_fields=custom_fields, issues=jira_issues, updated=updated,
+                                           reconcile_interval=reconcile_interval, last_reconciled=last_reconciled,
+                                           track_history=track_history, cache_scope=cache_scope,
+                                           cold_after_months=cold_after_months)
             jira_connection.add_and_link_jira_project(new_jira_project)
+            if residency.enabled and os.path.exists(data_file_name):
+                new_jira_project.unload()
+                new_jira_project._issue_count = issue_count
         except (IOError, configparser.NoOptionError):
             print('Failed to load cached data for project/connection from config file: {}'.format(file_name))
             traceback.print_exc()
             return None
-        print('Loaded project {} with {} issues cached. Last updated: {}'.format(new_jira_project.project_name,
-                                                                                 len(new_jira_project.jira_issues),
-                                                                                 new_jira_project.updated))
+        print('Loaded project {} with {} issues cached{}. Last updated: {}'.format(
+            new_jira_project.project_name, new_jira_project.issue_count,
+            '' if new_jira_project.is_resident else ' (not yet resident)', new_jira_project.updated))
         new_jira_project.save_config()
         return new_jira_project
 
     def save_config(self):
+        with self._save_lock:
+            self._write_config()
+
+    def _write_config(self):
         # .cfg file
         config_parser = configparser.RawConfigParser()
         config_parser.add_section('Config')
@@ -192,6 +489,14 @@ class JiraProject:
         config_parser.set('Config', 'project_name', self.project_name)
         config_parser.set('Config', 'updated', self.updated)
         config_parser.set('Config', 'url', self._url)
+        config_parser.set('Config', 'reconcile_interval', str(self.reconcile_interval))
+        if self.last_reconciled is not None:
+            config_parser.set('Config', 'last_reconciled', self.last_reconciled)
+        config_parser.set('Config', 'track_history', str(self.track_history))
+        if self.cache_scope is not None:
+            config_parser.set('Config', 'cache_scope', self.cache_scope)
+        config_parser.set('Config', 'cold_after_months', str(self.cold_after_months))
+        config_parser.set('Config', 'issue_count', str(self.issue_count))
         config_parser.set('Config', 'custom_fields', ','.join(list(self._custom_fields.keys())))
         for field in list(self._custom_fields.keys()):
             config_parser.set('Config', field, self._custom_fields[field])
@@ -199,9 +504,15 @@ class JiraProject:
         save_argus_config(config_parser, self.config_file())
 
         # Protect against saving during init wiping out the local data file. Shouldn't be an issue but seen it pop up
-        # during dev once or twice.
-        if len(self.jira_issues) > 0:
-            save_argus_data(list(self.jira_issues.values()), self._data_file())
+        # during dev once or twice. Nothing to write if we're unloaded; the data file is already current.
+        current = self._snapshot
+        if current is not None and len(current.issues) > 0:
+            save_argus_data(list(current.issues.values()), self._data_file())
+            self._saved_version = current.version
+        # Built here at the latest, while our issues are in memory, so graphs over us needn't reload them once unloaded
+        link_index = self.link_index if current is not None else self._link_index
+        if link_index is not None:
+            link_index.save()
 
     def delete_on_disk_files(self):
         if utils.unit_test:
@@ -211,12 +522,37 @@ class JiraProject:
             os.remove(self.config_file())
         if os.path.isfile(self._data_file()):
             os.remove(self._data_file())
+        self.history.delete_on_disk_files()
+        self.cold.delete_on_disk_files()
+        if self._link_index is None:
+            self._link_index = LinkIndex(self.jira_connection.connection_name, self.project_name)
+        self._link_index.delete_on_disk_files()
+        residency.forget(self)
 
         print('Successfully deleted cached Jira data for project: {}'.format(self))
         self.jira_connection = None
 
     def refresh(self):
-        new_issues = JiraUtils.get_issues_for_project(self.jira_connection, self.project_name, self.updated)
+        # type: () -> Tuple[List[JiraIssue], List[str]]
+        """
+        Pulls all issues updated since our last known update, reconciling against the server's key set if due. With a
+        cache_scope, issues updated out of scope since then are evicted; those that fall out of a relative scope just
+        by time passing, i.e. 'resolved >= -52w', go on reconciliation.
+        :return: tuple of (new / updated JiraIssues, issue keys evicted from this JiraProject)
+        """
+        previous_updated = self.updated
+        new_issues = JiraUtils.get_issues_for_project(self.jira_connection, self.project_name, self.updated,
+                                                      self.history if self.track_history else None, self.cache_scope)
+        removed_keys = []  # type: List[str]
+        if self.cache_scope is not None and self.issue_count > 0:
+            left_scope = JiraUtils.get_issue_keys_by_query(self.jira_connection, 'PROJECT = {} AND updated > "{}" AND NOT ({})'.format(
+                self.project_name, previous_updated, self.cache_scope))
+            removed_keys = sorted(left_scope & self.cached_keys())
+            if len(removed_keys) > 0:
+                print('Evicting {} issues that left cache scope for {}'.format(len(removed_keys), self.project_name))
+                self.publish_issues([], removed_keys)
+                self.save_config()
+
         if len(new_issues) > 0:
             print('Found {} updated/new issues for {}. Saving to disk.'.format(len(new_issues), self.project_name))
             for jira_issue in new_issues:
@@ -227,9 +563,149 @@ class JiraProject:
                     clean_ts = JiraProject.clean_ts(jira_issue['updated'])
                     if clean_ts > self.updated:
                         self.updated = clean_ts
-                self.jira_issues[jira_issue.issue_key] = jira_issue
+            self.publish_issues(new_issues)
             self.save_config()
 
+        if self.is_reconcile_due():
+            added_issues, reconciled_keys = self.reconcile()
+            new_issues = new_issues + added_issues
+            removed_keys = removed_keys + reconciled_keys
+        self.evict_cold()
+        return new_issues, removed_keys
+
+    def publish_issues(self, updated_issues, removed_keys=None):
+        # type: (List[JiraIssue], Optional[List[str]]) -> JiraProjectSnapshot
+        """
+        Publishes a new snapshot with updated_issues added and removed_keys dropped. The previous snapshot is left as-is
+        for any readers still holding it. Any of these held in the ColdSegment are dropped from it; an updated issue is
+        hot again until the next evict_cold.
+        """
+        if self.cold_after_months > 0:
+            cold_keys = [x.issue_key for x in updated_issues] + ([] if removed_keys is None else removed_keys)
+            self.cold.remove(cold_keys)
+        published = self._publish(updated_issues, removed_keys)
+        # Moves between hot and cold go through _publish directly, as they leave the project's links as they were
+        self.link_index.update(updated_issues, removed_keys)
+        return published
+
+    def _publish(self, updated_issues, removed_keys=None):
+        # type: (List[JiraIssue], Optional[List[str]]) -> JiraProjectSnapshot
+        reloaded = False
+        with self._publish_lock:
+            current = self._snapshot
+            if current is None:
+                current = self._load_locked()
+                reloaded = True
+            refreshed_issues = dict(current.issues)
+            if removed_keys is not None:
+                for issue_key in removed_keys:
+                    refreshed_issues.pop(issue_key, None)
+            for jira_issue in updated_issues:
+                refreshed_issues[jira_issue.issue_key] = jira_issue
+            self._snapshot = JiraProjectSnapshot(current.version + 1, refreshed_issues)
+            published = self._snapshot
+        if reloaded:
+            residency.loaded(self)
+        residency.touch(self)
+        return published
+
+    def backfill_history(self):
+        # type: () -> List[JiraIssue]
+        """
+        Re-pulls every issue in the project with its changelog, recording all history we don't have yet. Refresh only
+        records history for issues updated since the last one, so this is needed once when tracking is turned on.
+        :return: all issues pulled, which have also been published
+        """
+        all_issues = JiraUtils.get_issues_for_project(self.jira_connection, self.project_name, None, self.history,
+                                                      self.cache_scope)
+        self.publish_issues(all_issues)
+        self.save_config()
+        self.evict_cold()
+        return all_issues
+
+    def is_reconcile_due(self) -> bool:
+        if self.reconcile_interval <= 0:
+            return False
+        if self.last_reconciled is None:
+            return True
+        return time_utils.hours_since(time_utils.from_config_time(self.last_reconciled)) >= self.reconcile_interval
+
+    def reconcile(self):
+        # type: () -> Tuple[List[JiraIssue], List[str]]
+        """
+        An 'updated >' refresh never sees issues that were deleted or moved out of this project, so we periodically pull
+        the full key set from the server (keys only) and diff it against our cache. Stale issues are evicted, and any
+        moved into another JiraProject cached on this JiraConnection are re-homed there. Keys present on the server
+        but missing locally are pulled in. With a cache_scope, keys are limited to the scope, so issues out of scope are
+        evicted and those newly in scope are pulled in.
+        :return: tuple of (JiraIssues added here or re-homed elsewhere, issue keys evicted from this JiraProject)
+        """
+        print('Reconciling cached issue keys for project: {}'.format(self.project_name))
+        server_keys = JiraUtils.get_issue_keys_for_project(self.jira_connection, self.project_name, self.cache_scope)
+
+        # An empty result against a populated cache is far more likely a permissions or connectivity problem than every
+        # single issue having been deleted, so we refuse to wipe the cache on that basis.
+        if len(server_keys) == 0 and len(self.jira_issues) > 0:
+            print('WARNING! Server returned no issue keys for project: {}. Skipping reconciliation.'.format(self.project_name))
+            return [], []
+
+        cached_keys = self.cached_keys()
+        stale_keys = sorted(cached_keys - server_keys)
+        missing_keys = sorted(server_keys - cached_keys)
+
+        # Narrowing a scope can leave most of the cache stale. Those still in the project are simply out of scope, so we
+        # only pay to fetch the rest to tell moved from deleted.
+        out_of_scope_keys = []  # type: List[str]
+        if self.cache_scope is not None and len(stale_keys) > 0:
+            project_keys = JiraUtils.get_issue_keys_for_project(self.jira_connection, self.project_name)
+            out_of_scope_keys = [x for x in stale_keys if x in project_keys]
+            stale_keys = [x for x in stale_keys if x not in project_keys]
+
+        # One batch fetch covers both directions: Jira resolves the old key of a moved issue to its new key (deleted
+        # issues simply don't come back), and missing keys come back as-is.
+        added_issues = []  # type: List[JiraIssue]
+        rehomed_issues = []  # type: List[JiraIssue]
+        if len(stale_keys) + len(missing_keys) > 0:
+            for jira_issue in JiraUtils.get_issues_by_keys(self.jira_connection, stale_keys + missing_keys):
+                if jira_issue.project_name == self.project_name:
+                    # Still in the project but out of scope, so stays evicted
+                    if jira_issue.issue_key in server_keys:
+                        added_issues.append(jira_issue)
+                    continue
+                new_home = self.jira_connection.maybe_get_cached_jira_project(jira_issue.project_name)
+                if new_home is not None:
+                    new_home.publish_issues([jira_issue])
+                    new_home.save_config()
+                    rehomed_issues.append(jira_issue)
+
+        removed_keys = sorted(stale_keys + out_of_scope_keys)
+        self.publish_issues(added_issues, removed_keys)
+        print('Reconciled project {}. Evicted: {}. Out of scope: {}. Re-homed: {}. Added missing: {}.'.format(
+            self.project_name, len(stale_keys), len(out_of_scope_keys), len(rehomed_issues), len(added_issues)))
+        self.last_reconciled = time_utils.to_config_time(time_utils.current_time())
+        self.save_config()
+        return added_issues + rehomed_issues, removed_keys
+
+    def set_cache_scope(self, cache_scope):
+        # type: (Optional[str]) -> None
+        """
+        Changes which issues we cache. Reconciliation runs on the next refresh, evicting what's now out of scope and
+        pulling in what's newly in.
+        """
+        self.cache_scope = cache_scope
+        self.last_reconciled = None
+        self.save_config()
+
+    def cached_keys(self):
+        # type: () -> Set[str]
+        """
+        :return: keys of every issue we hold, hot or cold
+        """
+        keys = set(self.jira_issues.keys())
+        if self.cold_after_months > 0:
+            keys |= self.cold.keys()
+        return keys
+
     def link_jira_connection(self, jira_connection: 'JiraConnection') -> None:
         if jira_connection.url != self._url:
             raise ConfigError(
@@ -252,7 +728,9 @@ class JiraProject:
         :param search_type: 'a': all. 'o': open. 'c': closed
         """
         results = []
-        for k, v in self.jira_issues.items():
+        # Open issues are never cold, so an open-only search sticks to memory
+        source = self.snapshot().issues if search_type == 'o' else self.all_issues()
+        for k, v in source.items():
             if v.matches(self.jira_connection, search_string):
                 if search_type == 'o' and v.is_open:
                     results.append(v)
@@ -272,9 +750,12 @@ class JiraProject:
     def get_issue(self, issue_key):
         """
         :param issue_key: str to search for
-        :return: JiraIssue if found, None if not a member
+        :return: JiraIssue if found, faulting it in from the ColdSegment if need be. None if not a member
         """
-        return None if issue_key not in self.jira_issues else self.jira_issues[issue_key]
+        jira_issue = self.jira_issues.get(issue_key)
+        if jira_issue is None and self.cold_after_months > 0:
+            return self.cold.get(issue_key)
+        return jira_issue
 
     def translate_custom_field(self, field_name):
         # type: (str) -> str
@@ -289,7 +770,7 @@ class JiraProject:
         """
         Resolves any links between jira tickets, translating from str repr to in-memory ref to JiraIssue
         """
-        for jira_issue in self.jira_issues.values():
+        for jira_issue in self.snapshot().issues.values():
             jira_issue.resolve_dependencies(jira_manager)
 
     def __str__(self):
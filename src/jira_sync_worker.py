@@ -0,0 +1,218 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src.request_scheduler import BACKGROUND, request_priority
+from src.utils import ConfigError, argus_debug
+
+if TYPE_CHECKING:
+    from src.jira_manager import JiraManager
+    from src.jira_project import JiraProject
+    from typing import Deque, Dict, List, Optional, Tuple
+
+
+class JiraSyncWorker:
+    """
+    Refreshes cached JiraProjects on a background thread so the menus never block on JIRA. Menus keep reading the
+    snapshot a project had published when they started; JiraProject.refresh publishes a new one once a project
+    finishes, after which the JiraManager re-resolves dependencies for the changed issues.
+    """
+
+    # Minutes between full background refresh passes. <= 0 only syncs on startup and on request.
+    DEFAULT_INTERVAL = 15
+
+    # Number of lines of background output retained for display in the sync log
+    LOG_LINES = 200
+
+    def __init__(self, jira_manager, interval=DEFAULT_INTERVAL):
+        # type: (JiraManager, int) -> None
+        self._jira_manager = jira_manager
+        self.interval = interval
+
+        # Pending (connection_name, project_name) pairs, in request order
+        self._queue = deque()  # type: Deque[Tuple[str, str]]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+
+        self._current = None  # type: Optional[str]
+        self._failed = []  # type: List[str]
+        self.last_completed = None  # type: Optional[str]
+        self.log = deque(maxlen=JiraSyncWorker.LOG_LINES)  # type: Deque[str]
+
+    @property
+    def is_running(self):
+        # type: () -> bool
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        # type: () -> None
+        """
+        Starts the worker thread and queues an initial refresh of every cached JiraProject. Output printed by the
+        worker thread is captured into the sync log instead of being interleaved with the menus.
+        """
+        if self.is_running:
+            return
+        if not isinstance(sys.stdout, _ThreadOutputRouter):
+            sys.stdout = _ThreadOutputRouter(sys.stdout)
+        self._thread = threading.Thread(target=self._run, name='JiraSyncWorker', daemon=True)
+        sys.stdout.capture(self._thread, self.log)
+        self.request_sync()
+        self._thread.start()
+
+    def request_sync(self, jira_projects=None, urgent=False):
+        # type: (Optional[List[JiraProject]], bool) -> None
+        """
+        Queues the input JiraProjects for refresh, or all cached JiraProjects if None. Projects already queued keep
+        their place unless urgent, in which case they move to the front of the queue in input order.
+        """
+        if jira_projects is None:
+            jira_projects = list(self._jira_manager.get_all_cached_jira_projects().values())
+        with self._lock:
+            entries = [(x.jira_connection.connection_name, x.project_name) for x in jira_projects]
+            if urgent:
+                for entry in reversed(entries):
+                    if entry in self._queue:
+                        self._queue.remove(entry)
+                    self._queue.appendleft(entry)
+            else:
+                for entry in entries:
+                    if entry not in self._queue:
+                        self._queue.append(entry)
+        self._wake.set()
+
+    @property
+    def status(self):
+        # type: () -> str
+        with self._lock:
+            pending = len(self._queue)
+            current = self._current
+        if not self.is_running:
+            result = 'Background sync stopped'
+        elif current is not None:
+            result = 'Syncing {} ({} queued)'.format(current, pending)
+        elif self.last_completed is None:
+            result = 'Waiting to sync'
+        else:
+            result = 'Up to date as of {}'.format(self.last_completed)
+        if len(self._failed) > 0:
+            result += '. Failed: {}'.format(','.join(self._failed))
+        return result
+
+    def display_log(self):
+        print('Background sync status: {}'.format(self.status))
+        for line in list(self.log):
+            print('   {}'.format(line))
+
+    def _next_project(self):
+        # type: () -> Optional[JiraProject]
+        with self._lock:
+            while len(self._queue) > 0:
+                connection_name, project_name = self._queue.popleft()
+                try:
+                    jira_connection = self._jira_manager.get_jira_connection(connection_name)
+                except ConfigError:
+                    continue
+                jira_project = jira_connection.maybe_get_cached_jira_project(project_name)
+                # Project may have been deleted from the cache while it sat in the queue
+                if jira_project is not None:
+                    self._current = project_name
+                    return jira_project
+            self._current = None
+            return None
+
+    def _run(self):
+        synced = False
+        while True:
+            jira_project = self._next_project()
+            if jira_project is not None:
+                self._sync_project(jira_project)
+                synced = True
+                continue
+
+            if synced:
+                self._sync_remote_issues()
+                self.last_completed = datetime.now().strftime('%H:%M')
+                synced = False
+            # Sleep until either a sync is requested or our interval lapses, at which point the RefreshPlanner picks
+            # which projects are worth refreshing
+            timeout = self.interval * 60 if self.interval > 0 else None
+            if not self._wake.wait(timeout):
+                self.request_sync(self._jira_manager.plan_refreshes())
+            self._wake.clear()
+
+    def _sync_remote_issues(self):
+        try:
+            with request_priority(BACKGROUND):
+                self._jira_manager.sync_remote_issues()
+        except Exception as e:
+            print('Failed to fetch linked issues on uncached projects: {}'.format(e))
+            argus_debug(traceback.format_exc())
+
+    def _sync_project(self, jira_project):
+        # type: (JiraProject) -> None
+        project_name = jira_project.project_name
+        try:
+            # Give way to anything the user is waiting on in the menus
+            with request_priority(BACKGROUND):
+                changed_issues, removed_keys = jira_project.refresh()
+            self._jira_manager.on_project_refreshed(changed_issues, removed_keys)
+            self._jira_manager.refresh_planner.record_sync(project_name, len(changed_issues))
+            if project_name in self._failed:
+                self._failed.remove(project_name)
+        # Network and server errors shouldn't kill the worker; we log and retry on the next pass
+        except Exception as e:
+            print('Failed to refresh JiraProject {}: {}'.format(project_name, e))
+            argus_debug(traceback.format_exc())
+            if project_name not in self._failed:
+                self._failed.append(project_name)
+
+
+class _ThreadOutputRouter:
+    """
+    Stands in for sys.stdout, diverting lines written by captured threads into a log while passing everything else
+    through unchanged.
+    """
+
+    def __init__(self, target):
+        self._target = target
+        self._captured = {}  # type: Dict[int, Deque[str]]
+        self._partial = {}  # type: Dict[int, str]
+
+    def capture(self, thread, log):
+        # type: (threading.Thread, Deque[str]) -> None
+        self._captured[id(thread)] = log
+
+    def write(self, text):
+        key = id(threading.current_thread())
+        if key not in self._captured:
+            return self._target.write(text)
+        lines = (self._partial.pop(key, '') + text).split('\n')
+        if lines[-1] != '':
+            self._partial[key] = lines[-1]
+        for line in lines[:-1]:
+            self._captured[key].append(line)
+        return len(text)
+
+    def flush(self):
+        self._target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
@@ -12,15 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing
+import os
 import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from subprocess import Popen
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from typing import TYPE_CHECKING
 
 from src.jira_issue import JiraIssue
-from src.utils import browser, ConfigError
+from src.utils import argus_debug, browser, ConfigError
 
 if TYPE_CHECKING:
+    from src.issue_history import IssueHistory
     from src.jira_connection import JiraConnection
     from src.jira_manager import JiraManager
 
@@ -38,8 +43,31 @@ class JiraUtils:
     # Cache of all seen JIRA issues from querying by key
     _cached_jira_issues = {}  # type: Dict[str, JiraIssue]
 
+    # Page size for keys-only queries. These are cheap enough on the server to pull in much larger pages than full issues.
+    KEY_PAGE_SIZE = 1000
+
+    # Number of keys per 'key in (...)' clause. Keeps the JQL well under server URL / query length limits.
+    KEY_BATCH_SIZE = 200
+
+    # Page size for full issue queries during project sync
+    PAGE_SIZE = 100
+
+    # Lazily created on the first multi-page sync and reused for the life of the process, as spinning up workers per sync
+    # would cost more than the conversion itself.
+    _conversion_pool = None  # type: Optional[ProcessPoolExecutor]
+
     @staticmethod
-    def get_issues_by_query(jira_connection: 'JiraConnection', jql: str) -> List['JiraIssue']:
+    def get_issues_by_query(jira_connection: 'JiraConnection', jql: str, max_age_minutes: float=0) -> List['JiraIssue']:
+        """
+        Routes through the connection's on-disk QueryCache, so a repeat of a query we've run before only fetches what
+        changed since, plus a keys-only membership check, rather than every page.
+        :param max_age_minutes: serve cached results younger than this without asking the server at all
+        :return: list of JIRA Issues matching query, in key order
+        """
+        return jira_connection.query_cache.get_issues(jql, max_age_minutes=max_age_minutes)
+
+    @staticmethod
+    def fetch_issues_by_query(jira_connection: 'JiraConnection', jql: str) -> List['JiraIssue']:
         """
         NOTE: Whenever we query jira issues out of a Jira instance, we need to use this method to ensure that the
         project type associated with the query is cached for custom field translation in the future.
@@ -72,35 +100,187 @@ class JiraUtils:
         return results
 
     @staticmethod
-    def get_issues_for_project(jira_connection: 'JiraConnection', project_name: str, update_cutoff: Optional[str]=None) -> List['JiraIssue']:
+    def get_issues_for_project(jira_connection: 'JiraConnection',
+                               project_name: str,
+                               update_cutoff: Optional[str]=None,
+                               history: Optional['IssueHistory']=None,
+                               scope: Optional[str]=None) -> List['JiraIssue']:
         """
         Queries out all results for a given project on the provided JiraConnection after a specified update time.
         :param update_cutoff: str datetime in valid JIRA timestamp format.
             NOTE: Valid formats: 'yyyy/MM/dd HH:mm', 'yyyy-MM-dd HH:mm', 'yyyy/MM/dd', 'yyyy-MM-dd', or a period format e.g. '-5d', '4w 2d'
             Most frequently expected use-case is a specific yyyy/MM/dd HH:mm to get all tickets since last update
+        :param history: if provided, changelogs are expanded on the query and appended to this IssueHistory
+        :param scope: JQL fragment limiting the query to the part of the project we cache, see JiraProject.cache_scope
         """
         update_text = '' if update_cutoff is None else ' AND updated > "{}"'.format(update_cutoff)
-        jql = 'PROJECT = {}{}'.format(project_name, update_text)
+        jql = '{}{}'.format(JiraUtils.project_jql(project_name, scope), update_text)
         print('Getting issues for project using JQL: {}'.format(jql))
         print('NOTE: Some small duplicate issue retrieval will likely occur due to lack of granularity in <updated> field.')
         results = []
+        # Conversion is CPU bound, so on multi-page syncs we hand each raw page off to worker processes and keep fetching
+        # while they convert. Single page updates (the common incremental case) aren't worth the pickling round trip.
+        pending = []  # type: List[Tuple[List[Dict], Future]]
+        pool = None
         total = sys.maxsize
         retrieved = 0
         while retrieved < total:
-            queried = jira_connection.search_issues('PROJECT = {}{}'.format(project_name, update_text), startAt=retrieved, maxResults=100)
-            total = queried.total
-            print('Querying results in 100 issue increments for project {}. (startAt: {}. total: {})'.format(project_name, retrieved, total))
-            retrieved += len(queried)
-            for issue in queried:
+            # Bulk sync goes through the raw json path; building jira.Issue Resources for every result costs more CPU
+            # than the network time on large syncs.
+            queried = jira_connection.search_issues_json(jql, start_at=retrieved, max_results=JiraUtils.PAGE_SIZE,
+                                                         expand=None if history is None else 'changelog')
+            total = queried['total']
+            print('Querying results in {} issue increments for project {}. (startAt: {}. total: {})'.format(
+                JiraUtils.PAGE_SIZE, project_name, retrieved, total))
+            raw_issues = queried['issues']
+            if retrieved == 0 and total > len(raw_issues):
+                pool = JiraUtils._get_conversion_pool()
+            retrieved += len(raw_issues)
+            if len(raw_issues) == 0:
+                break
+            if history is not None:
+                JiraUtils._record_changelogs(jira_connection, history, raw_issues)
+            if pool is not None:
                 try:
-                    new_issue = JiraIssue(jira_connection, issue)
-                    results.append(new_issue)
-                except ConfigError as ce:
-                    print('Error initializing JiraIssue: {}. Problem issue: {}. Skipping.'.format(ce, str(issue)))
+                    pending.append((raw_issues, pool.submit(JiraUtils.convert_raw_issues, jira_connection.connection_name, raw_issues)))
+                    continue
+                except BrokenProcessPool:
+                    # A worker died since the last page. Pages already handed off are recovered in _collect_converted_pages.
+                    print('JiraIssue conversion worker failed. Converting remaining pages in-process.')
+                    JiraUtils._conversion_pool = None
+                    pool = None
+            results.extend(JiraUtils.convert_raw_issues(jira_connection.connection_name, raw_issues))
+        results.extend(JiraUtils._collect_converted_pages(jira_connection.connection_name, pending))
+
+        # Pages can complete in any order and the server doesn't promise a stable order across pages, so merge into key
+        # order to keep downstream insertion / processing deterministic.
+        results = JiraUtils.sort_jira_issues(results)
         update_flavor = '' if update_cutoff is None else ' since {}'.format(update_cutoff)
         print('Queried a total of {} JIRA issues for project {}{}'.format(len(results), project_name, update_flavor))
         return results
 
+    @staticmethod
+    def project_jql(project_name: str, scope: Optional[str]=None) -> str:
+        if scope is None:
+            return 'PROJECT = {}'.format(project_name)
+        return 'PROJECT = {} AND ({})'.format(project_name, scope)
+
+    @staticmethod
+    def _record_changelogs(jira_connection: 'JiraConnection', history: 'IssueHistory', raw_issues: List[Dict]) -> None:
+        """
+        Strips the expanded changelog off each raw issue (keeping it out of conversion) and appends it to history
+        """
+        changelogs = {}  # type: Dict[str, List[Dict]]
+        for raw_issue in raw_issues:
+            changelog = raw_issue.pop('changelog', None)
+            if changelog is None:
+                continue
+            histories = changelog.get('histories', [])
+            # Some JIRA versions cap the changelog inlined in search results
+            if changelog.get('total', len(histories)) > len(histories):
+                histories = jira_connection.get_issue_changelog(raw_issue['key'])
+            changelogs[raw_issue['key']] = histories
+        history.append_changelogs(changelogs)
+
+    @staticmethod
+    def get_issue_keys_for_project(jira_connection: 'JiraConnection', project_name: str, scope: Optional[str]=None) -> Set[str]:
+        """
+        Queries out only the keys of all issues currently in a project. Used to reconcile the local cache against issues
+        that have since been deleted or moved, which an 'updated >' query will never return.
+        :param scope: JQL fragment limiting the keys to the part of the project we cache
+        """
+        results = JiraUtils.get_issue_keys_by_query(jira_connection, JiraUtils.project_jql(project_name, scope))
+        print('Queried {} issue keys for project {}'.format(len(results), project_name))
+        return results
+
+    @staticmethod
+    def get_issue_keys_by_query(jira_connection: 'JiraConnection', jql: str) -> Set[str]:
+        """
+        Keys-only form of fetch_issues_by_query, for checking which cached issues still match a query
+        """
+        results = set()  # type: Set[str]
+        total = sys.maxsize
+        retrieved = 0
+        while retrieved < total:
+            queried = jira_connection.search_issues_json(jql, start_at=retrieved, max_results=JiraUtils.KEY_PAGE_SIZE, fields='key')
+            total = queried['total']
+            raw_issues = queried['issues']
+            retrieved += len(raw_issues)
+            if len(raw_issues) == 0:
+                break
+            for raw_issue in raw_issues:
+                results.add(raw_issue['key'])
+        return results
+
+    @staticmethod
+    def get_issues_by_keys(jira_connection: 'JiraConnection',
+                           issue_keys: List[str],
+                           updated_since: Optional[str]=None) -> List['JiraIssue']:
+        """
+        Batch fetches the issues matching the input keys. Jira resolves keys of moved issues to their new key, so results
+        may contain keys other than those requested. Keys of deleted issues are silently dropped.
+        :param updated_since: JQL timestamp; if set, only those of the issues updated since are fetched
+        """
+        results = []
+        sorted_keys = sorted(issue_keys)
+        for idx in range(0, len(sorted_keys), JiraUtils.KEY_BATCH_SIZE):
+            batch = sorted_keys[idx:idx + JiraUtils.KEY_BATCH_SIZE]
+            jql = 'key in ({})'.format(','.join(batch))
+            if updated_since is not None:
+                jql += ' AND updated >= "{}"'.format(updated_since)
+            # validate_query=False so that keys of deleted issues produce warnings rather than failing the whole batch
+            queried = jira_connection.search_issues_json(jql, max_results=len(batch), validate_query=False)
+            results.extend(JiraUtils.convert_raw_issues(jira_connection.connection_name, queried['issues']))
+        return results
+
+    @staticmethod
+    def convert_raw_issues(jira_connection_name: str, raw_issues: List[Dict]) -> List['JiraIssue']:
+        """
+        Converts a page of raw /rest/api/2/search issue dicts into JiraIssues, skipping any that fail conversion
+        """
+        results = []
+        for raw_issue in raw_issues:
+            try:
+                results.append(JiraIssue.from_json(jira_connection_name, raw_issue))
+            except ConfigError as ce:
+                print('Error initializing JiraIssue: {}. Problem issue: {}. Skipping.'.format(ce, raw_issue.get('key')))
+        return results
+
+    @staticmethod
+    def _get_conversion_pool() -> Optional[ProcessPoolExecutor]:
+        """
+        :return: shared ProcessPoolExecutor for JiraIssue conversion, or None if we can't create worker processes here,
+            in which case callers convert in-process.
+        """
+        if JiraUtils._conversion_pool is None:
+            try:
+                # spawn rather than fork: syncs run while other threads (menus, background sync) hold locks that a forked
+                # child would inherit in a locked state.
+                JiraUtils._conversion_pool = ProcessPoolExecutor(
+                    max_workers=max(1, (os.cpu_count() or 2) - 1),
+                    mp_context=multiprocessing.get_context('spawn'))
+            except (OSError, NotImplementedError) as e:
+                print('Unable to start JiraIssue conversion workers ({}). Converting in-process.'.format(e))
+                return None
+            except TypeError:
+                # mp_context needs python 3.7, and forking with our other threads running isn't safe
+                argus_debug('No spawn context for JiraIssue conversion workers on this python. Converting in-process.')
+                return None
+        return JiraUtils._conversion_pool
+
+    @staticmethod
+    def _collect_converted_pages(jira_connection_name: str, pending: List[Tuple[List[Dict], Future]]) -> List['JiraIssue']:
+        results = []
+        for raw_issues, future in pending:
+            try:
+                results.extend(future.result())
+            except BrokenProcessPool:
+                # A worker died (OOM killer, etc). Drop the pool so the next sync starts fresh and convert this page here.
+                print('JiraIssue conversion worker failed. Converting remaining pages in-process.')
+                JiraUtils._conversion_pool = None
+                results.extend(JiraUtils.convert_raw_issues(jira_connection_name, raw_issues))
+        return results
+
     @classmethod
     def retrieve_field_value(cls, jira_manager, issue, field):
         # type: (JiraManager, JiraIssue, str) -> str
@@ -9,11 +9,14 @@ from src import utils
 from src.display_filter import DisplayFilter
 from src.jira_filter import JiraFilter
 from src.jira_utils import JiraUtils
+from src.query_cache import QueryCache
+from src.time_utils import parse_as_of
 from src.utils import (ConfigError, argus_debug, get_input, pick_value,
                        print_separator, save_argus_config, jira_view_dir)
 
 if TYPE_CHECKING:
-    from typing import Dict, List
+    from datetime import datetime
+    from typing import Dict, List, Optional
     from src.jira_connection import JiraConnection
     from src.jira_manager import JiraManager
     from src.jira_issue import JiraIssue
@@ -131,13 +134,17 @@ class JiraView:
         df = DisplayFilter.default()
 
         working_issues = list(self.get_issues().values())
+        jira_manager.note_displayed_issues(working_issues)
         while True:
             try:
                 issues = df.display_and_return_sorted_issues(jira_manager, working_issues)
                 print_separator(60)
                 print('[JiraView operations for {}]'.format(self.name))
+                if df.as_of is not None:
+                    print('Showing view as of {}'.format(df.as_of.strftime('%Y/%m/%d %H:%M')))
                 custom = get_input('[f] to manually enter a substring to regex issues in the view' + os.linesep +
                                    '[c] to clear all regex filtering' + os.linesep +
+                                   '[a] to show the view as of a past date' + os.linesep +
                                    '[#] Integer value to open ticket in browser ' + os.linesep +
                                    '[q] to quit' + os.linesep +
                                    ':')
@@ -151,7 +158,15 @@ class JiraView:
                             new_issues.append(jira_issue)
                     working_issues = new_issues
                 elif custom == 'c':
-                    working_issues = list(self.get_issues().values())
+                    working_issues = list(self.get_issues(as_of=df.as_of).values())
+                elif custom == 'a':
+                    value = get_input('As of (yyyy/mm/dd, a delta such as -2w, or blank for now):', lowered=False)
+                    try:
+                        df.as_of = None if value.strip() == '' else parse_as_of(value)
+                    except ValueError as ve:
+                        print(ve)
+                        continue
+                    working_issues = list(self.get_issues(as_of=df.as_of).values())
                 else:
                     try:
                         JiraUtils.open_issue_in_browser(
@@ -276,18 +291,33 @@ class JiraView:
     def is_empty(self):
         return len(self._jira_filters) == 0
 
-    def get_issues(self, string_matches=None):
-        # type: (List[str]) -> Dict[str, JiraIssue]
+    def get_issues(self, string_matches=None, as_of=None, closed_since=None):
+        # type: (List[str], Optional[datetime], Optional[datetime]) -> Dict[str, JiraIssue]
         """
-        Applies nested JiraFilters to all associated cached JiraProjects for the contained JiraConnection
+        Applies nested JiraFilters to all associated cached JiraProjects for the contained JiraConnection. Projects the
+        view's Project filter names that we don't cache are queried server-side with our filters translated to JQL.
         :param string_matches: substring(s) to match against JiraIssue fields for further refining of a search
+        :param as_of: evaluate the view against issues as they stood at this time, rewound through project history
+        :param closed_since: include issues closed from this time on, even those aged out to cold storage
         :return: {} of key -> JiraIssue that match JiraFilters and input regexes
         """
 
         if string_matches is None:
             string_matches = []
 
-        source_issues = self.jira_connection.cached_jira_issues
+        if as_of is None:
+            # Everyday views only scan what's in memory; explicitly asking for resolved issues faults in cold ones
+            if self.includes_closed():
+                source_issues = self.jira_connection.cached_jira_issues_closed_since(None)
+            elif closed_since is not None:
+                source_issues = self.jira_connection.cached_jira_issues_closed_since(int(closed_since.timestamp()))
+            else:
+                source_issues = self.jira_connection.cached_jira_issues
+        else:
+            untracked = [x.project_name for x in self.jira_connection.cached_projects if not x.track_history]
+            if len(untracked) > 0:
+                print('History tracking is off for {}; their issues will show current values.'.format(', '.join(untracked)))
+            source_issues = self.jira_connection.cached_jira_issues_as_of(int(as_of.timestamp()))
 
         matching_issues = {}
         excluded_count = 0
@@ -361,6 +391,15 @@ class JiraView:
                     elif matched:
                         matching_issues[jira_issue.issue_key] = jira_issue
 
+        remote_projects = self.uncached_projects()
+        if len(remote_projects) > 0:
+            if as_of is not None:
+                print('Cannot rewind uncached projects {}; leaving them out.'.format(', '.join(remote_projects)))
+            else:
+                for jira_issue in self._get_remote_issues(remote_projects):
+                    if jira_issue.matches_any(self.jira_connection, string_matches):
+                        matching_issues[jira_issue.issue_key] = jira_issue
+
         print('Returning total of {} JiraIssues matching JiraView {}. Excluded count: {}'.format(
             len(list(matching_issues.keys())),
             self.name,
@@ -368,6 +407,84 @@ class JiraView:
 
         return matching_issues
 
+    def includes_closed(self):
+        # type: () -> bool
+        """
+        :return: whether our resolution filter includes anything other than Unresolved
+        """
+        resolution_filter = self._jira_filters.get('resolution')
+        return resolution_filter is not None and any(x != 'None' for x in resolution_filter.includes)
+
+    def uncached_projects(self):
+        # type: () -> List[str]
+        """
+        :return: projects the view's Project filter includes that aren't cached on our connection, and so can only be
+            queried server-side
+        """
+        project_filter = self._jira_filters.get('Project')
+        if project_filter is None:
+            return []
+        cached = {x.project_name for x in self.jira_connection.cached_projects}
+        return sorted({x.upper() for x in project_filter.includes if x.upper() not in cached})
+
+    def build_jql(self):
+        # type: () -> Optional[str]
+        """
+        Translates our JiraFilters into JQL, matching what get_issues does locally. AND filters must each include the
+        issue, and at least one OR filter must if there are any. A filter's excludes are only checked on issues it
+        doesn't include, so they never come into AND filters and on OR filters only rule out what that filter doesn't
+        include.
+        :return: JQL equivalent to our filters, or None if any of them can only be evaluated locally or they can't
+            match anything
+        """
+        clauses = []
+        or_clauses = []
+        has_or = False
+        for jira_filter in list(self._jira_filters.values()):
+            translated = jira_filter.to_jql()
+            if translated is None:
+                return None
+            include_clause, exclude_clause = translated
+            if jira_filter.query_type() == 'OR':
+                has_or = True
+                if include_clause is not None:
+                    or_clauses.append(include_clause)
+                if exclude_clause is not None:
+                    clauses.append(exclude_clause if include_clause is None
+                                   else '({} OR {})'.format(include_clause, exclude_clause))
+            elif include_clause is not None:
+                clauses.append(include_clause)
+            else:
+                # Locally an AND filter drops everything it doesn't include
+                return None
+        if len(or_clauses) > 0:
+            clauses.append('({})'.format(' OR '.join(or_clauses)))
+        elif has_or:
+            return None
+        if len(clauses) == 0:
+            return None
+        return '{} ORDER BY key'.format(' AND '.join(clauses))
+
+    def _get_remote_issues(self, remote_projects):
+        # type: (List[str]) -> List[JiraIssue]
+        """
+        Runs the view server-side against projects we don't cache, through the connection's QueryCache so reopening the
+        view within QueryCache.MAX_AGE_MINUTES makes no requests.
+        """
+        jql = self.build_jql()
+        if jql is None:
+            print('JiraView {} has filters that can\'t be run server-side. Cache {} to include them.'.format(
+                self.name, ', '.join(remote_projects)))
+            return []
+        jql = 'project in ({}) AND {}'.format(','.join(remote_projects), jql)
+        argus_debug('JiraView {} querying uncached projects with: {}'.format(self.name, jql))
+        try:
+            return JiraUtils.get_issues_by_query(self.jira_connection, jql, QueryCache.MAX_AGE_MINUTES)
+        except JIRAError as je:
+            print('Failed to query uncached projects {} for JiraView {}: {}'.format(
+                ', '.join(remote_projects), self.name, je.text))
+            return []
+
     def contains_team(self, team):
         return team in self._teams
 
@@ -0,0 +1,194 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import json
+import socketserver
+import threading
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import TYPE_CHECKING
+
+from src.jira_issue import JiraIssue
+from src.utils import argus_debug
+
+if TYPE_CHECKING:
+    from src.jira_manager import JiraManager
+    from src.jira_project import JiraProject
+    from typing import Dict, Optional, Set
+
+
+class JiraWebhookReceiver:
+    """
+    Local HTTP listener for JIRA issue webhooks. Created / updated / deleted issue payloads are converted through the
+    same JiraIssue.from_json path the sync uses and published straight into the owning cached JiraProject, so the
+    background poll only needs to run as an infrequent safety net for missed deliveries and moved issues.
+
+    Register http://<host>:<port>/ as a webhook on the JIRA instance for the issue created, updated and deleted events.
+    The default host only accepts deliveries from this machine; bind to an address the JIRA instance can reach, or
+    0.0.0.0 for every interface, to receive them from a remote one.
+    """
+
+    DEFAULT_HOST = 'localhost'
+    DEFAULT_PORT = 8477
+
+    # Minimum minutes between background polls while we're receiving pushed updates
+    SAFETY_NET_SYNC_INTERVAL = 240
+
+    # Seconds to coalesce pushed updates before rewriting a project's data file
+    SAVE_DELAY = 10
+
+    CREATED = 'jira:issue_created'
+    UPDATED = 'jira:issue_updated'
+    DELETED = 'jira:issue_deleted'
+
+    def __init__(self, jira_manager, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        # type: (JiraManager, str, int) -> None
+        self._jira_manager = jira_manager
+        self.host = host
+        self.port = port
+        self._server = None  # type: Optional[_WebhookServer]
+
+        self._dirty_projects = set()  # type: Set[JiraProject]
+        self._save_lock = threading.Lock()
+        self._save_timer = None  # type: Optional[threading.Timer]
+
+        self.received_count = 0
+
+    @property
+    def is_running(self):
+        # type: () -> bool
+        return self._server is not None
+
+    def start(self):
+        # type: () -> None
+        if self.is_running:
+            return
+        self._server = _WebhookServer((self.host, self.port), _WebhookRequestHandler)
+        self._server.receiver = self
+        # Pick up the real port if we were asked to bind to any free one
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='JiraWebhookReceiver', daemon=True).start()
+        # Don't lose coalesced updates still waiting on the save timer when Argus exits
+        atexit.register(self.flush)
+        print('Listening for JIRA webhooks on http://{}:{}/'.format(self.host, self.port))
+
+    def stop(self):
+        # type: () -> None
+        if not self.is_running:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        atexit.unregister(self.flush)
+        self.flush()
+
+    def apply_event(self, payload):
+        # type: (Dict) -> bool
+        """
+        Applies a single webhook payload to the matching cached JiraProject.
+        :return: True if the payload was for an issue we cache, False if it was ignored
+        """
+        event = payload.get('webhookEvent')
+        raw_issue = payload.get('issue')
+        if event not in (self.CREATED, self.UPDATED, self.DELETED) or raw_issue is None or 'key' not in raw_issue:
+            argus_debug('Ignoring webhook payload with event: {}'.format(event))
+            return False
+
+        jira_project = self._find_jira_project(raw_issue)
+        if jira_project is None:
+            argus_debug('Ignoring webhook for uncached issue: {}'.format(raw_issue['key']))
+            return False
+
+        if event == self.DELETED:
+            jira_project.publish_issues([], [raw_issue['key']])
+            self._jira_manager.on_project_refreshed([], [raw_issue['key']])
+        else:
+            # We deliberately leave JiraProject.updated alone; if we advanced it here, a delivery dropped before this one
+            # would never be picked up by the safety net poll. That poll also evicts the issue again if it's outside a
+            # scoped project's cache_scope, which we can't evaluate locally.
+            jira_issue = JiraIssue.from_json(jira_project.jira_connection.connection_name, raw_issue)
+            jira_project.publish_issues([jira_issue])
+            self._jira_manager.on_project_refreshed([jira_issue], [])
+
+        self.received_count += 1
+        self._schedule_save(jira_project)
+        return True
+
+    def flush(self):
+        # type: () -> None
+        """
+        Writes out every JiraProject changed by a webhook since the last flush
+        """
+        with self._save_lock:
+            dirty_projects = self._dirty_projects
+            self._dirty_projects = set()
+            self._save_timer = None
+        for jira_project in dirty_projects:
+            jira_project.save_config()
+
+    def _schedule_save(self, jira_project):
+        # type: (JiraProject) -> None
+        with self._save_lock:
+            self._dirty_projects.add(jira_project)
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _find_jira_project(self, raw_issue):
+        # type: (Dict) -> Optional[JiraProject]
+        """
+        Matches the issue's self link against our JiraConnection urls, falling back to project name alone since those
+        are unique across connections.
+        """
+        project_name = raw_issue['key'].split('-')[0]
+        issue_url = raw_issue.get('self', '')
+        for jira_connection in self._jira_manager.jira_connections():
+            if issue_url.startswith(jira_connection.url):
+                return jira_connection.maybe_get_cached_jira_project(project_name)
+        return self._jira_manager.get_all_cached_jira_projects().get(project_name)
+
+
+class _WebhookServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    Handles each delivery on its own thread. http.server.ThreadingHTTPServer only arrived in python 3.7.
+    """
+    daemon_threads = True
+
+
+class _WebhookRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            self.send_error(400, 'Malformed webhook payload')
+            return
+
+        try:
+            self.server.receiver.apply_event(payload)
+        except Exception as e:
+            print('Failed to apply JIRA webhook: {}'.format(e))
+            argus_debug(traceback.format_exc())
+            self.send_error(500)
+            return
+
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Default logs every request to stderr, which would scribble over the menus
+        argus_debug('Webhook: {}'.format(format % args))
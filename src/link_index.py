@@ -0,0 +1,131 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import threading
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Optional, Tuple
+    from src.jira_issue import JiraIssue
+
+    # (parsed_links, fixVersions, is_closed)
+    LinkEntry = Tuple[Tuple[Tuple[str, str, str], ...], str, bool]
+
+
+class LinkIndex:
+    """
+    The links, FixVersions and resolution of every issue in a JiraProject, hot and cold, held apart from the issues in a
+    .links file next to the project's data file. A DependencyGraph is built from these, so neither cold segments nor
+    unloaded projects have to be read for it.
+
+    The version only moves when an entry actually changes, so the many syncs that only touch other fields don't
+    invalidate graphs built from it. Entries are replaced wholesale on each change, so readers never need the lock.
+    """
+
+    def __init__(self, connection_name, project_name):
+        # type: (str, str) -> None
+        self.connection_name = connection_name
+        self.project_name = project_name
+        self._version = 0
+        self._entries = None  # type: Optional[Dict[str, LinkEntry]]
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        file_name = os.path.join(jira_data_dir, '{}_{}.links'.format(self.connection_name, self.project_name))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    @staticmethod
+    def entry(jira_issue):
+        # type: (JiraIssue) -> LinkEntry
+        return tuple(jira_issue.parsed_links()), jira_issue.get('fixVersions', ''), jira_issue.is_closed
+
+    def load(self):
+        # type: () -> bool
+        """
+        :return: False if we have no .links file, i.e. for a project cached before we kept one
+        """
+        with self._lock:
+            if self._entries is not None:
+                return True
+            if not os.path.exists(self.data_file()):
+                return False
+            with open(self.data_file(), 'rb') as data_file:
+                self._version, self._entries = pickle.load(data_file)
+            return True
+
+    def rebuild(self, jira_issues):
+        # type: (Iterable[JiraIssue]) -> None
+        with self._lock:
+            self._entries = {x.issue_key: LinkIndex.entry(x) for x in jira_issues}
+            self._version += 1
+            self._dirty = True
+
+    def current(self):
+        # type: () -> Tuple[int, Dict[str, LinkEntry]]
+        """
+        :return: (version, issue key -> entry). Shared; don't modify.
+        """
+        with self._lock:
+            return self._version, self._entries if self._entries is not None else {}
+
+    def update(self, jira_issues, removed_keys=None):
+        # type: (Iterable[JiraIssue], Optional[Iterable[str]]) -> bool
+        """
+        :return: True if any entry changed
+        """
+        with self._lock:
+            current = {} if self._entries is None else self._entries
+            changed = {}  # type: Dict[str, LinkEntry]
+            for jira_issue in jira_issues:
+                entry = LinkIndex.entry(jira_issue)
+                if current.get(jira_issue.issue_key) != entry:
+                    changed[jira_issue.issue_key] = entry
+            removed = [] if removed_keys is None else [x for x in removed_keys if x in current and x not in changed]
+            if len(changed) == 0 and len(removed) == 0:
+                return False
+            entries = dict(current)
+            entries.update(changed)
+            for issue_key in removed:
+                del entries[issue_key]
+            self._entries = entries
+            self._version += 1
+            self._dirty = True
+            return True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+            temp_file_name = '{}.tmp'.format(self.data_file())
+            with open(temp_file_name, 'wb') as data_file:
+                pickle.dump((self._version, self._entries), data_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file_name, self.data_file())
+            self._dirty = False
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            if os.path.isfile(self.data_file()):
+                os.remove(self.data_file())
+            self._entries = None
+            self._dirty = False
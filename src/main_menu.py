@@ -24,7 +24,10 @@ from src import __version__, utils
 from src.display_filter import DisplayFilter
 from src.jenkins_manager import JenkinsManager
 from src.jira_manager import JiraManager
+from src.jira_sync_worker import JiraSyncWorker
+from src.jira_webhook import JiraWebhookReceiver
 from src.menu_option import MenuOption
+from src.project_residency import residency
 from src.team_manager import TeamManager
 from src.triage_update import TriageUpdate
 from src.utils import (DESCRIPTION, Config, ConfigError, argus_conf_file,
@@ -93,6 +96,8 @@ class MainMenu:
         except ConfigError as ce:
             print('ConfigError: {}. Initializing empty JiraManager'.format(ce))
             self._team_manager = TeamManager()
+        # Needs to be in place before JiraManager loads cached projects, so those over budget stay on disk
+        self._load_memory_budget()
         self._jira_manager = JiraManager(self._team_manager)
         self._jenkins_manager = JenkinsManager(self)
 
@@ -109,7 +114,7 @@ class MainMenu:
             dash_keys = list(self._jira_manager.jira_dashboards.keys())
 
             if user_key in dash_keys:
-                self._jira_manager.jira_dashboards[user_key].display_dashboard(self._jira_manager.jira_views)
+                self._jira_manager.jira_dashboards[user_key].display_dashboard(self._jira_manager, self._jira_manager.jira_views)
             else:
                 print('Oops... Error with dashboard name {}'.format(user_key))
                 print('Possible dashboard names : {}'.format(','.join(dash_keys)))
@@ -164,6 +169,9 @@ class MainMenu:
 
         self.reports_menu = [
             MenuOption('f', 'FixVersion report (release). Query all tickets with a specified FixVersion', self._jira_manager.report_fix_version),
+            MenuOption('b', 'FixVersion burndown. Per-day burndown, burnup and projected completion, including dependencies', self._jira_manager.report_fix_version_burndown),
+            MenuOption('c', 'Flow report. Cycle time, lead time, throughput and cumulative flow for a view or FixVersion', self._jira_manager.report_flow),
+            MenuOption('k', 'Blocking chain. Everything blocking a FixVersion, in work order, with its critical chain', self._jira_manager.report_blocking_chain),
             MenuOption('s', 'Add a single-user multi-JIRA open ticket dashboard', self._add_multi_jira_dashboard),
             MenuOption('l', 'Add a label-based cross-cutting view', self._jira_manager.add_label_view),
             MenuOption.print_blank_line(),
@@ -241,6 +249,9 @@ class MainMenu:
             MenuOption('v', 'Toggle Verbose/Debug', self._change_debug),
             MenuOption('d', 'Toggle Display dependencies', self._change_show_dependencies),
             MenuOption('o', 'Toggle show open dependencies only', self._change_dependency_type),
+            MenuOption('s', 'Change background sync interval', self._change_sync_interval),
+            MenuOption('w', 'Toggle JIRA webhook receiver', self._change_webhook_receiver),
+            MenuOption('m', 'Change memory budget for cached projects', self._change_memory_budget),
             MenuOption.print_blank_line(),
             MenuOption.return_to_previous_menu(self.go_to_main_menu)
         ]
@@ -251,16 +262,33 @@ class MainMenu:
             MenuOption('a', 'Add new JiraProject offline cache', self._jira_manager.cache_new_jira_project_data, pause=True),
             MenuOption('d', 'Delete offline cached ticket data for a JiraProject on a connection', self._jira_manager.delete_cached_jira_project),
             MenuOption('u', 'Update all locally cached project JIRA data', self._jira_manager.update_cached_jira_project_data, pause=False),
+            MenuOption('m', 'Smart update: most used and stalest cached projects first', self._jira_manager.smart_update_cached_jira_project_data, pause=False),
+            MenuOption('y', 'View background sync log', self._jira_manager.display_sync_log),
+            MenuOption('h', 'Toggle changelog history tracking for a cached project', self._jira_manager.toggle_project_history),
+            MenuOption('c', 'Limit a cached project to issues matching a JQL cache scope', self._jira_manager.set_project_cache_scope),
+            MenuOption('r', 'Set how long closed issues stay in memory for a cached project', self._jira_manager.set_project_retention),
+            MenuOption('i', 'View field history for a cached issue', self._jira_manager.display_issue_history),
+            MenuOption('b', 'View what a cached issue blocks, and what closing it unblocks', self._jira_manager.display_issue_impact),
             MenuOption.print_blank_line(),
             MenuOption.return_to_previous_menu(self.go_to_main_menu)
         ]
 
         self.active_menu = None
         self.menu_header = None
+        self._sync_interval = JiraSyncWorker.DEFAULT_INTERVAL
+        self._webhook_enabled = False
+        self._webhook_host = JiraWebhookReceiver.DEFAULT_HOST
+        self._webhook_port = JiraWebhookReceiver.DEFAULT_PORT
         self.go_to_main_menu()
 
         self._load_config()
 
+        # Menus work off the data loaded from disk while the worker pulls updates from JIRA
+        if not utils.unit_test:
+            if self._webhook_enabled:
+                self._start_webhook_receiver()
+            self._jira_manager.start_background_sync(self._effective_sync_interval())
+
         # let user read startup info
         pause()
 
@@ -321,6 +349,8 @@ class MainMenu:
             clear()
             print(thick_separator)
             print('Argus - {}'.format(self.menu_header))
+            print('Sync: {}'.format(self._jira_manager.sync_status()))
+            print('Projects: {}'.format(self._jira_manager.residency_status()))
             print(thick_separator)
 
             for menu_option in self.active_menu:
@@ -383,6 +413,64 @@ class MainMenu:
         self._print_dependency_show_state()
         self._save_config()
 
+    def _change_sync_interval(self):
+        print('Current background sync interval: {} minutes'.format(self._sync_interval))
+        new_interval = get_input('Enter new interval in minutes (0 to only sync on startup and on request):')
+        if not new_interval.isdigit():
+            print('Invalid interval: {}. Not changing.'.format(new_interval))
+            return
+        self._sync_interval = int(new_interval)
+        self._jira_manager.sync_worker.interval = self._effective_sync_interval()
+        self._save_config()
+
+    def _change_webhook_receiver(self):
+        self._webhook_enabled = not self._webhook_enabled
+        if self._webhook_enabled:
+            new_host = get_input('Listen on which host? Must be reachable from JIRA; 0.0.0.0 for all interfaces. '
+                                 '(enter for {})'.format(self._webhook_host), lowered=False)
+            if new_host != '':
+                self._webhook_host = new_host
+            new_port = get_input('Listen on which port? (enter for {})'.format(self._webhook_port))
+            if new_port.isdigit():
+                self._webhook_port = int(new_port)
+            self._start_webhook_receiver()
+        else:
+            self._jira_manager.webhook_receiver.stop()
+            print('Stopped JIRA webhook receiver')
+        self._jira_manager.sync_worker.interval = self._effective_sync_interval()
+        print('Background sync interval is now {} minutes'.format(self._jira_manager.sync_worker.interval))
+        self._save_config()
+
+    def _change_memory_budget(self):
+        print('Current memory budget for cached projects: {}'.format(
+            '{} MB'.format(residency.budget_mb) if residency.enabled else 'unlimited'))
+        new_budget = get_input('Enter new budget in MB. Least recently used projects are unloaded to disk beyond it. (0 for unlimited)')
+        if not new_budget.isdigit():
+            print('Bad input. Expected a number of MB.')
+            return
+        residency.budget_mb = int(new_budget)
+        print('Projects: {}'.format(self._jira_manager.residency_status()))
+        self._save_config()
+
+    def _start_webhook_receiver(self):
+        self._jira_manager.webhook_receiver.host = self._webhook_host
+        self._jira_manager.webhook_receiver.port = self._webhook_port
+        try:
+            self._jira_manager.webhook_receiver.start()
+        except OSError as e:
+            print('Failed to start JIRA webhook receiver on {}:{}: {}. Falling back to polling.'.format(
+                self._webhook_host, self._webhook_port, e))
+            self._webhook_enabled = False
+
+    def _effective_sync_interval(self):
+        # type: () -> int
+        """
+        With webhooks pushing updates, polling only needs to catch missed deliveries
+        """
+        if self._sync_interval <= 0 or not self._jira_manager.webhook_receiver.is_running:
+            return self._sync_interval
+        return max(self._sync_interval, JiraWebhookReceiver.SAFETY_NET_SYNC_INTERVAL)
+
     def _print_dependency_show_state(self):
         print('Current dependency display state: {}. Open only: {}'.format(utils.show_dependencies, utils.show_only_open_dependencies))
 
@@ -408,13 +496,17 @@ class MainMenu:
             utils.argus_log.close()
         sys.exit(0)
 
-    @staticmethod
-    def _save_config():
+    def _save_config(self):
         config_parser = configparser.RawConfigParser()
         config_parser.add_section('Argus')
         config_parser.set('Argus', 'Browser', Config.Browser)
         config_parser.set('Argus', 'Show_Dependencies', utils.show_dependencies)
         config_parser.set('Argus', 'Show_Only_Open_Dependencies', utils.show_only_open_dependencies)
+        config_parser.set('Argus', 'Sync_Interval', self._sync_interval)
+        config_parser.set('Argus', 'Webhook_Enabled', self._webhook_enabled)
+        config_parser.set('Argus', 'Webhook_Host', self._webhook_host)
+        config_parser.set('Argus', 'Webhook_Port', self._webhook_port)
+        config_parser.set('Argus', 'Memory_Budget_MB', residency.budget_mb)
         conf = os.path.join(conf_dir, 'argus.cfg')
         save_argus_config(config_parser, conf)
 
@@ -427,10 +519,26 @@ class MainMenu:
                 utils.show_dependencies = config_parser.get('Argus', 'Show_Dependencies')
             if config_parser.has_option('Argus', 'Show_Only_Open_Dependencies'):
                 utils.show_only_open_dependencies = config_parser.get('Argus', 'Show_Only_Open_Dependencies')
+            if config_parser.has_option('Argus', 'Sync_Interval'):
+                self._sync_interval = config_parser.getint('Argus', 'Sync_Interval')
+            if config_parser.has_option('Argus', 'Webhook_Enabled'):
+                self._webhook_enabled = config_parser.getboolean('Argus', 'Webhook_Enabled')
+            if config_parser.has_option('Argus', 'Webhook_Host'):
+                self._webhook_host = config_parser.get('Argus', 'Webhook_Host')
+            if config_parser.has_option('Argus', 'Webhook_Port'):
+                self._webhook_port = config_parser.getint('Argus', 'Webhook_Port')
         else:
             # if we don't yet have a config file, go ahead and create one on this first pass w/default values
             self._save_config()
 
+    @staticmethod
+    def _load_memory_budget():
+        if os.path.exists(argus_conf_file):
+            config_parser = configparser.RawConfigParser()
+            config_parser.read(argus_conf_file)
+            if config_parser.has_option('Argus', 'Memory_Budget_MB'):
+                residency.budget_mb = config_parser.getint('Argus', 'Memory_Budget_MB')
+
     def _display_readme(self):
         while True:
             print('======================================')
@@ -0,0 +1,122 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Optional, Tuple
+    from src.jira_project import JiraProject
+
+
+class ProjectResidency:
+    """
+    Keeps the issues of cached JiraProjects in memory within a budget, least recently used first out. A project is
+    loaded from its data file on first use and unloaded once we're over budget and it's the stalest resident. Projects
+    with changes not yet saved to disk are never unloaded.
+
+    Sizes are estimates: a project's data file size times IN_MEMORY_RATIO, pickled issues being far more compact than
+    the dicts they load into. Issues referenced from the resolved dependencies of a resident project stay alive after
+    their own project is unloaded, so actual usage can run over for heavily cross-linked projects.
+    """
+
+    # Rough ratio of in-memory to pickled size for a JiraIssue
+    IN_MEMORY_RATIO = 4
+
+    def __init__(self, budget_mb=0):
+        # type: (int) -> None
+        """
+        :param budget_mb: <= 0 keeps every project resident
+        """
+        self.budget_mb = budget_mb
+        # (connection name, project name) -> (project, estimated bytes), least recently used first
+        self._resident = OrderedDict()  # type: OrderedDict[Tuple[str, str], Tuple[JiraProject, int]]
+        # Called with each project as it's reloaded, i.e. to re-resolve its dependencies
+        self.on_load = None  # type: Optional[Callable[[JiraProject], None]]
+        self.load_count = 0
+        self.unload_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        return self.budget_mb > 0
+
+    @property
+    def resident_bytes(self):
+        # type: () -> int
+        with self._lock:
+            return sum(x[1] for x in self._resident.values())
+
+    def touch(self, jira_project):
+        # type: (JiraProject) -> None
+        """
+        Marks a resident project as most recently used, unloading the least recently used others if over budget.
+        Nothing is tracked without a budget.
+        """
+        if not self.enabled:
+            return
+        key = (jira_project.jira_connection.connection_name, jira_project.project_name)
+        with self._lock:
+            entry = self._resident.get(key)
+            # A project re-cached under the same name replaces the old object
+            if entry is not None and entry[0] is jira_project:
+                self._resident.move_to_end(key)
+                return
+            self._resident.pop(key, None)
+            self._resident[key] = (jira_project, jira_project.estimated_bytes() * self.IN_MEMORY_RATIO)
+        self._enforce_budget(key)
+
+    def loaded(self, jira_project):
+        # type: (JiraProject) -> None
+        self.load_count += 1
+        if self.on_load is not None:
+            self.on_load(jira_project)
+
+    def forget(self, jira_project):
+        # type: (JiraProject) -> None
+        if jira_project.jira_connection is None:
+            return
+        with self._lock:
+            self._resident.pop((jira_project.jira_connection.connection_name, jira_project.project_name), None)
+
+    def _enforce_budget(self, keep):
+        # type: (Tuple[str, str]) -> None
+        budget = self.budget_mb * 1024 * 1024
+        with self._lock:
+            candidates = [x for x in self._resident if x != keep]
+        for key in candidates:
+            if self.resident_bytes <= budget:
+                return
+            with self._lock:
+                entry = self._resident.get(key)
+            if entry is None:
+                continue
+            if entry[0].unload():
+                with self._lock:
+                    self._resident.pop(key, None)
+                self.unload_count += 1
+
+    def status(self, jira_projects):
+        # type: (Dict[str, JiraProject]) -> str
+        resident = [x for x in jira_projects.values() if x.is_resident]
+        if not self.enabled:
+            return '{} projects resident. Memory budget: unlimited'.format(len(resident))
+        return '{} projects resident (~{} MB), {} on disk. Memory budget: {} MB'.format(
+            len(resident), self.resident_bytes // (1024 * 1024), len(jira_projects) - len(resident), self.budget_mb)
+
+
+# Shared by every cached JiraProject, since the budget covers all connections
+residency = ProjectResidency()
@@ -0,0 +1,192 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import re
+import threading
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.jira_project import JiraProject
+from src.jira_utils import JiraUtils
+from src.time_utils import current_time
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from typing import Dict, Iterable, List, Optional, Tuple
+    from src.jira_connection import JiraConnection
+    from src.jira_issue import JiraIssue
+
+
+class QueryResult:
+    """
+    The cached JiraIssues matching a single JQL query
+    """
+
+    def __init__(self, jql, issues, watermark, fetched):
+        # type: (str, Dict[str, JiraIssue], Optional[str], datetime) -> None
+        """
+        :param watermark: latest 'updated' among issues in JQL format, None if there were none
+        :param fetched: when the results were last fetched or revalidated
+        """
+        self.jql = jql
+        self.issues = issues
+        self.watermark = watermark
+        self.fetched = fetched
+
+    @property
+    def age_minutes(self):
+        # type: () -> float
+        return (current_time() - self.fetched).total_seconds() / 60
+
+
+class QueryCache:
+    """
+    Results of JQL queries against a single JiraConnection that aren't backed by a cached JiraProject. Each is kept
+    with a watermark, the latest 'updated' among its issues, so revalidating costs a query for what changed since plus
+    a keys-only query to drop issues that no longer match, rather than refetching every page.
+
+    Results persist to data/jira/<connection>.queries so they survive restarts. Only the MAX_QUERIES most recently
+    fetched are kept; ad hoc queries are rarely repeated verbatim and shouldn't grow the file without bound.
+    """
+
+    # Default age under which cached results are served without going to the server at all
+    MAX_AGE_MINUTES = 15
+
+    # Queries kept on disk, least recently fetched dropped first
+    MAX_QUERIES = 50
+
+    def __init__(self, jira_connection):
+        # type: (JiraConnection) -> None
+        self._jira_connection = jira_connection
+        self._results = None  # type: Optional[Dict[str, QueryResult]]
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        file_name = os.path.join(jira_data_dir, '{}.queries'.format(self._jira_connection.connection_name))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    def _load(self):
+        if self._results is not None:
+            return
+        self._results = {}
+        if os.path.exists(self.data_file()):
+            with open(self.data_file(), 'rb') as data_file:
+                self._results = pickle.load(data_file)
+
+    def _save(self):
+        if len(self._results) > self.MAX_QUERIES:
+            by_age = sorted(self._results.values(), key=lambda x: x.fetched)
+            for result in by_age[:len(self._results) - self.MAX_QUERIES]:
+                del self._results[result.jql]
+        os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+        temp_file_name = '{}.tmp'.format(self.data_file())
+        with open(temp_file_name, 'wb') as data_file:
+            pickle.dump(self._results, data_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.data_file())
+
+    def get_issues(self, jql, max_age_minutes=MAX_AGE_MINUTES, refresh=False):
+        # type: (str, float, bool) -> List[JiraIssue]
+        """
+        :param max_age_minutes: serve cached results younger than this as-is
+        :param refresh: revalidate regardless of age
+        :return: issues matching jql, in key order
+        """
+        with self._lock:
+            self._load()
+            result = self._results.get(jql)
+        if result is None:
+            result = self._fetch(jql)
+        elif refresh or result.age_minutes >= max_age_minutes:
+            result = self._revalidate(result)
+        else:
+            return JiraUtils.sort_jira_issues(list(result.issues.values()))
+        with self._lock:
+            self._results[jql] = result
+            self._save()
+        return JiraUtils.sort_jira_issues(list(result.issues.values()))
+
+    def invalidate(self, jql=None):
+        # type: (Optional[str]) -> None
+        """
+        :param jql: query to drop, all of them if None
+        """
+        with self._lock:
+            self._load()
+            if jql is None:
+                self._results = {}
+            else:
+                self._results.pop(jql, None)
+            self._save()
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            if os.path.isfile(self.data_file()):
+                os.remove(self.data_file())
+            self._results = None
+
+    def _fetch(self, jql):
+        # type: (str) -> QueryResult
+        issues = {x.issue_key: x for x in JiraUtils.fetch_issues_by_query(self._jira_connection, jql)}
+        return QueryResult(jql, issues, self._watermark(issues.values()), current_time())
+
+    def _revalidate(self, result):
+        # type: (QueryResult) -> QueryResult
+        if result.watermark is None:
+            return self._fetch(result.jql)
+
+        fetched = current_time()
+        query, order_by = self._split_order_by(result.jql)
+        changed = JiraUtils.fetch_issues_by_query(
+            self._jira_connection, '({}) AND updated >= "{}"{}'.format(query, result.watermark, order_by))
+        # An 'updated >=' query can't tell us about issues that stopped matching, i.e. escalations since resolved
+        matching_keys = JiraUtils.get_issue_keys_by_query(self._jira_connection, result.jql)
+
+        issues = {x: result.issues[x] for x in matching_keys if x in result.issues}
+        for jira_issue in changed:
+            if jira_issue.issue_key in matching_keys:
+                issues[jira_issue.issue_key] = jira_issue
+        # Matching issues changed before our watermark that we've never seen: moved in, or linked to a new project
+        missing_keys = sorted(matching_keys - set(issues.keys()))
+        if len(missing_keys) > 0:
+            for jira_issue in JiraUtils.get_issues_by_keys(self._jira_connection, missing_keys):
+                issues[jira_issue.issue_key] = jira_issue
+
+        print('Revalidated cached query: {} changed, {} dropped, {} added'.format(
+            len(changed), len(set(result.issues.keys()) - matching_keys), len(missing_keys)))
+        # Never move the watermark back, i.e. when the most recently updated issue is the one that dropped out
+        watermark = max([x for x in [result.watermark, self._watermark(issues.values())] if x is not None])
+        return QueryResult(result.jql, issues, watermark, fetched)
+
+    @staticmethod
+    def _split_order_by(jql):
+        # type: (str) -> Tuple[str, str]
+        """
+        :return: the query and its ORDER BY clause (with leading space, or ''), since we can only AND onto the former
+        """
+        match = re.search(r'\s+order\s+by\s+', jql, re.IGNORECASE)
+        if match is None:
+            return jql, ''
+        return jql[:match.start()], ' ' + jql[match.start():].strip()
+
+    @staticmethod
+    def _watermark(jira_issues):
+        # type: (Iterable[JiraIssue]) -> Optional[str]
+        updated = [JiraProject.clean_ts(x['updated']) for x in jira_issues if 'updated' in x]
+        return max(updated) if len(updated) > 0 else None
@@ -0,0 +1,196 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import configparser
+import math
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from src.jira_utils import JiraUtils
+from src.utils import build_config_name, jira_conf_dir, save_argus_config
+
+if TYPE_CHECKING:
+    from src.jira_issue import JiraIssue
+    from src.jira_project import JiraProject
+    from typing import Dict, Iterable, List, Optional
+
+
+class ProjectUsage:
+    """
+    Access and sync bookkeeping for a single JiraProject
+    """
+
+    def __init__(self, access_score=0.0, last_access=0.0, last_sync=0.0, last_cost=1):
+        # type: (float, float, float, int) -> None
+        """
+        :param access_score: decayed access count as of last_access
+        :param last_access: epoch seconds of the last recorded access, 0 if never
+        :param last_sync: epoch seconds of the last completed refresh, 0 if never
+        :param last_cost: approximate number of requests the last refresh took
+        """
+        self.access_score = access_score
+        self.last_access = last_access
+        self.last_sync = last_sync
+        self.last_cost = last_cost
+
+    def decayed_score(self, now):
+        # type: (float) -> float
+        elapsed_hours = max(0.0, now - self.last_access) / 3600
+        return self.access_score * math.pow(0.5, elapsed_hours / RefreshPlanner.ACCESS_HALF_LIFE_HOURS)
+
+    def staleness_hours(self, now):
+        # type: (float) -> float
+        if self.last_sync == 0:
+            return float(RefreshPlanner.MAX_STALENESS_HOURS)
+        return max(0.0, now - self.last_sync) / 3600
+
+
+class RefreshPlanner:
+    """
+    Decides which cached JiraProjects are worth spending requests on. Each project keeps an exponentially decaying
+    access score, bumped whenever a view, dashboard or dependency chain touches it, plus when it last synced and
+    roughly how many requests that took. Refreshes are ranked by access score * hours stale / cost. Cold projects are
+    deferred until they pass MAX_STALENESS_HOURS, so nothing goes unrefreshed forever.
+    """
+
+    ACCESS_HALF_LIFE_HOURS = 72
+
+    VIEW_WEIGHT = 1.0
+    DEPENDENCY_WEIGHT = 0.25
+
+    # Decayed access score below which a project is considered cold
+    COLD_SCORE = 0.1
+
+    MAX_STALENESS_HOURS = 168
+
+    # Projects refreshed per smart update
+    DEFAULT_LIMIT = 5
+
+    def __init__(self, usage=None):
+        # type: (Optional[Dict[str, ProjectUsage]]) -> None
+        self._usage = {} if usage is None else usage  # type: Dict[str, ProjectUsage]
+        # Access is recorded from the menus while syncs are recorded from the sync worker
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def config_file():
+        # type: () -> str
+        return os.path.join(jira_conf_dir, 'refresh_planner.cfg')
+
+    @classmethod
+    def from_file(cls):
+        # type: () -> RefreshPlanner
+        usage = {}  # type: Dict[str, ProjectUsage]
+        config_file = build_config_name(cls.config_file())
+        if os.path.exists(config_file):
+            config_parser = configparser.RawConfigParser()
+            config_parser.read(config_file)
+            for project_name in config_parser.sections():
+                usage[project_name] = ProjectUsage(
+                    config_parser.getfloat(project_name, 'access_score'),
+                    config_parser.getfloat(project_name, 'last_access'),
+                    config_parser.getfloat(project_name, 'last_sync'),
+                    config_parser.getint(project_name, 'last_cost'))
+        return RefreshPlanner(usage)
+
+    def save_config(self):
+        config_parser = configparser.RawConfigParser()
+        for project_name, usage in sorted(self._usage.items()):
+            config_parser.add_section(project_name)
+            config_parser.set(project_name, 'access_score', str(usage.access_score))
+            config_parser.set(project_name, 'last_access', str(usage.last_access))
+            config_parser.set(project_name, 'last_sync', str(usage.last_sync))
+            config_parser.set(project_name, 'last_cost', str(usage.last_cost))
+        save_argus_config(config_parser, self.config_file())
+
+    def usage(self, project_name):
+        # type: (str) -> ProjectUsage
+        if project_name not in self._usage:
+            self._usage[project_name] = ProjectUsage()
+        return self._usage[project_name]
+
+    def record_access(self, project_names, weight=VIEW_WEIGHT):
+        # type: (Iterable[str], float) -> None
+        """
+        Bumps each distinct project once, regardless of how many of its issues were touched
+        """
+        now = time.time()
+        with self._lock:
+            for project_name in set(project_names):
+                usage = self.usage(project_name)
+                usage.access_score = usage.decayed_score(now) + weight
+                usage.last_access = now
+            self.save_config()
+
+    def record_issue_access(self, jira_issues):
+        # type: (Iterable[JiraIssue]) -> None
+        """
+        Records a view or dashboard displaying jira_issues: their projects get a full hit, and projects reached one
+        step down their dependency chains get a partial one.
+        """
+        issue_projects = set()
+        dependency_projects = set()
+        for jira_issue in jira_issues:
+            issue_projects.add(jira_issue.project_name)
+            for dependency in getattr(jira_issue, 'dependencies', []):
+                dependency_projects.add(dependency.target.project_name)
+        self.record_access(issue_projects, RefreshPlanner.VIEW_WEIGHT)
+        self.record_access(dependency_projects - issue_projects, RefreshPlanner.DEPENDENCY_WEIGHT)
+
+    def record_sync(self, project_name, changed_count):
+        # type: (str, int) -> None
+        with self._lock:
+            usage = self.usage(project_name)
+            usage.last_sync = time.time()
+            usage.last_cost = 1 + changed_count // JiraUtils.PAGE_SIZE
+            self.save_config()
+
+    def score(self, project_name, now=None):
+        # type: (str, Optional[float]) -> float
+        """
+        :return: refresh priority of the project, 0 if it should be deferred
+        """
+        now = time.time() if now is None else now
+        usage = self.usage(project_name)
+        access = usage.decayed_score(now)
+        staleness = usage.staleness_hours(now)
+        if access < RefreshPlanner.COLD_SCORE:
+            if staleness < RefreshPlanner.MAX_STALENESS_HOURS:
+                return 0.0
+            # Overdue (or never synced) cold projects still get refreshed, scored as if they were just barely warm
+            access = RefreshPlanner.COLD_SCORE
+        return access * staleness / max(1, usage.last_cost)
+
+    def plan(self, jira_projects, limit=DEFAULT_LIMIT, required=None):
+        # type: (List[JiraProject], int, Optional[List[JiraProject]]) -> List[JiraProject]
+        """
+        :param required: projects refreshed first and regardless of score, i.e. those backing an open dashboard
+        :return: up to limit JiraProjects to refresh (plus any required), highest score first
+        """
+        now = time.time()
+        required = [] if required is None else required
+        required_names = {x.project_name for x in required}
+        with self._lock:
+            scored = [(self.score(x.project_name, now), x) for x in jira_projects if x.project_name not in required_names]
+        ranked = [x for score, x in sorted(scored, key=lambda s: s[0], reverse=True) if score > 0]
+        return required + ranked[:limit]
+
+    def describe(self, project_name):
+        # type: (str) -> str
+        now = time.time()
+        usage = self.usage(project_name)
+        return 'Access score: {:.2f}. Hours since sync: {:.1f}. Refresh score: {:.2f}'.format(
+            usage.decayed_score(now), usage.staleness_hours(now), self.score(project_name, now))
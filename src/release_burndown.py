@@ -0,0 +1,241 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import weakref
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from src.jira_dependency import JiraDependency
+from src.time_utils import jira_epoch
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional
+    from src.dependency_graph import DependencyGraph
+    from src.issue_history import IssueHistory
+    from src.jira_issue import JiraIssue
+
+
+class BurndownDay:
+    """
+    Counts for a single day of a ReleaseBurndown
+    """
+
+    def __init__(self, day, added, closed, open_count, total_closed, scope):
+        # type: (int, int, int, int, int, int) -> None
+        """
+        :param day: epoch seconds at the start of the day, UTC
+        :param total_closed: burnup; issues closed on or before this day
+        :param scope: issues on the release as of this day, open or closed
+        """
+        self.day = day
+        self.added = added
+        self.closed = closed
+        self.open_count = open_count
+        self.total_closed = total_closed
+        self.scope = scope
+
+
+class _BurndownEntry:
+    """
+    What a ReleaseBurndown needs to know about a single issue, computed once per change to the issue
+    """
+
+    def __init__(self, updated, created, closed, version_added):
+        # type: (str, int, int, Optional[int]) -> None
+        """
+        :param updated: the issue's 'updated' value when this was computed, to tell when it needs recomputing
+        :param closed: epoch seconds resolved, -1 if open
+        :param version_added: epoch seconds the FixVersion was put on the issue, None on a dependency
+        """
+        self.updated = updated
+        self.created = created
+        self.closed = closed
+        self.version_added = version_added
+
+
+class ReleaseBurndown:
+    """
+    Burndown and burnup series for a FixVersion, covering the issues on the version plus everything they transitively
+    block on. An issue joins the release when the version was put on it (from IssueHistory, else its creation) and a
+    dependency when the earliest issue reaching it joined, or its own creation if later.
+
+    The JiraManager keeps one of these per version between runs. Membership is walked over the connection's
+    DependencyGraph, which is only rebuilt when links, FixVersions or resolutions change, so an update against the same
+    graph has nothing to do. Otherwise only the issues whose 'updated' changed since the last are recomputed.
+    """
+
+    SECONDS_PER_DAY = 86400
+
+    # Trailing days of close rate the projected completion date is extrapolated from
+    VELOCITY_DAYS = 28
+
+    def __init__(self, fix_version):
+        # type: (str) -> None
+        self.fix_version = fix_version
+        self._entries = {}  # type: Dict[str, _BurndownEntry]
+        # dependency issue key -> epoch seconds its earliest dependent joined the release
+        self._dependency_joins = {}  # type: Dict[str, int]
+        # The DependencyGraph of our last update, not kept alive past its replacement
+        self._graph = None  # type: Optional[weakref.ReferenceType]
+
+        self.processed_count = 0
+        self.missing_count = 0
+
+    @property
+    def issue_count(self):
+        # type: () -> int
+        return len(self._entries)
+
+    @property
+    def dependency_count(self):
+        # type: () -> int
+        return len(self._dependency_joins)
+
+    def update(self, graph, history_lookup):
+        # type: (DependencyGraph, Callable[[str], Optional[IssueHistory]]) -> None
+        """
+        :param graph: JiraManager.dependency_graph of the FixVersion's JiraConnection
+        :param history_lookup: project name -> IssueHistory for the project, None if it isn't tracked
+        """
+        self.processed_count = 0
+        if self._graph is not None and self._graph() is graph:
+            return
+
+        entries = {}  # type: Dict[str, _BurndownEntry]
+        for root_key in graph.fix_version_roots(self.fix_version):
+            entries[root_key] = self._entry(graph.issue(root_key), history_lookup, True)
+
+        # Walking from the earliest joined root out means the first time we reach a dependency is its earliest join
+        dependency_joins = {}  # type: Dict[str, int]
+        self.missing_count = 0
+        for root_key in sorted(entries, key=lambda k: entries[k].version_added):
+            to_visit = [root_key]
+            while len(to_visit) > 0:
+                for target_key, pretty_type in graph.edges(to_visit.pop()):
+                    if pretty_type not in JiraDependency.blocking_types or target_key in entries \
+                            or target_key in dependency_joins:
+                        continue
+                    target = graph.issue(target_key)
+                    if target is None:
+                        self.missing_count += 1
+                        continue
+                    dependency_joins[target_key] = entries[root_key].version_added
+                    entries[target_key] = self._entry(target, history_lookup, False)
+                    to_visit.append(target_key)
+
+        self._entries = entries
+        self._dependency_joins = dependency_joins
+        self._graph = weakref.ref(graph)
+
+    def _entry(self, jira_issue, history_lookup, is_root):
+        # type: (JiraIssue, Callable[[str], Optional[IssueHistory]], bool) -> _BurndownEntry
+        existing = self._entries.get(jira_issue.issue_key)
+        if existing is not None and existing.updated == jira_issue['updated'] and (existing.version_added is not None) == is_root:
+            return existing
+
+        self.processed_count += 1
+        created = jira_epoch(jira_issue.get('created'))
+        created = 0 if created is None else created
+        closed = -1
+        if jira_issue.is_closed:
+            closed = jira_epoch(jira_issue.resolved)
+            if closed is None:
+                closed = jira_epoch(jira_issue['updated'])
+
+        version_added = None
+        if is_root:
+            version_added = created
+            history = history_lookup(jira_issue.project_name)
+            if history is not None:
+                for transition in history.field_transitions('fixVersions').get(jira_issue.issue_key, []):
+                    if transition.to_string == self.fix_version:
+                        version_added = transition.timestamp
+        return _BurndownEntry(jira_issue['updated'], created, closed, version_added)
+
+    def series(self, now):
+        # type: (int) -> List[BurndownDay]
+        """
+        :param now: epoch seconds; the series runs from the day the first issue joined through the day containing now
+        """
+        added_by_day = {}  # type: Dict[int, int]
+        closed_by_day = {}  # type: Dict[int, int]
+        for issue_key, entry in self._entries.items():
+            if entry.version_added is not None:
+                added = entry.version_added
+            else:
+                added = max(self._dependency_joins[issue_key], entry.created)
+            added_day = added // self.SECONDS_PER_DAY
+            added_by_day[added_day] = added_by_day.get(added_day, 0) + 1
+            if entry.closed != -1:
+                # Anything already closed when it joined counts as closed on the day it joined
+                closed_day = max(entry.closed, added) // self.SECONDS_PER_DAY
+                closed_by_day[closed_day] = closed_by_day.get(closed_day, 0) + 1
+
+        if len(added_by_day) == 0:
+            return []
+
+        results = []  # type: List[BurndownDay]
+        scope = 0
+        total_closed = 0
+        for day in range(min(added_by_day), now // self.SECONDS_PER_DAY + 1):
+            added = added_by_day.get(day, 0)
+            closed = closed_by_day.get(day, 0)
+            scope += added
+            total_closed += closed
+            results.append(BurndownDay(day * self.SECONDS_PER_DAY, added, closed, scope - total_closed, total_closed, scope))
+        return results
+
+    def projected_completion(self, series):
+        # type: (List[BurndownDay]) -> Optional[datetime]
+        """
+        Extrapolates the close rate over the trailing VELOCITY_DAYS out over the issues still open
+        :return: projected completion date, None if nothing has closed recently enough to project from
+        """
+        if len(series) == 0:
+            return None
+        remaining = series[-1].open_count
+        if remaining == 0:
+            return datetime.utcfromtimestamp(series[-1].day)
+        recent_closes = sum([x.closed for x in series[-self.VELOCITY_DAYS:]])
+        if recent_closes == 0:
+            return None
+        days_left = remaining * min(self.VELOCITY_DAYS, len(series)) / recent_closes
+        return datetime.utcfromtimestamp(series[-1].day + int(days_left * self.SECONDS_PER_DAY))
+
+    def report(self, now):
+        # type: (int) -> str
+        def day(timestamp):
+            return datetime.utcfromtimestamp(timestamp).strftime('%Y/%m/%d')
+
+        series = self.series(now)
+        lines = ['Burndown for {}: {} issues, {} of them dependencies. Recomputed {} changed issues.'.format(
+            self.fix_version, self.issue_count, self.dependency_count, self.processed_count)]
+        if self.missing_count > 0:
+            lines.append('{} dependencies are in projects not cached offline and are not counted.'.format(self.missing_count))
+        lines.append('{:<12}{:<8}{:<8}{:<8}{:<8}{:<8}'.format('Date', 'Added', 'Closed', 'Open', 'Done', 'Scope'))
+        for index, burndown_day in enumerate(series):
+            # Quiet days add nothing to the table but noise
+            if burndown_day.added == 0 and burndown_day.closed == 0 and index != len(series) - 1:
+                continue
+            lines.append('{:<12}{:<8}{:<8}{:<8}{:<8}{:<8}'.format(
+                day(burndown_day.day), burndown_day.added, burndown_day.closed, burndown_day.open_count,
+                burndown_day.total_closed, burndown_day.scope))
+
+        projected = self.projected_completion(series)
+        if projected is None:
+            lines.append('Projected completion: unknown, nothing closed in the last {} days'.format(self.VELOCITY_DAYS))
+        else:
+            lines.append('Projected completion: {}'.format(projected.strftime('%Y/%m/%d')))
+        return os.linesep.join(lines)
@@ -0,0 +1,187 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import threading
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.jira_project import JiraProject
+from src.jira_utils import JiraUtils
+from src.time_utils import current_time, hours_since
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from typing import Dict, Iterable, List, Optional, Set
+    from src.jira_connection import JiraConnection
+    from src.jira_issue import JiraIssue
+
+
+class RemoteIssueCache:
+    """
+    Issues on a single JiraConnection that our cached issues link to, but whose projects we don't cache. Rather than
+    syncing a whole foreign project to complete a dependency chain, we fetch just the linked issues in batched
+    'key in (...)' queries and keep them here with their own 'updated' watermark, so a refresh only pulls those that
+    changed since. The watermark is the newest 'updated' seen by the last refresh, which every issue we hold has been
+    checked against.
+    """
+
+    # Hours between refreshes of the issues we hold
+    REFRESH_HOURS = 4
+
+    def __init__(self, connection_name):
+        # type: (str) -> None
+        self.connection_name = connection_name
+        self._issues = None  # type: Optional[Dict[str, JiraIssue]]
+        # Keys we asked for and didn't get back, i.e. deleted or no permission. Not asked for again until a refresh.
+        self._unavailable = set()  # type: Set[str]
+        self.watermark = None  # type: Optional[str]
+        self.last_refresh = None  # type: Optional[datetime]
+        # Filled from the sync worker while the menus resolve dependencies
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        file_name = os.path.join(jira_data_dir, '{}.remote'.format(self.connection_name))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    def _load(self):
+        if self._issues is not None:
+            return
+        self._issues = {}
+        if os.path.exists(self.data_file()):
+            with open(self.data_file(), 'rb') as data_file:
+                self._issues, self._unavailable, self.watermark, self.last_refresh = pickle.load(data_file)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+        temp_file_name = '{}.tmp'.format(self.data_file())
+        with open(temp_file_name, 'wb') as data_file:
+            pickle.dump((self._issues, self._unavailable, self.watermark, self.last_refresh), data_file,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.data_file())
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._issues)
+
+    @property
+    def jira_issues(self):
+        # type: () -> List[JiraIssue]
+        with self._lock:
+            self._load()
+            return list(self._issues.values())
+
+    @property
+    def is_stale(self):
+        # type: () -> bool
+        with self._lock:
+            self._load()
+            return len(self._issues) > 0 and (self.last_refresh is None or hours_since(self.last_refresh) >= self.REFRESH_HOURS)
+
+    def get(self, issue_key):
+        # type: (str) -> Optional[JiraIssue]
+        with self._lock:
+            self._load()
+            return self._issues.get(issue_key)
+
+    def unknown_keys(self, issue_keys):
+        # type: (Iterable[str]) -> Set[str]
+        """
+        :return: those of issue_keys we neither hold nor have already failed to fetch
+        """
+        with self._lock:
+            self._load()
+            return {x for x in issue_keys if x not in self._issues and x not in self._unavailable}
+
+    def fetch(self, jira_connection, issue_keys):
+        # type: (JiraConnection, Iterable[str]) -> int
+        """
+        Fetches the input keys, KEY_BATCH_SIZE at a time
+        :return: count of issues added
+        """
+        issue_keys = sorted(self.unknown_keys(issue_keys))
+        if len(issue_keys) == 0:
+            return 0
+        fetched = JiraUtils.get_issues_by_keys(jira_connection, issue_keys)
+        with self._lock:
+            self._load()
+            # The watermark has to hold for every issue we have. Those held already are only as current as the last
+            # refresh, so newly fetched ones can only set it if they're all we have.
+            if len(self._issues) == 0:
+                self.watermark = self._max_watermark(fetched)
+            for jira_issue in fetched:
+                self._issues[jira_issue.issue_key] = jira_issue
+            # Moved issues come back under their new key, so the old one is no more use to us than a deleted one
+            self._unavailable.update(set(issue_keys) - set(self._issues.keys()))
+            if self.last_refresh is None:
+                self.last_refresh = current_time()
+            self._save()
+        return len(fetched)
+
+    def refresh(self, jira_connection):
+        # type: (JiraConnection) -> int
+        """
+        Refetches only those of our issues updated since the watermark, and gives previously unavailable keys another try
+        :return: count of issues updated
+        """
+        with self._lock:
+            self._load()
+            issue_keys = sorted(self._issues.keys())
+            watermark = self.watermark
+        refreshed = current_time()
+        updated = JiraUtils.get_issues_by_keys(jira_connection, issue_keys, watermark) if len(issue_keys) > 0 else []
+        with self._lock:
+            for jira_issue in updated:
+                self._issues[jira_issue.issue_key] = jira_issue
+            self.watermark = self._max_watermark(updated)
+            self._unavailable = set()
+            self.last_refresh = refreshed
+            self._save()
+        return len(updated)
+
+    def retain(self, issue_keys):
+        # type: (Set[str]) -> None
+        """
+        Drops whatever's no longer linked to from our cached issues, or whose project has since been cached
+        """
+        with self._lock:
+            self._load()
+            dropped = [x for x in self._issues if x not in issue_keys]
+            for issue_key in dropped:
+                del self._issues[issue_key]
+            self._unavailable &= issue_keys
+            if len(dropped) > 0:
+                self._save()
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            if os.path.isfile(self.data_file()):
+                os.remove(self.data_file())
+            self._issues = None
+            self._unavailable = set()
+            self.watermark = None
+            self.last_refresh = None
+
+    def _max_watermark(self, jira_issues):
+        # type: (Iterable[JiraIssue]) -> Optional[str]
+        updated = [JiraProject.clean_ts(x['updated']) for x in jira_issues if 'updated' in x]
+        if self.watermark is not None:
+            updated.append(self.watermark)
+        return max(updated) if len(updated) > 0 else None
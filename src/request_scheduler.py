@@ -0,0 +1,144 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Iterator, List
+
+# Priority classes, lower values served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = ['interactive', 'background']
+
+_thread_priority = threading.local()
+
+
+@contextmanager
+def request_priority(priority):
+    # type: (int) -> Iterator[None]
+    """
+    Tags every request made on this thread within the block with the input priority class. Requests default to
+    INTERACTIVE, so only background work (the sync worker) needs to use this.
+    """
+    previous = getattr(_thread_priority, 'value', INTERACTIVE)
+    _thread_priority.value = priority
+    try:
+        yield
+    finally:
+        _thread_priority.value = previous
+
+
+def current_priority():
+    # type: () -> int
+    return getattr(_thread_priority, 'value', INTERACTIVE)
+
+
+class RequestScheduler:
+    """
+    Token bucket shared by every request made on a single JiraConnection. Tokens refill at requests_per_second up to
+    burst; a request blocks until it can take one. A waiting interactive request takes the next token ahead of any
+    waiting background request, so menu lookups don't queue behind a long sync.
+    """
+
+    DEFAULT_REQUESTS_PER_SECOND = 5.0
+    DEFAULT_BURST = 10
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST):
+        # type: (float, int) -> None
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+
+        self._condition = threading.Condition()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        # Set on a server-side 429 to hold every request until the server's Retry-After has passed
+        self._blocked_until = 0.0
+        self._waiting = [0] * len(PRIORITY_NAMES)  # type: List[int]
+
+        # Per priority class counters
+        self.request_counts = [0] * len(PRIORITY_NAMES)  # type: List[int]
+        self.throttled_counts = [0] * len(PRIORITY_NAMES)  # type: List[int]
+        self.throttled_seconds = [0.0] * len(PRIORITY_NAMES)  # type: List[float]
+
+    def call(self, method, *args, **kwargs):
+        # type: (Callable, Any, Any) -> Any
+        """
+        Waits for a token at the calling thread's priority, then invokes method
+        """
+        self.acquire(current_priority())
+        return method(*args, **kwargs)
+
+    def acquire(self, priority=INTERACTIVE):
+        # type: (int) -> None
+        if self.requests_per_second <= 0:
+            self.request_counts[priority] += 1
+            return
+
+        start = time.monotonic()
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._blocked_until and self._tokens >= 1 and not self._outranked(priority):
+                        self._tokens -= 1
+                        break
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif self._tokens < 1:
+                        wait = (1 - self._tokens) / self.requests_per_second
+                    else:
+                        # A token is available but a higher priority waiter gets it first; it'll notify us when done
+                        wait = None
+                    self._condition.wait(wait)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+        throttled = time.monotonic() - start
+        self.request_counts[priority] += 1
+        # Don't count the microseconds spent taking an uncontended lock as throttling
+        if throttled > 0.001:
+            self.throttled_counts[priority] += 1
+            self.throttled_seconds[priority] += throttled
+
+    def back_off(self, seconds):
+        # type: (float) -> None
+        """
+        Holds all requests for the input duration, i.e. after the server answers with a 429 and a Retry-After
+        """
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+            self._condition.notify_all()
+
+    def _refill(self, now):
+        # type: (float) -> None
+        self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.requests_per_second)
+        self._last_refill = now
+
+    def _outranked(self, priority):
+        # type: (int) -> bool
+        return any(self._waiting[p] > 0 for p in range(priority))
+
+    def stats(self):
+        # type: () -> str
+        return ', '.join(['{}: {} requests, {} throttled for {:.1f}s'.format(
+            PRIORITY_NAMES[p], self.request_counts[p], self.throttled_counts[p], self.throttled_seconds[p])
+            for p in range(len(PRIORITY_NAMES))])
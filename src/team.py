@@ -20,8 +20,8 @@ from src.member_issues_by_status import JiraUserName, MemberIssuesByStatus
 from src.utils import pick_value
 
 if TYPE_CHECKING:
+    from datetime import datetime
     from src.jira_connection import JiraConnection
-    from src.jira_issue import JiraIssue
     from typing import Optional, List, Set, Dict
 
 
@@ -97,8 +97,16 @@ class Team:
             result.update(member.connection_names)
         return result
 
-    def populate_jira_issues(self, jira_connection, issues):
-        # type: (JiraConnection, List[List[JiraIssue]]) -> None
+    def populate_jira_issues(self, jira_connection, since=None):
+        # type: (JiraConnection, Optional[datetime]) -> None
+        """
+        :param since: start of the report, so issues closed since then that have aged out to cold storage are counted.
+            None for only the issues in memory.
+        """
+        if since is None:
+            issues = jira_connection.cached_jira_issues
+        else:
+            issues = jira_connection.cached_jira_issues_closed_since(int(since.timestamp()))
         count_added = 0
         for list_of_issues in issues:
             for jira_issue in list_of_issues:
@@ -25,12 +25,13 @@ from src.jira_manager import JiraManager
 from src.jira_utils import JiraUtils
 from src.member_issues_by_status import JiraUserName, MemberIssuesByStatus
 from src.team import Team
-from src.team_reports import (ReportCurrentLoad, ReportFilter, ReportMomentum,
+from src.team_reports import (ReportCurrentLoad, ReportFilter, ReportFlow, ReportMomentum,
                               ReportReviewLoad, ReportTestLoad, ReportType)
 from src.utils import (clear, conf_dir, get_input, is_yes, pause, pick_value,
                        print_separator, save_argus_config)
 
 if TYPE_CHECKING:
+    from datetime import datetime
     from typing import Dict, List, Optional
 
 
@@ -217,7 +218,8 @@ class TeamManager:
             ReportType.MOMENTUM: ReportMomentum(),
             ReportType.CURRENT_LOAD: ReportCurrentLoad(),
             ReportType.TEST_LOAD: ReportTestLoad(),
-            ReportType.REVIEW_LOAD: ReportReviewLoad()
+            ReportType.REVIEW_LOAD: ReportReviewLoad(),
+            ReportType.FLOW: ReportFlow(jira_manager)
         }
 
         while True:
@@ -237,6 +239,7 @@ class TeamManager:
             print('{}: Team load report: assigned bugs, assigned tests, assigned features, assigned reviews, patch available reviews'.format(ReportType.CURRENT_LOAD))
             print('{}: Test load report: snapshot of currently assigned tests and closed tests in a custom time frame'.format(ReportType.TEST_LOAD))
             print('{}: Review load report: snapshot of currently assigned reviews, Patch Available reviews, and finished reviews in a custom time frame'.format(ReportType.REVIEW_LOAD))
+            print('{}: Flow report: resolved tickets, median cycle and lead time, and work in progress for a custom time frame'.format(ReportType.FLOW))
             print('q: Cancel')
             print('---------------------')
             choice = get_input(':')
@@ -257,8 +260,12 @@ class TeamManager:
                 pause()
 
     @staticmethod
-    def populate_owned_jira_issues(jira_manager, team_members):
-        # type: (JiraManager, List[MemberIssuesByStatus]) -> None
+    def populate_owned_jira_issues(jira_manager, team_members, since=None):
+        # type: (JiraManager, List[MemberIssuesByStatus], Optional[datetime]) -> None
+        """
+        :param since: start of the report, so issues closed since then that have aged out to cold storage are counted.
+            None for only the issues in memory.
+        """
         related_jira_connections = set()
         # clear out any cached data on this team and build a set of JiraConnections we want to add tickets from
         for member in team_members:
@@ -272,7 +279,10 @@ class TeamManager:
         # JiraIssue to that MemberIssuesByStatus
         for jira_connection_name in related_jira_connections:
             jira_connection = jira_manager.get_jira_connection(jira_connection_name)
-            cached_issue_lists = jira_connection.cached_jira_issues
+            if since is None:
+                cached_issue_lists = jira_connection.cached_jira_issues
+            else:
+                cached_issue_lists = jira_connection.cached_jira_issues_closed_since(int(since.timestamp()))
             for list_of_issues in cached_issue_lists:
                 for jira_issue in list_of_issues:
                     for member in team_members:
@@ -290,6 +300,8 @@ class TeamManager:
         # We prompt for a new 'since' on each iteration of the loop
         if report_filter.needs_duration:
             report_filter.since = time_utils.since_now(ReportFilter.get_since())
+            # Picking the team only populated members from memory, missing issues closed in the window but gone cold
+            TeamManager.populate_owned_jira_issues(jira_manager, team.members, report_filter.since)
 
         try:
             sorted_member_issues = sorted(team.members, key=lambda s: s.primary_name.user_name)
@@ -17,12 +17,15 @@ from typing import TYPE_CHECKING
 
 from dateutil import parser
 
+from src import time_utils
+from src.flow_metrics import FlowMetrics
 from src.jira_issue import JiraIssue
 from src.member_issues_by_status import MemberIssuesByStatus
 from src.utils import get_input
 
 if TYPE_CHECKING:
-    from typing import List
+    from typing import List, Optional
+    from src.jira_manager import JiraManager
 
 
 class ReportType:
@@ -32,6 +35,7 @@ class ReportType:
     CURRENT_LOAD = 2
     TEST_LOAD = 3
     REVIEW_LOAD = 4
+    FLOW = 5
 
     @classmethod
     def from_int(cls, value):
@@ -44,6 +48,8 @@ class ReportType:
             return ReportType.TEST_LOAD
         elif value == 4:
             return ReportType.REVIEW_LOAD
+        elif value == 5:
+            return ReportType.FLOW
         else:
             return ReportType.UNKNOWN
 
@@ -274,3 +280,53 @@ class ReportReviewLoad(ReportFilter):
     @property
     def needs_duration(self):
         return True
+
+
+class ReportFlow(ReportFilter):
+
+    """
+    Resolved count, median cycle and lead time in days, and current work in progress. Time bound report.
+    """
+    header = 'Flow'
+
+    def __init__(self, jira_manager):
+        # type: (JiraManager) -> None
+        ReportFilter.__init__(self)
+        self.columns = ['resolved', 'cycle days', 'lead days', 'in progress']
+        self.issues = {'resolved': [], 'cycle days': [], 'lead days': [], 'in progress': []}
+        self._jira_manager = jira_manager
+        self._flow_metrics = None  # type: Optional[FlowMetrics]
+
+    def clear(self):
+        ReportFilter.clear(self)
+        self._flow_metrics = None
+
+    def process_issues(self, member_issues):
+        # type: (MemberIssuesByStatus) -> None
+        owned = {x.issue_key: x for x in member_issues.assigned + member_issues.closed}
+        self._flow_metrics = FlowMetrics(list(owned.values()), self._jira_manager.project_history)
+        since, until = self._window()
+        self._add_matching_issues('resolved', [self._flow_metrics.jira_issues[i]
+                                               for i in self._flow_metrics.resolved_indices(since, until)])
+
+    def matches(self, jira_issue):
+        # type: (JiraIssue) -> bool
+        # Already time bound by FlowMetrics
+        return True
+
+    def print_all_counts(self, name):
+        # type: (str) -> str
+        since, until = self._window()
+        medians = [FlowMetrics.percentile(self._flow_metrics.cycle_times(since, until), 50),
+                   FlowMetrics.percentile(self._flow_metrics.lead_times(since, until), 50)]
+        result = '{:<30}{:<20}'.format(name, len(self.issues['resolved']))
+        for median in medians:
+            result += '{:<20}'.format('n/a' if median is None else '{:.1f}'.format(median))
+        return result + '{:<20}'.format(self._flow_metrics.work_in_progress())
+
+    def _window(self):
+        return int(self.since.timestamp()), int(time_utils.current_time().timestamp())
+
+    @property
+    def needs_duration(self):
+        return True
@@ -0,0 +1,127 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import difflib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Optional, Set
+
+
+class TextIndex:
+    """
+    In-memory, case-insensitive search over a set of short strings such as user or project names. Queries of three or
+    more characters match as substrings by intersecting trigram postings and checking the few survivors; shorter ones
+    match the start of any word. fuzzy() ranks near misses for typos.
+    """
+
+    # Shortest query matched through the trigram postings
+    GRAM = 3
+
+    # difflib similarity below which a fuzzy candidate isn't worth suggesting
+    MIN_FUZZY_RATIO = 0.6
+
+    def __init__(self, values=None):
+        # type: (Optional[Iterable[str]]) -> None
+        # value -> lowered value
+        self._values = {}  # type: Dict[str, str]
+        self._trigrams = {}  # type: Dict[str, Set[str]]
+        # Word prefixes shorter than a trigram
+        self._prefixes = {}  # type: Dict[str, Set[str]]
+        if values is not None:
+            for value in values:
+                self.add(value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, value):
+        return value in self._values
+
+    def add(self, value):
+        # type: (str) -> None
+        if value in self._values:
+            return
+        lowered = value.lower()
+        self._values[value] = lowered
+        for key in self._keys(lowered):
+            self._postings(key).add(value)
+
+    def remove(self, value):
+        # type: (str) -> None
+        lowered = self._values.pop(value, None)
+        if lowered is None:
+            return
+        for key in self._keys(lowered):
+            postings = self._postings(key)
+            postings.discard(value)
+            if len(postings) == 0:
+                del (self._trigrams if len(key) == self.GRAM else self._prefixes)[key]
+
+    def _keys(self, lowered):
+        # type: (str) -> Set[str]
+        keys = {lowered[i:i + self.GRAM] for i in range(len(lowered) - self.GRAM + 1)}
+        for word in lowered.split():
+            for length in range(1, min(self.GRAM, len(word) + 1)):
+                keys.add(word[:length])
+        return keys
+
+    def _postings(self, key):
+        # type: (str) -> Set[str]
+        postings = self._trigrams if len(key) == self.GRAM else self._prefixes
+        if key not in postings:
+            postings[key] = set()
+        return postings[key]
+
+    def search(self, query):
+        # type: (str) -> List[str]
+        """
+        :return: sorted values containing query, or with a word starting with it if shorter than a trigram
+        """
+        lowered = query.lower().strip()
+        if lowered == '':
+            return sorted(self._values)
+        if len(lowered) < self.GRAM:
+            return sorted(self._prefixes.get(lowered, []))
+
+        postings = sorted([self._trigrams.get(lowered[i:i + self.GRAM], set())
+                           for i in range(len(lowered) - self.GRAM + 1)], key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            if len(candidates) == 0:
+                break
+            candidates &= other
+        return sorted([x for x in candidates if lowered in self._values[x]])
+
+    def fuzzy(self, query, limit=5):
+        # type: (str, int) -> List[str]
+        """
+        Ranks values sharing at least one trigram or word prefix with query by difflib similarity, against the whole
+        value or any one word of it, whichever is closer.
+        :return: up to limit values, closest first
+        """
+        lowered = query.lower().strip()
+        if lowered == '':
+            return []
+        candidates = set()  # type: Set[str]
+        for key in self._keys(lowered):
+            candidates.update(self._trigrams.get(key, []) if len(key) == self.GRAM else self._prefixes.get(key, []))
+
+        scored = []
+        for candidate in candidates:
+            words = [self._values[candidate]] + self._values[candidate].split()
+            ratio = max([difflib.SequenceMatcher(None, lowered, x).ratio() for x in words])
+            if ratio >= self.MIN_FUZZY_RATIO:
+                scored.append((ratio, candidate))
+        return [x for _, x in sorted(scored, key=lambda s: (-s[0], s[1]))[:limit]]
@@ -12,14 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import calendar
 import re
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 import pytz
 from dateutil.relativedelta import relativedelta
 
 from src import utils
 
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
 
 def current_time():
     # type: () -> datetime
@@ -55,3 +60,64 @@ def _extract_time(char, input):
     if result_match:
         return int(result_match.group(1))
     return 0
+
+
+# Format used when persisting our own timestamps (last sync, last reconcile, etc) to .cfg files. Always stored as UTC.
+CONFIG_TIME_FORMAT = '%Y/%m/%d %H:%M'
+
+
+def to_config_time(value):
+    # type: (datetime) -> str
+    return value.astimezone(pytz.utc).strftime(CONFIG_TIME_FORMAT)
+
+
+def from_config_time(value):
+    # type: (str) -> datetime
+    return datetime.strptime(value, CONFIG_TIME_FORMAT).replace(tzinfo=pytz.utc)
+
+
+def hours_since(value):
+    # type: (datetime) -> float
+    return (current_time() - value).total_seconds() / 3600
+
+
+def parse_as_of(value):
+    # type: (str) -> datetime
+    """
+    Accepts either a date in CONFIG_TIME_FORMAT's yyyy/mm/dd form (optionally with hh:mm), taken as UTC, or a since_now
+    delta such as '-2w'
+    :raises ValueError: on input in neither form
+    """
+    value = value.strip()
+    for time_format in [CONFIG_TIME_FORMAT, CONFIG_TIME_FORMAT.split(' ')[0]]:
+        try:
+            return datetime.strptime(value, time_format).replace(tzinfo=pytz.utc)
+        except ValueError:
+            pass
+    if re.fullmatch(r'([\-0-9]+[dwmy]\s*)+', value) is None:
+        raise ValueError('Expected a yyyy/mm/dd date or a delta such as -2w, got: {}'.format(value))
+    return since_now(value)
+
+
+# 'yyyy-mm-dd' -> epoch seconds at midnight UTC. Bounded by the number of distinct days seen, a few thousand at most.
+_epoch_days = {}  # type: Dict[str, int]
+
+
+def jira_epoch(value):
+    # type: (Optional[str]) -> Optional[int]
+    """
+    Fast path for the one timestamp format JIRA sends (2016-12-12T08:58:11.588-0600), slicing fields out by position
+    rather than going through strptime or dateutil. Bulk reports convert every issue's dates with this.
+    :return: epoch seconds, None for an unset value
+    """
+    if value is None or value == 'None' or value == '':
+        return None
+    day = value[0:10]
+    day_seconds = _epoch_days.get(day)
+    if day_seconds is None:
+        day_seconds = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]), 0, 0, 0, 0, 0, 0))
+        _epoch_days[day] = day_seconds
+    seconds = day_seconds + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+    offset = value[-5:]
+    offset_seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+    return seconds - offset_seconds if offset[0] == '+' else seconds + offset_seconds
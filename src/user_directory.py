@@ -0,0 +1,196 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import threading
+from typing import TYPE_CHECKING
+
+from src import utils
+from src.text_index import TextIndex
+from src.time_utils import current_time, hours_since
+from src.utils import jira_data_dir
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from typing import Dict, Iterable, List, Optional
+    from src.jira_issue import JiraIssue
+
+
+class UserDirectory:
+    """
+    Locally cached users for a single JiraConnection, keyed by user name and searched through a TextIndex on display
+    name. Display names aren't unique, so each maps to every user name we know it by. It fills from three places, each
+    merged in rather than replacing what's there: the assignees and reporters of every synced issue (free, so it works
+    offline from the first sync on), a periodic page through the assignable users of our cached projects, and any live
+    user search made on a local miss.
+    """
+
+    # Hours between pages through the assignable users of our cached projects
+    REFRESH_HOURS = 24
+
+    # Issue fields holding a user's display name
+    USER_FIELDS = ['assignee', 'reporter']
+
+    def __init__(self, connection_name):
+        # type: (str) -> None
+        self.connection_name = connection_name
+        # user name -> display name
+        self._users = None  # type: Optional[Dict[str, str]]
+        # display name -> user names, empty if we've only seen the display name on an issue
+        self._display_names = {}  # type: Dict[str, List[str]]
+        self._index = TextIndex()
+        self.last_refresh = None  # type: Optional[datetime]
+        # Harvested from the sync worker while the menus search
+        self._lock = threading.Lock()
+
+    def data_file(self):
+        # type: () -> str
+        file_name = os.path.join(jira_data_dir, '{}.users'.format(self.connection_name))
+        if utils.unit_test:
+            file_name = os.path.join(utils.TEST_DIR, file_name)
+        return file_name
+
+    def _load(self):
+        if self._users is not None:
+            return
+        self._users = {}
+        if os.path.exists(self.data_file()):
+            with open(self.data_file(), 'rb') as data_file:
+                self._users, self._display_names, self.last_refresh = pickle.load(data_file)
+        for display_name in self._display_names:
+            self._index.add(display_name)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.data_file()), exist_ok=True)
+        temp_file_name = '{}.tmp'.format(self.data_file())
+        with open(temp_file_name, 'wb') as data_file:
+            pickle.dump((self._users, self._display_names, self.last_refresh), data_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_name, self.data_file())
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            # Display names only seen on issues count as one user each
+            return len(self._users) + sum(1 for x in self._display_names.values() if len(x) == 0)
+
+    @property
+    def is_stale(self):
+        # type: () -> bool
+        with self._lock:
+            self._load()
+            return self.last_refresh is None or hours_since(self.last_refresh) >= self.REFRESH_HOURS
+
+    def add_users(self, users, refreshed=False):
+        # type: (Dict[str, str], bool) -> int
+        """
+        :param users: user name -> display name
+        :param refreshed: users are a complete page through the assignable users, so restart the refresh clock
+        :return: count of users we didn't already know. A user name for a display name we'd only seen on an issue
+            isn't a new user.
+        """
+        added = 0
+        changed = False
+        with self._lock:
+            self._load()
+            for user_name, display_name in users.items():
+                previous = self._users.get(user_name)
+                if previous == display_name:
+                    continue
+                changed = True
+                if previous is not None:
+                    # Renamed, so drop the old display name unless someone else still goes by it
+                    self._display_names[previous].remove(user_name)
+                    if len(self._display_names[previous]) == 0:
+                        del self._display_names[previous]
+                        self._index.remove(previous)
+                elif len(self._display_names.get(display_name, [None])) > 0:
+                    added += 1
+                self._users[user_name] = display_name
+                if display_name not in self._display_names:
+                    self._display_names[display_name] = []
+                    self._index.add(display_name)
+                self._display_names[display_name].append(user_name)
+            if refreshed:
+                self.last_refresh = current_time()
+            if changed or refreshed:
+                self._save()
+        return added
+
+    def harvest(self, jira_issues):
+        # type: (Iterable[JiraIssue]) -> int
+        """
+        Adds the display names of the assignees and reporters of the input issues
+        :return: count of users we didn't already know
+        """
+        added = 0
+        with self._lock:
+            self._load()
+            for jira_issue in jira_issues:
+                for field in UserDirectory.USER_FIELDS:
+                    display_name = jira_issue.get(field)
+                    if display_name is not None and display_name != 'None' and display_name not in self._display_names:
+                        added += 1
+                        self._display_names[display_name] = []
+                        self._index.add(display_name)
+            if added > 0:
+                self._save()
+        return added
+
+    def search(self, snippet):
+        # type: (str) -> List[str]
+        """
+        :return: display names matching snippet
+        """
+        with self._lock:
+            self._load()
+            return self._index.search(snippet)
+
+    def fuzzy(self, snippet):
+        # type: (str) -> List[str]
+        with self._lock:
+            self._load()
+            return self._index.fuzzy(snippet)
+
+    def user_names(self, display_name):
+        # type: (str) -> List[str]
+        """
+        :return: every user name going by display_name, empty if we don't know any
+        """
+        with self._lock:
+            self._load()
+            return sorted(self._display_names.get(display_name, []))
+
+    def user_name(self, display_name):
+        # type: (str) -> Optional[str]
+        """
+        :return: None if we don't know display_name's user name, or it's shared by several users
+        """
+        user_names = self.user_names(display_name)
+        return user_names[0] if len(user_names) == 1 else None
+
+    def display_name(self, user_name):
+        # type: (str) -> Optional[str]
+        with self._lock:
+            self._load()
+            return self._users.get(user_name)
+
+    def delete_on_disk_files(self):
+        with self._lock:
+            if os.path.isfile(self.data_file()):
+                os.remove(self.data_file())
+            self._users = None
+            self._display_names = {}
+            self._index = TextIndex()
+            self.last_refresh = None
@@ -91,11 +91,24 @@ def build_config_name(file_name):
 
 
 def save_argus_data(items, file_name):
+    """
+    Writes to a temp file and swaps it into place so an interrupted save (e.g. the background sync worker at shutdown)
+    never leaves a truncated data file behind. The temp file is unique, so overlapping saves of one file can't clobber
+    each other's.
+    """
     if unit_test:
         file_name = os.path.join('tests', file_name)
-    with open(file_name, 'wb') as cf:
-        for item in items:
-            item.serialize(cf)
+    temp_fd, temp_file_name = tempfile.mkstemp(prefix='{}.'.format(os.path.basename(file_name)), suffix='.tmp',
+                                               dir=os.path.dirname(file_name) or '.')
+    try:
+        with os.fdopen(temp_fd, 'wb') as cf:
+            for item in items:
+                item.serialize(cf)
+        os.replace(temp_file_name, file_name)
+    except BaseException:
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+        raise
 
 
 def clear():
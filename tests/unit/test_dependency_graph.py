@@ -0,0 +1,162 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for DependencyGraph closure, ordering, critical path and reverse-dependency queries over project
+link indexes, and when JiraManager rebuilds it
+"""
+
+import gc
+import weakref
+from unittest.mock import Mock, patch
+
+from src.dependency_graph import DependencyGraph
+from src.display_filter import DisplayFilter
+from src.jira_manager import JiraManager
+from src.jira_project import JiraProject
+from src.link_index import LinkIndex
+from src.project_residency import residency
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+VERSION_4_0 = [{'self': 'https://jira.example.com/rest/api/2/version/1', 'name': '4.0'}]
+FIXED = {'self': 'https://jira.example.com/rest/api/2/resolution/1', 'name': 'Fixed'}
+
+
+class TestDependencyGraph(Tester):
+
+    def setUp(self):
+        super(TestDependencyGraph, self).setUp()
+        self.jira_connection = build_jira_connection()
+
+    def _issue(self, issue_key, links='', **fields):
+        jira_issue = build_jira_issue(self.jira_connection, issue_key, **fields)
+        dict.__setitem__(jira_issue, 'issuelinks', links)
+        return jira_issue
+
+    def _graph(self, *jira_issues):
+        issues = {x.issue_key: x for x in jira_issues}
+        return DependencyGraph([{x.issue_key: LinkIndex.entry(x) for x in jira_issues}], issues.get)
+
+    def test_blocking_closure_order_and_critical_path(self):
+        # ROOT-1 on 4.0 depends on A-1 and A-2. A-1 needs A-3, which needs EXT-1 we don't cache. A-2 is done.
+        # Relates-to links aren't followed, and ROOT-2 depends on ROOT-1 within the FixVersion.
+        graph = self._graph(
+            self._issue('ROOT-1', 'A-1:Dependency:outward,A-2:Blocker:outward,A-9:Related Issue:outward', fixVersions=VERSION_4_0),
+            self._issue('ROOT-2', 'ROOT-1:Dependency:outward', fixVersions=VERSION_4_0),
+            self._issue('A-1', 'A-3:Required:outward,ROOT-1:Dependency:inward'),
+            self._issue('A-2', resolution=FIXED),
+            self._issue('A-3', 'EXT-1:Dependency:outward'),
+            self._issue('A-9'))
+
+        self.assertEqual(graph.issue_count, 6)
+        self.assertEqual(len(graph), 7)
+        self.assertIsNone(graph.issue('EXT-1'))
+        self.assertListEqual(sorted(graph.fix_version_roots('4.0')), ['ROOT-1', 'ROOT-2'])
+        self.assertListEqual(sorted(graph.blocking_fix_version('4.0')), ['A-1', 'A-2', 'A-3', 'EXT-1'])
+        self.assertListEqual(sorted(graph.closure(['ROOT-1'], {'relates to'})), ['A-9'])
+
+        order, cyclic = graph.topological_order(['ROOT-1', 'ROOT-2', 'A-1', 'A-2', 'A-3', 'EXT-1'])
+        self.assertListEqual(cyclic, [])
+        for before, after in [('EXT-1', 'A-3'), ('A-3', 'A-1'), ('A-1', 'ROOT-1'), ('A-2', 'ROOT-1'), ('ROOT-1', 'ROOT-2')]:
+            self.assertLess(order.index(before), order.index(after))
+
+        # EXT-1 isn't ours to count and A-2 is resolved, so neither is part of the chain
+        self.assertListEqual(graph.critical_path(graph.fix_version_roots('4.0') + graph.blocking_fix_version('4.0')),
+                             ['A-3', 'A-1', 'ROOT-1', 'ROOT-2'])
+
+    def test_cycles_left_out_of_order(self):
+        graph = self._graph(self._issue('A-1', 'A-2:Dependency:outward'), self._issue('A-2', 'A-1:Dependency:outward'),
+                            self._issue('A-3', 'A-1:Dependency:outward'), self._issue('A-4'))
+        order, cyclic = graph.topological_order(['A-1', 'A-2', 'A-3', 'A-4'])
+        self.assertListEqual(order, ['A-4'])
+        self.assertListEqual(cyclic, ['A-1', 'A-2', 'A-3'])
+        self.assertListEqual(graph.critical_path(['A-4']), ['A-4'])
+
+    def test_reverse_index_and_impact(self):
+        # A-1 blocks B-1 and B-2, and C-1 through a reverse-typed link. B-2 also waits on A-2, C-1 on a closed A-3.
+        # B-3 waits on A-1 but is already resolved, and D-1 only relates to it.
+        graph = self._graph(
+            self._issue('A-1'), self._issue('A-2'), self._issue('A-3', resolution=FIXED),
+            self._issue('B-1', 'A-1:Dependency:outward'),
+            self._issue('B-2', 'A-1:Dependency:outward,A-2:Required:outward'),
+            self._issue('B-3', 'A-1:Dependency:outward', resolution=FIXED),
+            self._issue('C-1', 'A-1:Blocker:outward,A-3:Dependency:outward'),
+            self._issue('D-1', 'A-1:Related Issue:outward,B-1:Dependency:inward'),
+            self._issue('E-1', 'B-2:Dependency:outward'))
+
+        self.assertListEqual(sorted(graph.incoming('A-1')), [('B-1', 'depends on'), ('B-2', 'depends on'), ('B-3', 'depends on'),
+                                                              ('C-1', 'blocked by'), ('D-1', 'relates to')])
+        self.assertListEqual(graph.incoming('E-1'), [])
+        self.assertListEqual(graph.waiting_on('A-1'), ['B-1', 'B-2', 'C-1'])
+        self.assertListEqual(sorted(graph.dependents(['A-1'])), ['B-1', 'B-2', 'B-3', 'C-1', 'E-1'])
+        self.assertListEqual(graph.unblocked_by('A-1'), ['B-1', 'C-1'])
+        self.assertListEqual(graph.unblocked_by('A-2'), [])
+
+    def test_issues_looked_up_not_held(self):
+        issues = {x.issue_key: x for x in [self._issue('A-1'), self._issue('B-1', 'A-1:Dependency:outward')]}
+        graph = DependencyGraph([{x.issue_key: LinkIndex.entry(x) for x in issues.values()}], issues.get)
+        self.assertListEqual(graph.waiting_on('A-1'), ['B-1'])
+
+        # A sync swapping in a new B-1 is looked up, and the old copy isn't kept alive by the graph
+        previous = weakref.ref(issues['B-1'])
+        issues['B-1'] = self._issue('B-1', 'A-1:Dependency:outward', summary='Refreshed')
+        gc.collect()
+        self.assertIsNone(previous())
+        self.assertIs(graph.issue('B-1'), issues['B-1'])
+
+    def test_rebuilt_only_on_link_changes(self):
+        one = JiraProject(self.jira_connection, 'ONE', self.jira_connection.url,
+                          issues={'ONE-1': self._issue('ONE-1', 'TWO-1:Dependency:outward')})
+        two = JiraProject(self.jira_connection, 'TWO', self.jira_connection.url, issues={'TWO-1': self._issue('TWO-1')})
+        self.jira_connection.add_and_link_jira_project(one)
+        self.jira_connection.add_and_link_jira_project(two)
+        one.save_config()
+        two.save_config()
+        jira_manager = Mock()
+        jira_manager._dependency_graphs = {}
+
+        with patch.object(residency, 'on_load'):
+            self.assertTrue(two.unload())
+            load_count = residency.load_count
+            graph = JiraManager.dependency_graph(jira_manager, self.jira_connection)
+            self.assertListEqual(graph.waiting_on('TWO-1'), ['ONE-1'])
+            self.assertListEqual(graph.fix_version_roots('4.0'), [])
+
+            # Syncs that leave links, FixVersions and resolution alone keep the graph, and none of it reloads TWO
+            one.publish_issues([self._issue('ONE-1', 'TWO-1:Dependency:outward', summary='Refreshed')])
+            self.assertIs(JiraManager.dependency_graph(jira_manager, self.jira_connection), graph)
+            self.assertFalse(two.is_resident)
+
+            one.publish_issues([self._issue('ONE-1', 'TWO-1:Dependency:outward', resolution=FIXED, fixVersions=VERSION_4_0)])
+            rebuilt = JiraManager.dependency_graph(jira_manager, self.jira_connection)
+            self.assertIsNot(rebuilt, graph)
+            self.assertListEqual(rebuilt.waiting_on('TWO-1'), [])
+            self.assertListEqual(rebuilt.fix_version_roots('4.0'), ['ONE-1'])
+            self.assertFalse(two.is_resident)
+            self.assertEqual(residency.load_count, load_count)
+        residency.forget(one)
+        residency.forget(two)
+
+    def test_blocking_column_resolves_graph_once(self):
+        issues = [self._issue('A-1'), self._issue('B-1', 'A-1:Dependency:outward'),
+                  self._issue('B-2', 'A-1:Dependency:outward')]
+        jira_manager = Mock()
+        jira_manager.connection_dependency_graph.return_value = self._graph(*issues)
+        display_filter = DisplayFilter()
+        display_filter.include_column(DisplayFilter.BLOCKING_STRING, DisplayFilter.BLOCKING_STRING, 8)
+        with patch('src.display_filter.pydoc.pager') as pager:
+            display_filter.display_and_return_sorted_issues(jira_manager, issues)
+        jira_manager.connection_dependency_graph.assert_called_once_with(self.jira_connection.connection_name)
+        self.assertListEqual([x.split('|')[1].strip() for x in pager.call_args[0][0].splitlines()[-3:]], ['2', '0', '0'])
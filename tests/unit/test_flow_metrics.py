@@ -0,0 +1,73 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for FlowMetrics, driven from the recorded CASSANDRA-12345 changelog up to its resolution.
+"""
+
+from src.flow_metrics import FlowMetrics
+from src.issue_history import IssueHistory
+from src.jira_issue import JiraIssue
+from src.time_utils import jira_epoch
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue, load_raw_changelog, load_raw_issue
+
+
+class TestFlowMetrics(Tester):
+
+    def setUp(self):
+        super(TestFlowMetrics, self).setUp()
+        history = IssueHistory('test_connection', 'CASSANDRA')
+        history.append_changelog('CASSANDRA-12345', load_raw_changelog('CASSANDRA-12345')['histories'][:3])
+
+        raw_issue = load_raw_issue('CASSANDRA-12345')
+        raw_issue['fields']['status']['name'] = 'Resolved'
+        raw_issue['fields']['resolution'] = {'self': 'https://issues.apache.org/jira/rest/api/2/resolution/1', 'name': 'Fixed'}
+        raw_issue['fields']['resolutiondate'] = '2018-03-20T16:15:00.000+0000'
+        untracked = build_jira_issue(build_jira_connection(), 'OTHER-1', created='2018-03-02T00:00:00.000+0000')
+
+        self.flow_metrics = FlowMetrics([JiraIssue.from_json('test_connection', raw_issue), untracked],
+                                        lambda project_name: history if project_name == 'CASSANDRA' else None)
+        self.since = jira_epoch('2018-03-01T00:00:00.000+0000')
+        self.until = jira_epoch('2018-03-29T00:00:00.000+0000')
+
+    def test_cycle_and_lead_time(self):
+        self.assertEqual(self.flow_metrics.untracked_count, 1)
+        cycle_times = self.flow_metrics.cycle_times(self.since, self.until)
+        lead_times = self.flow_metrics.lead_times(self.since, self.until)
+        self.assertEqual(len(cycle_times), 1)
+        # Started on the Open -> In Progress transition at 03/01 09:00
+        self.assertAlmostEqual(cycle_times[0], 19 + 7.25 / 24, places=3)
+        self.assertEqual(len(lead_times), 1)
+        self.assertListEqual(self.flow_metrics.throughput(self.since, self.until), [0, 0, 1, 0])
+        self.assertEqual(self.flow_metrics.work_in_progress(), 0)
+
+    def test_cumulative_flow(self):
+        samples, flow = self.flow_metrics.cumulative_flow(self.since, self.until)
+        self.assertEqual(len(samples), 29)
+        self.assertEqual(flow['In Progress'][1], 1)
+        self.assertEqual(flow['Patch Available'][5], 1)
+        self.assertEqual(flow['Resolved'][21], 1)
+        self.assertEqual(flow['Patch Available'][21], 0)
+        # Nothing says when the open untracked issue reached its status, so it's left out
+        self.assertNotIn('None', flow)
+
+    def test_cumulative_flow_untracked_resolved(self):
+        fixed = {'self': 'https://jira.example.com/rest/api/2/resolution/1', 'name': 'Fixed'}
+        untracked = build_jira_issue(build_jira_connection(), 'OTHER-2', created='2018-03-02T00:00:00.000+0000',
+                                     status={'self': 'https://jira.example.com/rest/api/2/status/6', 'name': 'Closed'},
+                                     resolution=fixed, resolutiondate='2018-03-10T00:00:00.000+0000')
+        _, flow = FlowMetrics([untracked], lambda project_name: None).cumulative_flow(self.since, self.until)
+        # Only placed once resolved, not in its final status back to creation
+        self.assertListEqual(flow['Closed'][7:11], [0, 0, 1, 1])
@@ -0,0 +1,151 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for IssueCatalog key resolution across connections, its shared missing-issue placeholders, and
+incremental dependency resolution through them
+"""
+
+import pickle
+from unittest.mock import Mock, PropertyMock, patch
+
+from src.issue_catalog import IssueCatalog
+from src.jira_connection import JiraConnection
+from src.jira_manager import JiraManager
+from src.jira_project import JiraProject
+from src.project_residency import residency
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestIssueCatalog(Tester):
+
+    def setUp(self):
+        super(TestIssueCatalog, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.issue_catalog = IssueCatalog({self.jira_connection.connection_name: self.jira_connection})
+
+    def _jira_manager(self):
+        jira_manager = Mock()
+        jira_manager.missing_project_counts = {}
+        jira_manager.issue_catalog = self.issue_catalog
+        jira_manager.get_jira_issue.side_effect = self.issue_catalog.get
+        jira_manager.create_non_cached_issue.side_effect = self.issue_catalog.placeholder
+        return jira_manager
+
+    def _add_project(self, project_name, issue_keys):
+        issues = {key: build_jira_issue(self.jira_connection, key) for key in issue_keys}
+        jira_project = JiraProject(self.jira_connection, project_name, self.jira_connection.url, issues=issues)
+        self.jira_connection.add_and_link_jira_project(jira_project)
+        return jira_project
+
+    def test_reindexes_only_when_projects_change(self):
+        self._add_project('ONE', ['ONE-1'])
+        self.assertEqual(self.issue_catalog.get('ONE-1').issue_key, 'ONE-1')
+        self.assertIsNone(self.issue_catalog.get('TWO-1'))
+
+        with patch.object(JiraConnection, 'cached_projects', new_callable=PropertyMock, return_value=[]) as cached:
+            # Indexed already, so a lookup doesn't walk the connections again
+            self.assertIsNotNone(self.issue_catalog.get('ONE-1'))
+        cached.assert_not_called()
+
+        self._add_project('TWO', ['TWO-1'])
+        self.assertEqual(self.issue_catalog.get('TWO-1').issue_key, 'TWO-1')
+        self.jira_connection.delete_cached_jira_project('ONE')
+        self.assertIsNone(self.issue_catalog.get('ONE-1'))
+        self.assertListEqual(sorted(self.issue_catalog.projects().keys()), ['TWO'])
+
+    def test_placeholders_shared_per_key(self):
+        placeholder = self.issue_catalog.placeholder('EXT-1')
+        self.assertFalse(placeholder.is_cached_offline)
+        self.assertIs(self.issue_catalog.placeholder('EXT-1'), placeholder)
+        self.assertIsNot(self.issue_catalog.placeholder('EXT-2'), placeholder)
+        self.assertEqual(self.issue_catalog.placeholder_count(), 2)
+        self.issue_catalog.clear_placeholders()
+        self.assertEqual(self.issue_catalog.placeholder_count(), 0)
+
+    def test_placeholder_links_upgraded_in_place(self):
+        source = self._add_project('ONE', ['ONE-1']).get_issue('ONE-1')
+        dict.__setitem__(source, 'issuelinks', 'TWO-1:Dependency:outward,TWO-2:Blocker:inward,')
+        jira_manager = self._jira_manager()
+        source.resolve_dependencies(jira_manager)
+        self.assertFalse(source.needs_resolution)
+        self.assertTrue(all(not x.target.is_cached_offline for x in source.dependencies))
+        self.assertListEqual(self.issue_catalog.waiting_keys(), ['TWO-1', 'TWO-2'])
+
+        two = self._add_project('TWO', ['TWO-1'])
+        self.assertEqual(self.issue_catalog.retarget(['TWO-1', 'TWO-2']), 1)
+        targets = {x.target.issue_key: x.target for x in source.dependencies}
+        self.assertIs(targets['TWO-1'], two.get_issue('TWO-1'))
+        self.assertFalse(targets['TWO-2'].is_cached_offline)
+        self.assertListEqual(self.issue_catalog.waiting_keys(), ['TWO-2'])
+
+    def test_links_retargeted_on_republish(self):
+        one = self._add_project('ONE', ['ONE-1'])
+        two = self._add_project('TWO', ['TWO-1'])
+        source = one.get_issue('ONE-1')
+        dict.__setitem__(source, 'issuelinks', 'TWO-1:Dependency:outward,')
+        source.resolve_dependencies(self._jira_manager())
+        self.assertIs(next(iter(source.dependencies)).target, two.get_issue('TWO-1'))
+
+        # A sync swaps in a new copy of TWO-1; ONE-1 isn't re-resolved but follows it
+        refreshed = build_jira_issue(self.jira_connection, 'TWO-1', summary='Refreshed')
+        two.publish_issues([refreshed])
+        self.assertEqual(self.issue_catalog.retarget(['TWO-1']), 1)
+        self.assertIs(next(iter(source.dependencies)).target, refreshed)
+        self.assertEqual(self.issue_catalog.retarget(['TWO-1']), 0)
+
+    def test_mutually_linked_projects_reload_within_budget(self):
+        one = self._add_project('ONE', ['ONE-1'])
+        two = self._add_project('TWO', ['TWO-1'])
+        dict.__setitem__(one.get_issue('ONE-1'), 'issuelinks', 'TWO-1:Dependency:outward,')
+        dict.__setitem__(two.get_issue('TWO-1'), 'issuelinks', 'ONE-1:Dependency:inward,')
+        one.save_config()
+        two.save_config()
+        jira_manager = self._jira_manager()
+
+        # Each estimates to IN_MEMORY_RATIO MB, so only one fits
+        with patch.object(residency, 'budget_mb', residency.IN_MEMORY_RATIO + 1), \
+                patch.object(JiraProject, 'estimated_bytes', return_value=1024 * 1024), \
+                patch.object(residency, 'on_load',
+                             lambda x: JiraManager._resolve_new_issues(jira_manager, list(x.jira_issues.values()))):
+            self.assertTrue(one.unload() and two.unload())
+            load_count = residency.load_count
+            one_issue = one.get_issue('ONE-1')
+            # TWO stays unloaded, so the link waits on a placeholder rather than reloading it
+            self.assertFalse(two.is_resident)
+            self.assertFalse(next(iter(one_issue.dependencies)).target.is_cached_offline)
+            self.assertEqual(jira_manager.missing_project_counts, {})
+
+            two_issue = two.get_issue('TWO-1')
+            self.assertFalse(one.is_resident)
+            self.assertIs(next(iter(one_issue.dependencies)).target, two_issue)
+            self.assertEqual(residency.load_count - load_count, 2)
+        residency.forget(one)
+        residency.forget(two)
+
+    def test_parsed_links_persisted(self):
+        jira_issue = build_jira_issue(self.jira_connection, 'ONE-1')
+        dict.__setitem__(jira_issue, 'issuelinks', 'TWO-1:Dependency:outward')
+        jira_issue.resolve_dependencies(self._jira_manager())
+        reloaded = pickle.loads(pickle.dumps(jira_issue))
+        self.assertTrue(reloaded.needs_resolution)
+        # The linked issues aren't written out along with it
+        self.assertEqual(len(jira_issue.dependencies), 1)
+        self.assertSetEqual(reloaded.dependencies, set())
+        with patch('src.jira_dependency.JiraDependency.validate_input_data') as validate:
+            self.assertListEqual(reloaded.parsed_links(), [('TWO-1', 'Dependency', 'outward')])
+            validate.assert_not_called()
+        dict.__setitem__(reloaded, 'issuelinks', 'TWO-3:Dependency:outward')
+        self.assertListEqual(reloaded.linked_issue_keys(), ['TWO-3'])
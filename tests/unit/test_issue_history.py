@@ -0,0 +1,129 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for the changelog-backed IssueHistory store, using a recorded changelog.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytz
+
+from src.issue_history import IssueHistory
+from src.jira_connection import JiraConnection
+from src.jira_issue import JiraIssue
+from src.jira_utils import JiraUtils
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue, load_raw_changelog, load_raw_issue
+
+
+class TestIssueHistory(Tester):
+
+    def test_incremental_append_and_reload(self):
+        histories = load_raw_changelog('CASSANDRA-12345')['histories']
+        history = IssueHistory('test_connection', 'CASSANDRA')
+
+        self.assertEqual(history.append_changelog('CASSANDRA-12345', histories[:2]), 3)
+        # Overlapping pages from a later incremental sync only append what's new
+        self.assertEqual(history.append_changelog('CASSANDRA-12345', histories), 4)
+        self.assertEqual(history.last_history_id('CASSANDRA-12345'), 15900004)
+
+        # A fresh instance reads only the index, then the records asked for
+        reloaded = IssueHistory('test_connection', 'CASSANDRA')
+        self.assertListEqual(reloaded.fields('CASSANDRA-12345'), ['fixVersions', 'resolution', 'status'])
+        statuses = [x.to_string for x in reloaded.transitions('CASSANDRA-12345', 'status')]
+        self.assertListEqual(statuses, ['In Progress', 'Patch Available', 'Resolved', 'Reopened'])
+        self.assertEqual(len(reloaded.transitions('CASSANDRA-12345')), 7)
+        self.assertEqual(len(reloaded.field_index('CASSANDRA-12345', 'fixVersions')), 1)
+
+    def test_sync_strips_and_records_changelog(self):
+        jira_connection = build_jira_connection(url='https://issues.apache.org/jira')
+        raw_issue = load_raw_issue('CASSANDRA-12345')
+        raw_issue['changelog'] = load_raw_changelog('CASSANDRA-12345')
+        history = IssueHistory(jira_connection.connection_name, 'CASSANDRA')
+
+        with patch.object(JiraConnection, 'search_issues_json', return_value={'total': 1, 'issues': [raw_issue]}) as search:
+            issues = JiraUtils.get_issues_for_project(jira_connection, 'CASSANDRA', '2018/01/01 00:00', history)
+
+        self.assertEqual(search.call_args[1]['expand'], 'changelog')
+        self.assertNotIn('changelog', raw_issue)
+        self.assertEqual(issues[0].issue_key, 'CASSANDRA-12345')
+        self.assertEqual(len(history.transitions('CASSANDRA-12345', 'resolution')), 2)
+
+    def test_issues_as_of(self):
+        history = IssueHistory('test_connection', 'CASSANDRA')
+        history.append_changelog('CASSANDRA-12345', load_raw_changelog('CASSANDRA-12345')['histories'])
+        raw_issue = load_raw_issue('CASSANDRA-12345')
+        # Bring the recorded issue up to the end state of the recorded changelog
+        raw_issue['fields']['status']['name'] = 'Reopened'
+        current = JiraIssue.from_json('test_connection', raw_issue)
+
+        def as_of(year, month, day):
+            return history.issues_as_of([current], int(datetime(year, month, day, tzinfo=pytz.utc).timestamp()))
+
+        rewound = as_of(2018, 3, 25)[0]
+        self.assertEqual(rewound['status'], 'Resolved')
+        self.assertEqual(rewound['resolution'], 'Fixed')
+        self.assertTrue(rewound.is_closed)
+        self.assertEqual(rewound['fixVersions'], '4.0,3.11.5')
+
+        rewound = as_of(2018, 3, 3)[0]
+        self.assertEqual(rewound['status'], 'In Progress')
+        self.assertTrue(rewound.is_open)
+        self.assertEqual(rewound['fixVersions'], '3.11.5')
+
+        # The cached issue itself is untouched
+        self.assertEqual(current['status'], 'Reopened')
+        self.assertEqual(current['fixVersions'], '4.0,3.11.5')
+
+        self.assertListEqual(as_of(2000, 1, 1), [])
+
+    def test_issues_as_of_multi_valued(self):
+        history = IssueHistory('test_connection', 'CASSANDRA')
+        history.append_changelog('CASSANDRA-1', [
+            {'id': '1', 'created': '2018-03-01T10:00:00.000+0000', 'items': [
+                {'field': 'Component', 'fieldtype': 'jira', 'fromString': None, 'toString': 'B'},
+                {'field': 'Link', 'fieldtype': 'jira', 'fromString': 'This issue is blocked by CASSANDRA-4',
+                 'toString': None},
+                {'field': 'labels', 'fieldtype': 'jira', 'fromString': 'perf', 'toString': 'perf triage'}]},
+            {'id': '2', 'created': '2018-03-02T10:00:00.000+0000', 'items': [
+                {'field': 'Component', 'fieldtype': 'jira', 'fromString': 'C', 'toString': None},
+                {'field': 'Link', 'fieldtype': 'jira', 'fromString': None,
+                 'toString': 'This issue depends upon CASSANDRA-3'}]}])
+        components = [{'self': 'https://jira.example.com/rest/api/2/component/{}'.format(x), 'name': name, 'id': x}
+                      for x, name in [('1', 'A'), ('2', 'B')]]
+        current = build_jira_issue(build_jira_connection(), 'CASSANDRA-1', created='2018-01-01T10:00:00.000+0000',
+                                   components=components, labels=['perf', 'triage'])
+        dict.__setitem__(current, 'issuelinks', 'CASSANDRA-2:Dependency:outward,CASSANDRA-3:Dependency:outward,')
+
+        def as_of(day, hour):
+            return history.issues_as_of([current], int(datetime(2018, 3, day, hour, tzinfo=pytz.utc).timestamp()))[0]
+
+        rewound = as_of(2, 12)
+        self.assertEqual(rewound['components'], current['components'])
+        self.assertEqual(rewound['issuelinks'], current['issuelinks'])
+
+        rewound = as_of(1, 12)
+        self.assertEqual(rewound['components'],
+                         "[<JIRA Component: name='A', id='1'>, <JIRA Component: name='B', id='2'>, <JIRA Component: name='C'>]")
+        self.assertEqual(rewound['issuelinks'], 'CASSANDRA-2:Dependency:outward,')
+        self.assertListEqual(rewound.linked_issue_keys(), ['CASSANDRA-2'])
+        self.assertEqual(rewound['labels'], current['labels'])
+
+        rewound = as_of(1, 0)
+        self.assertEqual(rewound['components'], "[<JIRA Component: name='A', id='1'>, <JIRA Component: name='C'>]")
+        self.assertEqual(rewound['labels'], "['perf']")
+        # The link removed after this can't be rebuilt w/out its type, so links are left as they are
+        self.assertEqual(rewound['issuelinks'], current['issuelinks'])
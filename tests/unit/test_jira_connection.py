@@ -0,0 +1,94 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for JiraConnection's cached project catalog and user directory.
+"""
+
+from unittest.mock import Mock, patch
+
+from jira.resources import Project
+
+from src.time_utils import current_time
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection
+
+
+def _project(key):
+    project = Project(None, None)
+    project.key = key
+    project.name = key
+    return project
+
+
+class TestJiraConnection(Tester):
+
+    def setUp(self):
+        super(TestJiraConnection, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.jira_connection.possible_projects = ['CASSANDRA', 'CASSDOCS', 'KAFKA']
+        self.jira_connection.projects_refreshed = current_time()
+
+    def test_pick_project_uses_cached_catalog(self):
+        self.assertFalse(self.jira_connection.project_catalog_is_stale)
+        with patch.object(self.jira_connection._wrapped_jira_connection, 'projects') as projects, \
+                patch('src.jira_connection.get_input', return_value='cass'), \
+                patch('src.jira_connection.pick_value', return_value='CASSANDRA') as pick_value:
+            self.assertEqual(self.jira_connection.pick_project(), 'CASSANDRA')
+        projects.assert_not_called()
+        self.assertListEqual(pick_value.call_args[0][1], ['CASSANDRA', 'CASSDOCS'])
+
+    def test_pick_project_refreshes_on_miss(self):
+        with patch.object(self.jira_connection._wrapped_jira_connection, 'projects',
+                          return_value=[_project('CASSANDRA'), _project('SPARK')]) as projects, \
+                patch('src.jira_connection.get_input', return_value='spark'), \
+                patch('src.jira_connection.pick_value', return_value='SPARK') as pick_value:
+            self.assertEqual(self.jira_connection.pick_project(), 'SPARK')
+        projects.assert_called_once_with()
+        self.assertListEqual(pick_value.call_args[0][1], ['SPARK'])
+        self.assertListEqual(self.jira_connection.possible_projects, ['CASSANDRA', 'SPARK'])
+
+    def test_refresh_user_directory_pages_past_duplicate_names(self):
+        # Two users share a display name on the first full page; both are kept
+        first_page = [{'displayName': 'Jane Doe', 'name': 'jdoe'}, {'displayName': 'Jane Doe', 'name': 'jdoe2'}]
+        second_page = [{'displayName': 'Mary Jones', 'name': 'mjones'}]
+        responses = [Mock(status_code=200, json=Mock(return_value=x)) for x in (first_page, second_page)]
+        self.jira_connection._cached_jira_projects = {'CASSANDRA': None}
+        with patch.object(type(self.jira_connection), 'USER_PAGE_SIZE', 2), \
+                patch.object(self.jira_connection, '_get', side_effect=responses) as get:
+            self.jira_connection.refresh_user_directory()
+        self.assertEqual(get.call_count, 2)
+        self.assertIn('startAt=2', get.call_args[0][0])
+        self.assertEqual(self.jira_connection.user_directory.user_name('Mary Jones'), 'mjones')
+        self.assertListEqual(self.jira_connection.user_directory.user_names('Jane Doe'), ['jdoe', 'jdoe2'])
+        self.assertEqual(len(self.jira_connection.user_directory), 3)
+
+    def test_pick_single_assignee_quit(self):
+        self.jira_connection.user_directory.add_users({'jdoe': 'Jane Doe'})
+        with patch('src.jira_connection.get_input', return_value='q'):
+            self.assertIsNone(self.jira_connection.pick_single_assignee())
+            self.assertIsNone(self.jira_connection.pick_assignees(3))
+
+    def test_pick_ambiguous_display_name_prompts(self):
+        self.jira_connection.user_directory.add_users({'jdoe': 'Jane Doe', 'jdoe2': 'Jane Doe', 'mjones': 'Mary Jones'})
+        with patch('src.jira_connection.get_input', return_value='jane') as get_input, \
+                patch('src.jira_connection.pick_value', return_value='Jane Doe'), \
+                patch('src.jira_connection.is_yes', side_effect=[False, True]) as is_yes:
+            # Declined the first time round, so it's only added on the second pick
+            self.assertListEqual(self.jira_connection.pick_assignees(1), ['Jane Doe'])
+        self.assertEqual(get_input.call_count, 2)
+        with patch('src.jira_connection.get_input', return_value='mary'), \
+                patch('src.jira_connection.pick_value', return_value='Mary Jones'):
+            self.assertListEqual(self.jira_connection.pick_assignees(1), ['Mary Jones'])
+        self.assertEqual(is_yes.call_count, 2)
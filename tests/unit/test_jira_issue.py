@@ -0,0 +1,52 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for conversion of raw Jira data into JiraIssues.
+"""
+
+from jira import Issue
+
+from src.jira_issue import JiraIssue
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, load_raw_issue
+
+
+class TestJiraIssue(Tester):
+
+    # Nested objects the jira library can only str() as an object address (no readable id or 'self' link)
+    ADDRESS_RENDERED_FIELDS = {'progress', 'timetracking', 'watches'}
+
+    def test_json_conversion_parity(self):
+        """Raw json conversion produces the same cached record as the jira.Issue Resource based conversion."""
+        jira_connection = build_jira_connection()
+        raw_issue = load_raw_issue('CASSANDRA-12345')
+
+        from_resource = JiraIssue(jira_connection, Issue(None, None, raw=raw_issue))
+        from_json = JiraIssue.from_json(jira_connection.connection_name, raw_issue)
+
+        self.assertEqual(from_json.issue_key, from_resource.issue_key)
+        self.assertEqual(from_json.jira_connection_name, from_resource.jira_connection_name)
+        self.assertEqual(from_json.is_cached_offline, from_resource.is_cached_offline)
+        self.assertSetEqual(set(from_json.keys()), set(from_resource.keys()))
+        for field in from_resource:
+            if field in self.ADDRESS_RENDERED_FIELDS:
+                continue
+            self.assertEqual(from_json[field], from_resource[field], 'Mismatch on field: {}'.format(field))
+
+        # Spot check the fields we lean on most heavily downstream
+        self.assertEqual(from_json['issuelinks'], 'CASSANDRA-12400:Blocker:outward,CASSANDRA-12299:Duplicate:inward,')
+        self.assertEqual(from_json['fixVersions'], '4.0,3.11.5')
+        self.assertEqual(from_json['customfield_12313920'], 'Normal - Availability')
+        self.assertTrue(from_json.is_open)
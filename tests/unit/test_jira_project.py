@@ -0,0 +1,192 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for JiraProject cache maintenance. All server access is patched out of JiraUtils.
+"""
+
+import glob
+import os
+import threading
+from unittest.mock import patch
+
+from src import time_utils
+from src.jira_project import JiraProject
+from src.jira_utils import JiraUtils
+from src.project_residency import residency
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestJiraProject(Tester):
+
+    def setUp(self):
+        super(TestJiraProject, self).setUp()
+        self.jira_connection = build_jira_connection()
+
+    def _build_project(self, project_name, issue_keys):
+        issues = {key: build_jira_issue(self.jira_connection, key) for key in issue_keys}
+        return JiraProject(self.jira_connection, project_name, self.jira_connection.url, issues=issues)
+
+    def test_reconcile_evicts_rehomes_and_adds(self):
+        """Deleted keys are evicted, moved keys re-homed into their new cached project, and missing keys pulled in."""
+        source = self._build_project('SRC', ['SRC-1', 'SRC-2', 'SRC-3'])
+        destination = self._build_project('DST', ['DST-1'])
+
+        # SRC-2 was deleted, SRC-3 moved to DST-2, and SRC-4 is on the server but never made it into the cache
+        fetched = [build_jira_issue(self.jira_connection, 'DST-2'), build_jira_issue(self.jira_connection, 'SRC-4')]
+        with patch.object(JiraUtils, 'get_issue_keys_for_project', return_value={'SRC-1', 'SRC-4'}), \
+                patch.object(JiraUtils, 'get_issues_by_keys', return_value=fetched) as get_by_keys:
+            changed, evicted = source.reconcile()
+
+        self.assertListEqual(evicted, ['SRC-2', 'SRC-3'])
+        self.assertListEqual(sorted(x.issue_key for x in changed), ['DST-2', 'SRC-4'])
+        self.assertListEqual(sorted(get_by_keys.call_args[0][1]), ['SRC-2', 'SRC-3', 'SRC-4'])
+        self.assertListEqual(sorted(source.jira_issues.keys()), ['SRC-1', 'SRC-4'])
+        self.assertListEqual(sorted(destination.jira_issues.keys()), ['DST-1', 'DST-2'])
+        self.assertIsNotNone(source.last_reconciled)
+
+    def test_reconcile_skips_on_empty_server_result(self):
+        source = self._build_project('SRC', ['SRC-1'])
+        with patch.object(JiraUtils, 'get_issue_keys_for_project', return_value=set()):
+            self.assertTupleEqual(source.reconcile(), ([], []))
+        self.assertListEqual(list(source.jira_issues.keys()), ['SRC-1'])
+
+    def test_publish_leaves_pinned_snapshot_untouched(self):
+        project = self._build_project('SRC', ['SRC-1', 'SRC-2'])
+        pinned = project.snapshot()
+
+        published = project.publish_issues([build_jira_issue(self.jira_connection, 'SRC-3')], ['SRC-1'])
+
+        self.assertEqual(published.version, pinned.version + 1)
+        self.assertListEqual(sorted(pinned.issues.keys()), ['SRC-1', 'SRC-2'])
+        self.assertListEqual(sorted(project.jira_issues.keys()), ['SRC-2', 'SRC-3'])
+        with self.assertRaises(TypeError):
+            project.jira_issues['SRC-4'] = pinned.issues['SRC-1']
+
+    def test_reconcile_schedule(self):
+        project = self._build_project('SRC', [])
+        self.assertTrue(project.is_reconcile_due())
+
+        project.last_reconciled = time_utils.to_config_time(time_utils.current_time())
+        self.assertFalse(project.is_reconcile_due())
+
+        project.last_reconciled = time_utils.to_config_time(time_utils.since_now('-2d'))
+        self.assertTrue(project.is_reconcile_due())
+
+        project.reconcile_interval = 0
+        self.assertFalse(project.is_reconcile_due())
+
+    def test_scoped_refresh_and_reconcile(self):
+        """Issues leaving a cache_scope are evicted on refresh and reconcile without being fetched again."""
+        project = self._build_project('SRC', ['SRC-1', 'SRC-2', 'SRC-3'])
+        project.set_cache_scope('resolution = unresolved')
+        project.updated = '2018-01-01 10:00'
+        self.assertIsNone(project.last_reconciled)
+
+        # SRC-2 was resolved since our last refresh; SRC-4 was opened
+        fetched = [build_jira_issue(self.jira_connection, 'SRC-4', updated='2018-01-02T10:00:00.000+0000')]
+        with patch.object(JiraUtils, 'get_issues_for_project', return_value=fetched) as get_issues, \
+                patch.object(JiraUtils, 'get_issue_keys_by_query', return_value={'SRC-2', 'SRC-9'}) as left_scope, \
+                patch.object(project, 'is_reconcile_due', return_value=False):
+            changed, evicted = project.refresh()
+        self.assertEqual(get_issues.call_args[0][4], 'resolution = unresolved')
+        self.assertEqual(left_scope.call_args[0][1],
+                         'PROJECT = SRC AND updated > "2018-01-01 10:00" AND NOT (resolution = unresolved)')
+        self.assertListEqual([x.issue_key for x in changed], ['SRC-4'])
+        self.assertListEqual(evicted, ['SRC-2'])
+
+        # SRC-3 fell out of scope and SRC-1 was deleted: only SRC-1 needs fetching to rule out a move
+        def project_keys(jira_connection, project_name, scope=None):
+            return {'SRC-4'} if scope is not None else {'SRC-3', 'SRC-4'}
+        with patch.object(JiraUtils, 'get_issue_keys_for_project', side_effect=project_keys), \
+                patch.object(JiraUtils, 'get_issues_by_keys', return_value=[]) as get_by_keys:
+            changed, evicted = project.reconcile()
+        get_by_keys.assert_called_once_with(self.jira_connection, ['SRC-1'])
+        self.assertListEqual(evicted, ['SRC-1', 'SRC-3'])
+        self.assertListEqual(list(project.jira_issues.keys()), ['SRC-4'])
+
+    def test_cold_eviction_and_fault_in(self):
+        """Old closed issues leave memory but stay reachable, and come back hot when updated."""
+        old = build_jira_issue(self.jira_connection, 'SRC-1', resolution={'name': 'Fixed'},
+                               resolutiondate='2015-01-01T10:00:00.000+0000')
+        recent = build_jira_issue(self.jira_connection, 'SRC-2', resolution={'name': 'Fixed'},
+                                  resolutiondate=time_utils.current_time().strftime('%Y-%m-%dT%H:%M:%S.000+0000'))
+        project = JiraProject(self.jira_connection, 'SRC', self.jira_connection.url,
+                              issues={x.issue_key: x for x in [old, recent, build_jira_issue(self.jira_connection, 'SRC-3')]})
+
+        project.set_cold_after_months(12)
+        self.assertListEqual(sorted(project.jira_issues.keys()), ['SRC-2', 'SRC-3'])
+        self.assertSetEqual(project.cached_keys(), {'SRC-1', 'SRC-2', 'SRC-3'})
+        self.assertEqual(project.get_issue('SRC-1')['resolutiondate'], '2015-01-01T10:00:00.000+0000')
+        self.assertEqual(len(project.issues_closed_since(int(time_utils.since_now('-1m').timestamp()))), 2)
+        self.assertEqual(len(project.issues_closed_since(None)), 3)
+        self.assertListEqual(sorted(x.issue_key for x in project.get_matching_issues('Summary', 'c')), ['SRC-1', 'SRC-2'])
+
+        # Reopened: hot again and out of the cold segment
+        project.publish_issues([build_jira_issue(self.jira_connection, 'SRC-1')])
+        self.assertIn('SRC-1', project.jira_issues)
+        self.assertEqual(len(project.cold), 0)
+
+        # Turning retention off faults everything back in
+        project.publish_issues([old])
+        project.evict_cold()
+        project.set_cold_after_months(0)
+        self.assertListEqual(sorted(project.jira_issues.keys()), ['SRC-1', 'SRC-2', 'SRC-3'])
+
+    def test_residency_unloads_lru_and_reloads(self):
+        """Over budget, the least recently used saved project drops to disk and reloads on next use."""
+        first = self._build_project('ONE', ['ONE-1', 'ONE-2'])
+        second = self._build_project('TWO', ['TWO-1'])
+        first.save_config()
+        second.save_config()
+
+        # Each estimates to IN_MEMORY_RATIO MB, so only one fits
+        with patch.object(residency, 'budget_mb', residency.IN_MEMORY_RATIO + 1), \
+                patch.object(JiraProject, 'estimated_bytes', return_value=1024 * 1024):
+            self.assertIn('ONE-1', first.jira_issues)
+            self.assertIn('TWO-1', second.jira_issues)
+            self.assertFalse(first.is_resident)
+            self.assertEqual(first.issue_count, 2)
+            self.assertEqual(first.version, 0)
+            self.assertFalse(first.is_resident)
+
+            self.assertEqual(first.get_issue('ONE-2').issue_key, 'ONE-2')
+            self.assertTrue(first.is_resident)
+            self.assertFalse(second.is_resident)
+
+            # Unsaved changes pin a project in memory
+            first.publish_issues([build_jira_issue(self.jira_connection, 'ONE-3')])
+            self.assertIn('TWO-1', second.jira_issues)
+            self.assertTrue(first.is_resident)
+            first.save_config()
+            self.assertTrue(first.unload())
+            # Read without reloading, so checking a cached DependencyGraph is current doesn't fault projects back in
+            self.assertEqual(first.version, 1)
+            self.assertFalse(first.is_resident)
+            self.assertListEqual(sorted(first.jira_issues.keys()), ['ONE-1', 'ONE-2', 'ONE-3'])
+        residency.forget(first)
+        residency.forget(second)
+
+    def test_concurrent_saves(self):
+        """Overlapping saves, i.e. the sync worker and the webhook flush timer, leave one intact data file behind."""
+        project = self._build_project('SRC', ['SRC-{}'.format(x) for x in range(200)])
+        savers = [threading.Thread(target=project.save_config) for _ in range(8)]
+        for saver in savers:
+            saver.start()
+        for saver in savers:
+            saver.join()
+        data_file = os.path.join('tests', project._data_file())
+        self.assertEqual(len(JiraProject.load_issues(data_file)), 200)
+        self.assertListEqual(glob.glob('{}*.tmp'.format(data_file)), [])
@@ -0,0 +1,67 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for the background JiraSyncWorker. Passes are driven directly rather than on the worker thread.
+"""
+
+from unittest.mock import Mock, patch
+
+from src.jira_project import JiraProject
+from src.jira_sync_worker import JiraSyncWorker
+from src.jira_utils import JiraUtils
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestJiraSyncWorker(Tester):
+
+    def setUp(self):
+        super(TestJiraSyncWorker, self).setUp()
+        self.jira_connection = build_jira_connection()
+        issues = {'SRC-1': build_jira_issue(self.jira_connection, 'SRC-1')}
+        self.jira_project = JiraProject(self.jira_connection, 'SRC', self.jira_connection.url, issues=issues,
+                                        reconcile_interval=0)
+        self.jira_manager = Mock()
+        self.jira_manager.get_jira_connection.return_value = self.jira_connection
+        self.jira_manager.get_all_cached_jira_projects.return_value = {'SRC': self.jira_project}
+        self.worker = JiraSyncWorker(self.jira_manager)
+
+    def test_sync_swaps_in_refreshed_issues(self):
+        """Readers holding the pre-refresh dict keep a consistent view while the refreshed dict is swapped in."""
+        before = self.jira_project.jira_issues
+        updated = build_jira_issue(self.jira_connection, 'SRC-2', updated='2018-02-01T10:00:00.000+0000')
+
+        self.worker.request_sync()
+        self.worker.request_sync()
+        jira_project = self.worker._next_project()
+        self.assertIs(jira_project, self.jira_project)
+        self.assertIsNone(self.worker._next_project())
+
+        with patch.object(JiraUtils, 'get_issues_for_project', return_value=[updated]):
+            self.worker._sync_project(jira_project)
+
+        self.assertListEqual(sorted(before.keys()), ['SRC-1'])
+        self.assertListEqual(sorted(self.jira_project.jira_issues.keys()), ['SRC-1', 'SRC-2'])
+        self.jira_manager.on_project_refreshed.assert_called_once_with([updated], [])
+
+    def test_failed_sync_is_reported(self):
+        with patch.object(JiraUtils, 'get_issues_for_project', side_effect=IOError('connection refused')):
+            self.worker._sync_project(self.jira_project)
+        self.assertIn('Failed: SRC', self.worker.status)
+        self.assertListEqual(list(self.jira_project.jira_issues.keys()), ['SRC-1'])
+
+        with patch.object(JiraUtils, 'get_issues_for_project', return_value=[]):
+            self.worker._sync_project(self.jira_project)
+        self.assertNotIn('Failed', self.worker.status)
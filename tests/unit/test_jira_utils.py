@@ -0,0 +1,84 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for JiraUtils querying logic, with the server replaced by canned raw search pages.
+"""
+
+import copy
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import Mock, patch
+
+from src.jira_utils import JiraUtils
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, load_raw_issue
+
+
+class TestJiraUtils(Tester):
+
+    @staticmethod
+    def build_raw_issues(issue_numbers):
+        template = load_raw_issue('CASSANDRA-12345')
+        result = []
+        for number in issue_numbers:
+            raw_issue = copy.deepcopy(template)
+            raw_issue['key'] = 'CASSANDRA-{}'.format(number)
+            result.append(raw_issue)
+        return result
+
+    def test_multi_page_sync_merges_in_key_order(self):
+        """Pages converted in worker processes come back merged in issue key order regardless of server page order."""
+        jira_connection = build_jira_connection()
+        # Deliberately out of order, both within and across pages
+        pages = [[105, 2, 31], [4, 1000, 7], [11]]
+        total = sum(len(page) for page in pages)
+
+        def search(jql, start_at=0, max_results=100, **kwargs):
+            page = pages[[0, 3, 6].index(start_at)]
+            return {'total': total, 'issues': TestJiraUtils.build_raw_issues(page)}
+
+        with patch.object(JiraUtils, 'PAGE_SIZE', 3), patch.object(jira_connection, 'search_issues_json', side_effect=search):
+            results = JiraUtils.get_issues_for_project(jira_connection, 'CASSANDRA')
+
+        self.assertListEqual([x.issue_key for x in results],
+                             ['CASSANDRA-{}'.format(x) for x in [2, 4, 7, 11, 31, 105, 1000]])
+        self.assertEqual(results[0]['fixVersions'], '4.0,3.11.5')
+        self.assertEqual(results[0].jira_connection_name, jira_connection.connection_name)
+        self.assertIsNotNone(JiraUtils._conversion_pool, 'Expected multi-page sync to convert in worker processes')
+
+    def _sync_three_pages(self, jira_connection):
+        pages = [[1, 2], [3, 4], [5]]
+
+        def search(jql, start_at=0, max_results=100, **kwargs):
+            return {'total': 5, 'issues': TestJiraUtils.build_raw_issues(pages[start_at // 2])}
+
+        with patch.object(JiraUtils, 'PAGE_SIZE', 2), patch.object(jira_connection, 'search_issues_json', side_effect=search):
+            return [x.issue_key for x in JiraUtils.get_issues_for_project(jira_connection, 'CASSANDRA')]
+
+    def test_no_spawn_context_converts_in_process(self):
+        """Pythons before 3.7 reject mp_context, which leaves the sync converting pages itself."""
+        with patch.object(JiraUtils, '_conversion_pool', None), \
+                patch('src.jira_utils.ProcessPoolExecutor', side_effect=TypeError('unexpected keyword mp_context')):
+            self.assertIsNone(JiraUtils._get_conversion_pool())
+            self.assertListEqual(self._sync_three_pages(build_jira_connection()),
+                                 ['CASSANDRA-{}'.format(x) for x in range(1, 6)])
+
+    def test_broken_pool_on_submit_converts_in_process(self):
+        pool = Mock()
+        pool.submit.side_effect = BrokenProcessPool('worker died')
+        with patch.object(JiraUtils, '_conversion_pool', pool):
+            self.assertListEqual(self._sync_three_pages(build_jira_connection()),
+                                 ['CASSANDRA-{}'.format(x) for x in range(1, 6)])
+            self.assertIsNone(JiraUtils._conversion_pool)
+        self.assertEqual(pool.submit.call_count, 1)
@@ -0,0 +1,147 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for translating JiraView filters to JQL, checked against local matching, and querying uncached
+projects server-side.
+"""
+
+import json
+import re
+from unittest.mock import patch
+
+from src.jira_project import JiraProject
+from src.jira_utils import JiraUtils
+from src.jira_view import JiraView
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestJiraView(Tester):
+
+    def setUp(self):
+        super(TestJiraView, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.jira_view = JiraView('test_view', self.jira_connection)
+
+    def _view(self, *filters):
+        jira_view = JiraView('test_view', self.jira_connection)
+        for name, value, filter_type, and_or in filters:
+            jira_view.add_single_filter(name, value, filter_type, and_or)
+        return jira_view
+
+    def test_build_jql(self):
+        self.jira_connection.user_directory.add_users({'jdoe': 'Jane Doe', 'jsmith': 'John Smith', 'jsmith2': 'John Smith'})
+        self.jira_view.add_single_filter('Project', 'KAFKA', 'i', 'AND')
+        self.jira_view.add_single_filter('resolution', 'unresolved', 'i', 'AND')
+        self.jira_view.add_single_filter('assignee', 'Jane Doe', 'i', 'OR')
+        self.jira_view.add_single_filter('assignee', 'John Smith', 'e', 'OR')
+        self.jira_view.add_single_filter('reviewer', 'John Smith', 'i', 'OR')
+        self.assertEqual(self.jira_view.build_jql(),
+                         '(project = "KAFKA") AND (resolution is EMPTY) AND '
+                         '((assignee = "jdoe") OR ((assignee is EMPTY OR assignee not in ("jsmith", "jsmith2")))) AND '
+                         '((assignee = "jdoe") OR ("reviewer" in ("jsmith", "jsmith2"))) ORDER BY key')
+
+        # Dependency-derived fields can't be pushed down
+        self.jira_view.add_single_filter('is_blocked', 'KAFKA-1', 'i', 'AND')
+        self.assertIsNone(self.jira_view.build_jql())
+
+    def test_build_jql_declines_inexact_filters(self):
+        # JIRA rejects the whole query on a user it doesn't know
+        self.assertIsNone(self._view(('reviewer', 'Nobody We Know', 'i', 'OR')).build_jql())
+        # Multi-valued fields are substring matched locally, which = can't reproduce
+        for field in ['fixVersion', 'component', 'labels']:
+            self.assertIsNone(self._view((field, '4.0', 'i', 'AND')).build_jql())
+        # Excludes without includes match nothing locally
+        self.assertIsNone(self._view(('summary', 'flaky', 'e', 'AND')).build_jql())
+        self.assertIsNone(self._view(('summary', 'flaky', 'e', 'OR')).build_jql())
+
+    def test_build_jql_free_text(self):
+        # Matched locally as substrings, so these go through JQL's text search
+        self.jira_view.add_single_filter('summary', 'compaction "stress"', 'i', 'AND')
+        self.jira_view.add_single_filter('Reproduction', 'stress', 'i', 'AND')
+        self.jira_view.add_single_filter('type', 'Bug', 'i', 'AND')
+        self.assertEqual(self.jira_view.build_jql(),
+                         '(summary ~ "compaction \\"stress\\"") AND ("Reproduction" ~ "stress") AND '
+                         '(issuetype = "Bug") ORDER BY key')
+
+    @staticmethod
+    def _run_jql(jql, jira_issues):
+        """
+        Evaluates the JQL build_jql emits for summary and resolution filters against local issues, ~ as a substring
+        search like our own matching
+        """
+        terms = []
+
+        def to_term(match):
+            terms.append(match.groups())
+            return 'terms[{}]'.format(len(terms) - 1)
+        expression = re.sub(r'(\w+) (is EMPTY|is not EMPTY|~|!~|=|!=)(?: ("(?:[^"\\]|\\.)*"))?', to_term,
+                            jql.replace(' ORDER BY key', ''))
+        expression = expression.replace(' AND ', ' and ').replace(' OR ', ' or ')
+
+        results = []
+        for jira_issue in jira_issues:
+            values = []
+            for field, operator, operand in terms:
+                actual = None if jira_issue.get(field, 'None') == 'None' else jira_issue[field]
+                if operator.endswith('EMPTY'):
+                    values.append((actual is None) == (operator == 'is EMPTY'))
+                elif actual is None:
+                    # Comparisons never match an empty field
+                    values.append(False)
+                else:
+                    operand = json.loads(operand)
+                    matches = operand in actual if operator.endswith('~') else operand == actual
+                    values.append(matches != operator.startswith('!'))
+            if eval(expression, {'terms': values}):
+                results.append(jira_issue.issue_key)
+        return sorted(results)
+
+    def test_build_jql_matches_local_results(self):
+        fixed = {'self': 'https://jira.example.com/rest/api/2/resolution/1', 'name': 'Fixed'}
+        jira_issues = [build_jira_issue(self.jira_connection, 'TEST-1', summary='flaky test'),
+                       build_jira_issue(self.jira_connection, 'TEST-2', summary='flaky build'),
+                       build_jira_issue(self.jira_connection, 'TEST-3', summary='slow test'),
+                       build_jira_issue(self.jira_connection, 'TEST-4', summary='slow build', resolution=fixed),
+                       build_jira_issue(self.jira_connection, 'TEST-5', summary='other')]
+        self.jira_connection.add_and_link_jira_project(JiraProject(
+            self.jira_connection, 'TEST', self.jira_connection.url, issues={x.issue_key: x for x in jira_issues}))
+
+        views = [
+            # Includes beat excludes, so TEST-1 stays in
+            self._view(('summary', 'flaky', 'i', 'OR'), ('summary', 'test', 'e', 'OR')),
+            # On OR filters, excludes rule out what another filter includes
+            self._view(('summary', 'flaky', 'i', 'OR'), ('summary', 'test', 'e', 'OR'),
+                       ('resolution', 'Fixed', 'i', 'OR')),
+            # AND filters drop what they don't include, so their excludes never come into it
+            self._view(('summary', 'test', 'i', 'AND'), ('summary', 'slow', 'e', 'AND')),
+            self._view(('summary', 'build', 'i', 'AND'), ('resolution', 'unresolved', 'i', 'AND')),
+            self._view(('summary', 'slow', 'i', 'AND'), ('resolution', 'Fixed', 'i', 'OR'),
+                       ('resolution', 'unresolved', 'i', 'OR'))]
+        for jira_view in views:
+            local = sorted(jira_view.get_issues().keys())
+            self.assertGreater(len(local), 0)
+            self.assertListEqual(self._run_jql(jira_view.build_jql(), jira_issues), local, jira_view.build_jql())
+
+    def test_uncached_projects_queried_server_side(self):
+        self.jira_view.add_single_filter('Project', 'kafka', 'i', 'OR')
+        self.jira_view.add_single_filter('type', 'Bug', 'i', 'AND')
+        self.assertListEqual(self.jira_view.uncached_projects(), ['KAFKA'])
+
+        remote = [build_jira_issue(self.jira_connection, 'KAFKA-1'), build_jira_issue(self.jira_connection, 'KAFKA-2')]
+        with patch.object(JiraUtils, 'get_issues_by_query', return_value=remote) as query:
+            self.assertListEqual(sorted(self.jira_view.get_issues().keys()), ['KAFKA-1', 'KAFKA-2'])
+        self.assertEqual(query.call_args[0][1],
+                         'project in (KAFKA) AND (issuetype = "Bug") AND ((project = "kafka")) ORDER BY key')
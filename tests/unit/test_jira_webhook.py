@@ -0,0 +1,70 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for JiraWebhookReceiver, posting recorded payloads to a receiver listening on a free local port.
+"""
+
+from unittest.mock import Mock
+
+from src.jira_project import JiraProject
+from src.jira_webhook import JiraWebhookReceiver
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, post_webhook_payload
+
+
+class TestJiraWebhook(Tester):
+
+    def setUp(self):
+        super(TestJiraWebhook, self).setUp()
+        self.jira_connection = build_jira_connection(url='https://issues.apache.org/jira')
+        self.jira_project = JiraProject(self.jira_connection, 'CASSANDRA', self.jira_connection.url)
+        self.jira_manager = Mock()
+        self.jira_manager.jira_connections.return_value = [self.jira_connection]
+        self.receiver = JiraWebhookReceiver(self.jira_manager, port=0)
+        self.receiver.start()
+
+    def tearDown(self):
+        self.receiver.stop()
+        super(TestJiraWebhook, self).tearDown()
+
+    def test_created_updated_deleted(self):
+        self.assertEqual(post_webhook_payload(self.receiver.port, 'issue_created'), 204)
+        created = self.jira_project.get_issue('CASSANDRA-12345')
+        self.assertIsNotNone(created)
+        self.jira_manager.on_project_refreshed.assert_called_with([created], [])
+
+        self.assertEqual(post_webhook_payload(self.receiver.port, 'issue_updated'), 204)
+        updated = self.jira_project.get_issue('CASSANDRA-12345')
+        self.assertTrue(updated['summary'].startswith('Updated: '))
+        # Pushed updates must not move the polling watermark
+        self.assertEqual(self.jira_project.updated, '1970/01/01 00:00')
+
+        self.assertEqual(post_webhook_payload(self.receiver.port, 'issue_deleted'), 204)
+        self.assertIsNone(self.jira_project.get_issue('CASSANDRA-12345'))
+        self.assertEqual(self.receiver.received_count, 3)
+
+    def test_ignores_uncached_projects(self):
+        self.jira_connection.delete_cached_jira_project('CASSANDRA')
+        self.assertEqual(post_webhook_payload(self.receiver.port, 'issue_created'), 204)
+        self.assertEqual(self.receiver.received_count, 0)
+
+    def test_configurable_host(self):
+        receiver = JiraWebhookReceiver(self.jira_manager, host='127.0.0.1', port=0)
+        receiver.start()
+        try:
+            self.assertEqual(post_webhook_payload(receiver.port, 'issue_created'), 204)
+            self.assertIsNotNone(self.jira_project.get_issue('CASSANDRA-12345'))
+        finally:
+            receiver.stop()
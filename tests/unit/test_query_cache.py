@@ -0,0 +1,76 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for QueryCache reuse, incremental revalidation and persistence. Server queries are patched out on
+JiraUtils.
+"""
+
+from unittest.mock import patch
+
+from src.jira_utils import JiraUtils
+from src.query_cache import QueryCache
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+JQL = 'type = \'Escalation\' AND resolution = unresolved ORDER BY key'
+
+
+class TestQueryCache(Tester):
+
+    def setUp(self):
+        super(TestQueryCache, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.query_cache = QueryCache(self.jira_connection)
+
+    def _issue(self, issue_key, updated):
+        return build_jira_issue(self.jira_connection, issue_key, updated=updated)
+
+    def test_reuse_and_revalidate(self):
+        initial = [self._issue('ESC-1', '2018-03-01T10:00:00.000+0000'), self._issue('ESC-2', '2018-03-02T10:00:00.000+0000')]
+        with patch.object(JiraUtils, 'fetch_issues_by_query', return_value=initial) as query:
+            self.assertListEqual([x.issue_key for x in self.query_cache.get_issues(JQL)], ['ESC-1', 'ESC-2'])
+            # Young enough to serve without asking the server
+            self.assertEqual(len(self.query_cache.get_issues(JQL)), 2)
+        self.assertEqual(query.call_count, 1)
+
+        # ESC-1 was resolved, ESC-2 updated, and ESC-3 matches without having changed since our watermark
+        changed = [self._issue('ESC-2', '2018-03-05T10:00:00.000+0000')]
+        with patch.object(JiraUtils, 'fetch_issues_by_query', return_value=changed) as query, \
+                patch.object(JiraUtils, 'get_issue_keys_by_query', return_value={'ESC-2', 'ESC-3'}), \
+                patch.object(JiraUtils, 'get_issues_by_keys', return_value=[self._issue('ESC-3', '2018-01-01T10:00:00.000+0000')]) as by_keys:
+            results = self.query_cache.get_issues(JQL, refresh=True)
+
+        self.assertEqual(query.call_args[0][1], '(type = \'Escalation\' AND resolution = unresolved) '
+                                                'AND updated >= "2018-03-02 10:00" ORDER BY key')
+        by_keys.assert_called_once_with(self.jira_connection, ['ESC-3'])
+        self.assertListEqual([x.issue_key for x in results], ['ESC-2', 'ESC-3'])
+        self.assertIs(results[0], changed[0])
+        self.assertEqual(self.query_cache._results[JQL].watermark, '2018-03-05 10:00')
+
+    def test_persisted_and_bounded(self):
+        jira_issues = [self._issue('ESC-1', '2018-03-01T10:00:00.000+0000')]
+        with patch.object(JiraUtils, 'fetch_issues_by_query', return_value=jira_issues) as query:
+            # The general entry point goes through the connection's cache
+            self.assertEqual(len(JiraUtils.get_issues_by_query(self.jira_connection, JQL, max_age_minutes=60)), 1)
+            reloaded = QueryCache(self.jira_connection)
+            self.assertListEqual([x.issue_key for x in reloaded.get_issues(JQL)], ['ESC-1'])
+            self.assertEqual(query.call_count, 1)
+
+            with patch.object(QueryCache, 'MAX_QUERIES', 2):
+                for project in ['A', 'B']:
+                    reloaded.get_issues('project = {}'.format(project))
+            reloaded = QueryCache(self.jira_connection)
+            reloaded._load()
+            self.assertSetEqual(set(reloaded._results.keys()), {'project = A', 'project = B'})
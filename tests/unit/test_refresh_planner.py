@@ -0,0 +1,65 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for RefreshPlanner scoring and persistence.
+"""
+
+import time
+from unittest.mock import Mock
+
+from src.refresh_planner import ProjectUsage, RefreshPlanner
+from tests.argus_test import Tester
+
+
+class TestRefreshPlanner(Tester):
+
+    @staticmethod
+    def _project(name):
+        jira_project = Mock()
+        jira_project.project_name = name
+        return jira_project
+
+    def test_plan_orders_limits_and_defers(self):
+        now = time.time()
+        hour = 3600
+        planner = RefreshPlanner({
+            # heavily used, 10 hours stale
+            'HOT': ProjectUsage(access_score=5, last_access=now, last_sync=now - 10 * hour),
+            # used just as much but synced an hour ago
+            'FRESH': ProjectUsage(access_score=5, last_access=now, last_sync=now - hour),
+            # nobody has looked at it in weeks
+            'COLD': ProjectUsage(access_score=1, last_access=now - 60 * 24 * hour, last_sync=now - 10 * hour),
+            # just as cold, but hasn't synced in over a week
+            'OVERDUE': ProjectUsage(access_score=1, last_access=now - 60 * 24 * hour, last_sync=now - 200 * hour),
+        })
+        projects = {x: self._project(x) for x in ['HOT', 'FRESH', 'COLD', 'OVERDUE', 'DASH']}
+
+        # COLD is deferred; OVERDUE and the never synced DASH are refreshed at the cold floor score
+        planned = planner.plan(list(projects.values()), limit=10)
+        self.assertListEqual([x.project_name for x in planned], ['HOT', 'OVERDUE', 'DASH', 'FRESH'])
+
+        planned = planner.plan(list(projects.values()), limit=1, required=[projects['FRESH']])
+        self.assertListEqual([x.project_name for x in planned], ['FRESH', 'HOT'])
+
+    def test_access_and_sync_round_trip(self):
+        planner = RefreshPlanner()
+        planner.record_access(['SRC', 'SRC'])
+        planner.record_sync('SRC', 250)
+
+        loaded = RefreshPlanner.from_file()
+        usage = loaded.usage('SRC')
+        self.assertAlmostEqual(usage.access_score, 1.0, places=3)
+        self.assertEqual(usage.last_cost, 3)
+        self.assertGreater(usage.last_sync, 0)
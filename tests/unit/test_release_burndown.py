@@ -0,0 +1,95 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for ReleaseBurndown over a small release: two issues on 4.0, one depending on an issue in
+another project.
+"""
+
+from unittest.mock import Mock
+
+from src.dependency_graph import DependencyGraph
+from src.link_index import LinkIndex
+from src.release_burndown import ReleaseBurndown
+from src.time_utils import jira_epoch
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+VERSION_4_0 = [{'self': 'https://jira.example.com/rest/api/2/version/1', 'name': '4.0'}]
+
+
+class TestReleaseBurndown(Tester):
+
+    def setUp(self):
+        super(TestReleaseBurndown, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.dependency = build_jira_issue(
+            self.jira_connection, 'DEP-1', created='2018-02-20T10:00:00.000+0000',
+            resolution={'self': 'https://jira.example.com/rest/api/2/resolution/1', 'name': 'Fixed'},
+            resolutiondate='2018-03-05T10:00:00.000+0000')
+        root = build_jira_issue(self.jira_connection, 'ROOT-1', created='2018-03-01T10:00:00.000+0000',
+                                fixVersions=VERSION_4_0)
+        dict.__setitem__(root, 'issuelinks', 'DEP-1:Dependency:outward,EXT-1:Dependency:outward')
+        self.root_issues = {'ROOT-1': root, 'ROOT-2': self._second_root('2018-03-03T10:00:00.000+0000')}
+
+        self.burndown = ReleaseBurndown('4.0')
+        self.now = jira_epoch('2018-03-10T12:00:00.000+0000')
+
+    def _second_root(self, updated):
+        return build_jira_issue(self.jira_connection, 'ROOT-2', created='2018-03-03T10:00:00.000+0000',
+                                updated=updated, fixVersions=VERSION_4_0)
+
+    def _graph(self):
+        issues = dict(self.root_issues, **{'DEP-1': self.dependency})
+        return DependencyGraph([{x.issue_key: LinkIndex.entry(x) for x in self.root_issues.values()},
+                                {'DEP-1': LinkIndex.entry(self.dependency)}], issues.get)
+
+    def test_series_includes_dependencies(self):
+        self.burndown.update(self._graph(), lambda project_name: None)
+        self.assertEqual(self.burndown.issue_count, 3)
+        self.assertEqual(self.burndown.dependency_count, 1)
+        # EXT-1 isn't cached
+        self.assertEqual(self.burndown.missing_count, 1)
+
+        series = self.burndown.series(self.now)
+        self.assertEqual(len(series), 10)
+        # The dependency joins with ROOT-1 rather than on its own earlier creation
+        self.assertEqual(series[0].added, 2)
+        self.assertEqual(series[2].added, 1)
+        self.assertEqual(series[4].closed, 1)
+        self.assertListEqual([series[-1].open_count, series[-1].total_closed, series[-1].scope], [2, 1, 3])
+
+        # One close in the 10 days so far, two left
+        projected = self.burndown.projected_completion(series)
+        self.assertEqual(projected.strftime('%Y/%m/%d'), '2018/03/30')
+
+    def test_update_only_recomputes_changed_issues(self):
+        graph = self._graph()
+        history_lookup = Mock(return_value=None)
+        self.burndown.update(graph, history_lookup)
+        self.assertEqual(self.burndown.processed_count, 3)
+        self.assertEqual(history_lookup.call_count, 2)
+
+        # Nothing the burndown depends on changes without the graph being rebuilt
+        self.burndown.update(graph, history_lookup)
+        self.assertEqual(self.burndown.processed_count, 0)
+        self.assertEqual(history_lookup.call_count, 2)
+
+        self.burndown.update(self._graph(), history_lookup)
+        self.assertEqual(self.burndown.processed_count, 0)
+
+        self.root_issues['ROOT-2'] = self._second_root('2018-03-08T10:00:00.000+0000')
+        self.burndown.update(self._graph(), history_lookup)
+        self.assertEqual(self.burndown.processed_count, 1)
+        self.assertEqual(self.burndown.issue_count, 3)
@@ -0,0 +1,79 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for the RemoteIssueCache of linked issues on uncached projects. Server queries are patched out on
+JiraUtils.
+"""
+
+from unittest.mock import patch
+
+from src.jira_utils import JiraUtils
+from src.remote_issue_cache import RemoteIssueCache
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestRemoteIssueCache(Tester):
+
+    def setUp(self):
+        super(TestRemoteIssueCache, self).setUp()
+        self.jira_connection = build_jira_connection()
+        self.remote_issue_cache = RemoteIssueCache('test_connection')
+
+    def _issue(self, issue_key, updated):
+        return build_jira_issue(self.jira_connection, issue_key, updated=updated)
+
+    def test_fetch_refresh_and_retain(self):
+        fetched = [self._issue('EXT-1', '2018-03-01T10:00:00.000+0000'), self._issue('EXT-2', '2018-03-02T10:00:00.000+0000')]
+        with patch.object(JiraUtils, 'get_issues_by_keys', return_value=fetched) as by_keys:
+            # EXT-3 was deleted, so doesn't come back
+            self.assertEqual(self.remote_issue_cache.fetch(self.jira_connection, ['EXT-3', 'EXT-2', 'EXT-1']), 2)
+            by_keys.assert_called_once_with(self.jira_connection, ['EXT-1', 'EXT-2', 'EXT-3'])
+            # Neither held nor deleted keys are asked for again
+            self.assertEqual(self.remote_issue_cache.fetch(self.jira_connection, ['EXT-1', 'EXT-3']), 0)
+            self.assertEqual(by_keys.call_count, 1)
+        self.assertEqual(self.remote_issue_cache.watermark, '2018-03-02 10:00')
+        self.assertFalse(self.remote_issue_cache.is_stale)
+
+        # Refresh only asks for what changed since the watermark
+        with patch.object(JiraUtils, 'get_issues_by_keys', return_value=[self._issue('EXT-1', '2018-03-05T10:00:00.000+0000')]) as by_keys:
+            self.assertEqual(self.remote_issue_cache.refresh(self.jira_connection), 1)
+            by_keys.assert_called_once_with(self.jira_connection, ['EXT-1', 'EXT-2'], '2018-03-02 10:00')
+        self.assertEqual(self.remote_issue_cache.get('EXT-1')['updated'], '2018-03-05T10:00:00.000+0000')
+        self.assertEqual(self.remote_issue_cache.watermark, '2018-03-05 10:00')
+
+        self.remote_issue_cache.retain({'EXT-2'})
+        reloaded = RemoteIssueCache('test_connection')
+        self.assertEqual(len(reloaded), 1)
+        self.assertIsNone(reloaded.get('EXT-1'))
+        self.assertEqual(reloaded.get('EXT-2').issue_key, 'EXT-2')
+
+    def test_fetch_doesnt_advance_watermark_past_held_issues(self):
+        with patch.object(JiraUtils, 'get_issues_by_keys', return_value=[self._issue('EXT-1', '2018-03-01T10:00:00.000+0000')]):
+            self.remote_issue_cache.fetch(self.jira_connection, ['EXT-1'])
+        self.assertEqual(self.remote_issue_cache.watermark, '2018-03-01 10:00')
+
+        # EXT-1 changes at 11:00, then EXT-2, last updated at 11:15, is linked to and fetched at 11:30
+        with patch.object(JiraUtils, 'get_issues_by_keys', return_value=[self._issue('EXT-2', '2018-03-01T11:15:00.000+0000')]):
+            self.remote_issue_cache.fetch(self.jira_connection, ['EXT-2'])
+        self.assertEqual(self.remote_issue_cache.watermark, '2018-03-01 10:00')
+
+        # So the refresh still asks far enough back for EXT-1's change
+        with patch.object(JiraUtils, 'get_issues_by_keys', return_value=[self._issue('EXT-1', '2018-03-01T11:00:00.000+0000'),
+                                                                        self._issue('EXT-2', '2018-03-01T11:15:00.000+0000')]) as by_keys:
+            self.remote_issue_cache.refresh(self.jira_connection)
+            by_keys.assert_called_once_with(self.jira_connection, ['EXT-1', 'EXT-2'], '2018-03-01 10:00')
+        self.assertEqual(self.remote_issue_cache.get('EXT-1')['updated'], '2018-03-01T11:00:00.000+0000')
+        self.assertEqual(self.remote_issue_cache.watermark, '2018-03-01 11:15')
@@ -0,0 +1,60 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for the per-connection RequestScheduler token bucket. Timing margins are kept loose.
+"""
+
+import threading
+import time
+from unittest import TestCase
+
+from src.request_scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, request_priority
+
+
+class TestRequestScheduler(TestCase):
+
+    def test_throttles_past_burst(self):
+        scheduler = RequestScheduler(requests_per_second=20, burst=2)
+        for _ in range(4):
+            scheduler.acquire()
+        self.assertEqual(scheduler.request_counts[INTERACTIVE], 4)
+        self.assertEqual(scheduler.throttled_counts[INTERACTIVE], 2)
+        self.assertGreater(scheduler.throttled_seconds[INTERACTIVE], 0.05)
+
+    def test_interactive_ahead_of_background(self):
+        scheduler = RequestScheduler(requests_per_second=10, burst=1)
+        scheduler.acquire()
+        order = []
+
+        def background():
+            with request_priority(BACKGROUND):
+                scheduler.call(order.append, 'background')
+
+        background_thread = threading.Thread(target=background)
+        background_thread.start()
+        # Make sure background is already queued when the interactive request arrives
+        time.sleep(0.02)
+        scheduler.call(order.append, 'interactive')
+        background_thread.join()
+
+        self.assertListEqual(order, ['interactive', 'background'])
+        self.assertEqual(scheduler.request_counts[BACKGROUND], 1)
+
+    def test_back_off(self):
+        scheduler = RequestScheduler(requests_per_second=100, burst=10)
+        scheduler.back_off(0.1)
+        start = time.monotonic()
+        scheduler.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
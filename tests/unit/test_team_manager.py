@@ -0,0 +1,47 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for which cached issues TeamManager hands team members for their reports
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import Mock
+
+from src.team_manager import TeamManager
+from tests.argus_test import Tester
+
+
+class TestTeamManager(Tester):
+
+    def test_report_window_reaches_cold_issues(self):
+        hot_issue, cold_issue = Mock(), Mock()
+        jira_connection = Mock(connection_name='test_connection')
+        jira_connection.cached_jira_issues = [[hot_issue]]
+        jira_connection.cached_jira_issues_closed_since.return_value = [[hot_issue, cold_issue]]
+        jira_manager = Mock()
+        jira_manager.get_jira_connection.return_value = jira_connection
+        member = Mock(connection_names={'test_connection'})
+
+        # Load reports only look at what's in memory
+        TeamManager.populate_owned_jira_issues(jira_manager, [member])
+        jira_connection.cached_jira_issues_closed_since.assert_not_called()
+        member.add_if_owns.assert_called_once_with(jira_connection, hot_issue)
+
+        since = datetime(2018, 1, 1, tzinfo=timezone.utc)
+        member.reset_mock()
+        TeamManager.populate_owned_jira_issues(jira_manager, [member], since)
+        jira_connection.cached_jira_issues_closed_since.assert_called_once_with(int(since.timestamp()))
+        self.assertListEqual([x[0][1] for x in member.add_if_owns.call_args_list], [hot_issue, cold_issue])
+        member.clear.assert_called_once_with()
@@ -0,0 +1,76 @@
+# Copyright 2018 DataStax, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Contains unit tests for the locally cached UserDirectory and the TextIndex it searches through.
+"""
+
+from src.text_index import TextIndex
+from src.user_directory import UserDirectory
+from tests.argus_test import Tester
+from tests.utils import build_jira_connection, build_jira_issue
+
+
+class TestUserDirectory(Tester):
+
+    def test_text_index_search(self):
+        text_index = TextIndex(['Jane Doe', 'John Smith', 'Mary Jones', 'Joanna Li'])
+        # Short queries match word starts
+        self.assertListEqual(text_index.search('jo'), ['Joanna Li', 'John Smith', 'Mary Jones'])
+        # Longer ones match anywhere
+        self.assertListEqual(text_index.search('ONE'), ['Mary Jones'])
+        self.assertListEqual(text_index.search('nes'), ['Mary Jones'])
+        self.assertListEqual(text_index.search('xyz'), [])
+        self.assertEqual(text_index.fuzzy('Jhon')[0], 'John Smith')
+
+        text_index.remove('Mary Jones')
+        self.assertListEqual(text_index.search('jo'), ['Joanna Li', 'John Smith'])
+        self.assertEqual(len(text_index), 3)
+
+    def test_harvest_and_reload(self):
+        jira_connection = build_jira_connection()
+        issues = [build_jira_issue(jira_connection, 'SRC-1', assignee='Jane Doe', reporter='John Smith'),
+                  build_jira_issue(jira_connection, 'SRC-2', assignee=None, reporter='Jane Doe')]
+        user_directory = UserDirectory('test_connection')
+        self.assertTrue(user_directory.is_stale)
+        self.assertEqual(user_directory.harvest(issues), 2)
+        self.assertEqual(user_directory.harvest(issues), 0)
+
+        # A server page fills in user names without duplicating anyone and restarts the refresh clock
+        self.assertEqual(user_directory.add_users({'jdoe': 'Jane Doe', 'mjones': 'Mary Jones'}, refreshed=True), 1)
+        self.assertFalse(user_directory.is_stale)
+
+        reloaded = UserDirectory('test_connection')
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.user_name('Jane Doe'), 'jdoe')
+        self.assertIsNone(reloaded.user_name('John Smith'))
+        self.assertListEqual(reloaded.search('j'), ['Jane Doe', 'John Smith', 'Mary Jones'])
+        self.assertFalse(reloaded.is_stale)
+
+    def test_shared_display_names(self):
+        user_directory = UserDirectory('test_connection')
+        self.assertEqual(user_directory.add_users({'jdoe': 'Jane Doe', 'jdoe2': 'Jane Doe'}), 2)
+        self.assertEqual(len(user_directory), 2)
+        self.assertListEqual(user_directory.user_names('Jane Doe'), ['jdoe', 'jdoe2'])
+        # Ambiguous, so there's no single user name for it
+        self.assertIsNone(user_directory.user_name('Jane Doe'))
+        self.assertListEqual(user_directory.search('jane'), ['Jane Doe'])
+
+        # A rename moves the user to the new display name, and the old one stays while someone still uses it
+        self.assertEqual(user_directory.add_users({'jdoe2': 'Jane Smith'}), 0)
+        self.assertEqual(user_directory.user_name('Jane Doe'), 'jdoe')
+        self.assertEqual(user_directory.display_name('jdoe2'), 'Jane Smith')
+        self.assertEqual(user_directory.add_users({'jdoe': 'Jane Q Doe'}), 0)
+        self.assertListEqual(user_directory.search('jane'), ['Jane Q Doe', 'Jane Smith'])
+        self.assertListEqual(user_directory.user_names('Jane Doe'), [])
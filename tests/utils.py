@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
 import shutil
 from configparser import ConfigParser
@@ -56,3 +57,55 @@ def parser_to_dict(filename):
 
 def csv_to_list(row):
     return sorted(filter(None, [r for r in row.split(',')]))
+
+
+def build_jira_connection(connection_name='test_connection', url='http://test.jira.com'):
+    """
+    Builds a JiraConnection wrapping the offline test stub. Requires utils.unit_test to be set.
+    """
+    from src.jira_connection import JiraConnection
+    from src.utils import Config
+    if Config.MenuPass == '':
+        Config.MenuPass = 'test'
+    return JiraConnection(connection_name, url, 'user', 'password')
+
+
+def build_jira_issue(jira_connection, issue_key, **fields):
+    """
+    Builds a JiraIssue through the same resource-based conversion used on a live query, from raw REST-style fields
+    """
+    from jira import Issue
+    from src.jira_issue import JiraIssue
+    raw_fields = {'summary': 'Summary for {}'.format(issue_key), 'updated': '2018-01-01T10:00:00.000+0000',
+                  'resolution': None, 'issuelinks': [], 'fixVersions': []}
+    raw_fields.update(fields)
+    return JiraIssue(jira_connection, Issue(None, None, raw={'key': issue_key, 'fields': raw_fields}))
+
+
+def load_raw_issue(issue_key):
+    """
+    Loads a recorded raw /rest/api/2/search issue dict from test_data/jira_issues
+    """
+    with open(os.path.join(TEST_DIR, 'test_data', 'jira_issues', '{}.json'.format(issue_key))) as raw_file:
+        return json.load(raw_file)
+
+
+def post_webhook_payload(port, payload_name):
+    """
+    Stands in for a JIRA instance, posting a recorded webhook payload from test_data/webhooks to a local receiver
+    :return: HTTP status code of the response
+    """
+    from urllib import request
+    with open(os.path.join(TEST_DIR, 'test_data', 'webhooks', '{}.json'.format(payload_name)), 'rb') as payload_file:
+        body = payload_file.read()
+    post = request.Request('http://localhost:{}/'.format(port), data=body, headers={'Content-Type': 'application/json'})
+    with request.urlopen(post) as response:
+        return response.status
+
+
+def load_raw_changelog(issue_key):
+    """
+    Loads a recorded raw REST changelog dict ({'total': int, 'histories': [...]}) from test_data/changelogs
+    """
+    with open(os.path.join(TEST_DIR, 'test_data', 'changelogs', '{}.json'.format(issue_key))) as raw_file:
+        return json.load(raw_file)